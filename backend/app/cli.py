@@ -0,0 +1,70 @@
+"""
+Command-Line Entry Point
+
+Run from the backend directory (paths under temp/ are relative):
+
+    python -m app.cli ingest-arxiv 2301.00001 https://arxiv.org/abs/2302.00002
+    python -m app.cli ingest-arxiv --file course_papers.txt --concurrency 8
+
+ingest-arxiv prints one JSON line per paper as it finishes (the same records
+as POST /api/papers/scrape-arxiv/bulk) and exits non-zero if any paper failed.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import List
+
+from app.services.arxiv_ingest import ingest_arxiv_papers
+from app.services.executor import shutdown_executors
+from app.services.http_client import http_client
+
+
+def read_refs(path: str) -> List[str]:
+    """Read arXiv URLs/IDs from a file ('-' for stdin), one per line; '#' starts a comment."""
+    handle = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        return [line.split("#", 1)[0].strip() for line in handle if line.split("#", 1)[0].strip()]
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+async def ingest_arxiv(refs: List[str], concurrency: int) -> int:
+    failed = 0
+    total = 0
+    async for result in ingest_arxiv_papers(refs, concurrency):
+        total += 1
+        if result["status"] != "processed":
+            failed += 1
+        print(json.dumps(result, default=str), flush=True)
+    print(f"Ingested {total - failed}/{total} papers", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Saral AI backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest-arxiv", help="Ingest a list of arXiv papers")
+    ingest.add_argument("refs", nargs="*", help="arXiv URLs or IDs")
+    ingest.add_argument("-f", "--file", help="File with one arXiv URL or ID per line ('-' for stdin)")
+    ingest.add_argument("-c", "--concurrency", type=int, default=None, help="Papers processed at once")
+
+    args = parser.parse_args(argv)
+    if args.command == "ingest-arxiv":
+        refs = list(args.refs)
+        if args.file:
+            refs.extend(read_refs(args.file))
+        if not refs:
+            parser.error("no arXiv URLs or IDs given")
+        try:
+            return asyncio.run(ingest_arxiv(refs, args.concurrency))
+        finally:
+            shutdown_executors()
+            http_client.close()
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
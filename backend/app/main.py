@@ -22,14 +22,20 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from app.routes import api_keys, papers, scripts, slides, media, images, auth, podcast, mindmap, visual_storytelling
+from app.routes import api_keys, papers, scripts, slides, media, images, auth, podcast, mindmap, visual_storytelling, jobs, storage, uploads
 from app.auth.dependencies import get_current_user, get_current_user_optional
+from app.services.executor import shutdown_executors
+from app.services.job_manager import job_manager
+from app.services.temp_gc import PaperActivityMiddleware, temp_gc
+from app.services.http_client import http_client
 
 # Create temp directories
 temp_dirs = [
     "temp/arxiv_sources", "temp/images", "temp/title_slides",
     "temp/videos", "temp/audio", "temp/latex_template",
-    "temp/slides", "temp/scripts", "temp/podcasts", "temp/visual_storytelling"
+    "temp/slides", "temp/scripts", "temp/podcasts", "temp/visual_storytelling",
+    "temp/jobs", "temp/artifacts", "temp/arxiv_cache", "temp/mindmap",
+    "temp/figures", "temp/uploads"
 ]
 
 for dir_path in temp_dirs:
@@ -55,11 +61,15 @@ app.add_middleware(
         "http://localhost:3001",
     ],
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH", "HEAD"],
     allow_headers=["*"],
-    expose_headers=["*"]
+    # With credentials, browsers read "*" literally; resumable uploads need these by name
+    expose_headers=["*", "Upload-Offset", "Upload-Length", "Location"]
 )
 
+# Record paper use for temp/ eviction and keep papers with in-flight requests
+app.add_middleware(PaperActivityMiddleware)
+
 # Add middleware to log requests
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -111,6 +121,22 @@ app.include_router(images.router, prefix="/api/images", tags=["Images"])
 app.include_router(podcast.router, prefix="/api/podcast", tags=["Podcast"])
 app.include_router(mindmap.router, prefix="/api/mindmap", tags=["Mindmap"])
 app.include_router(visual_storytelling.router, prefix="/api/visual-storytelling", tags=["Visual Storytelling"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["Jobs"])
+app.include_router(storage.router, prefix="/api/storage", tags=["Storage"])
+app.include_router(uploads.router, prefix="/api/uploads", tags=["Uploads"])
+
+@app.on_event("startup")
+async def start_temp_gc():
+    """Fail jobs whose worker process died, then start the background temp/ garbage collector."""
+    job_manager.recover_interrupted_jobs()
+    temp_gc.start()
+
+@app.on_event("shutdown")
+async def shutdown_executors_on_exit():
+    """Stop the temp/ collector, the shared thread and process pools and pooled HTTP sessions."""
+    temp_gc.stop()
+    shutdown_executors()
+    http_client.close()
 
 # Public endpoints
 @app.get("/")
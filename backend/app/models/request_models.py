@@ -8,6 +8,17 @@ class APIKeysRequest(BaseModel):
 
 class ArxivRequest(BaseModel):
     arxiv_url: str
+    reuse_existing: bool = True
+
+class BulkArxivRequest(BaseModel):
+    arxiv_urls: List[str]
+    concurrency: Optional[int] = None
+    reuse_existing: bool = True
+
+class UploadCreateRequest(BaseModel):
+    filename: str
+    length: int
+    checksum: Optional[str] = None  # hex SHA-256 of the whole file
 
 class PaperMetadata(BaseModel):
     title: str
@@ -54,6 +65,7 @@ class PaperResponse(BaseModel):
     image_files: List[str]
     tex_file_path: str
     status: str
+    reused: bool = False  # forked from an earlier paper with the same source
 
 class ScriptResponse(BaseModel):
     sections_scripts: Dict[str, str]
@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 import os
 from app.auth.dependencies import get_current_user
 from app.models.request_models import APIKeysRequest
+from app.services.executor import run_blocking
+from app.services.repository import Repository
 
 router = APIRouter()
 
@@ -10,8 +12,15 @@ router = APIRouter()
 load_dotenv()
 # env_vars = dotenv_values()
 
-# In-memory storage for API keys (use secure storage in production)
-api_keys_storage = {}
+# API keys and the Gemini rotation position, shared across workers (use secure storage in production)
+api_keys_storage = Repository("api_keys")
+
+def validate_gemini_key(gemini_key: str):
+    """Make a minimal Gemini call to check that the key works."""
+    import google.generativeai as genai
+    genai.configure(api_key=gemini_key)
+    model = genai.GenerativeModel('gemini-2.0-flash')
+    model.generate_content("Hello")
 
 @router.post("/setup")
 async def setup_api_keys(request: APIKeysRequest):
@@ -21,10 +30,7 @@ async def setup_api_keys(request: APIKeysRequest):
     gemini_key = (request.gemini_key or "").strip() or os.getenv("GEMINI_API_KEY")
     if gemini_key:
         try:
-            import google.generativeai as genai
-            genai.configure(api_key=gemini_key)
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            model.generate_content("Hello")
+            await run_blocking(validate_gemini_key, gemini_key)
             api_keys_storage["gemini_key"] = gemini_key
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid Gemini API key: {str(e)}")
@@ -41,7 +47,7 @@ async def setup_api_keys(request: APIKeysRequest):
             except ImportError:
                 raise HTTPException(status_code=400, detail="OpenAI SDK not installed. Omit openai_key or install openai.")
             client = openai.OpenAI(api_key=request.openai_key)
-            client.models.list()
+            await run_blocking(client.models.list)
             api_keys_storage["openai_key"] = request.openai_key
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid OpenAI API key: {str(e)}")
@@ -60,20 +66,40 @@ async def get_api_keys_status():
     }
 
 def get_api_keys():
+    api_keys = dict(api_keys_storage.items())
+
     # Always try to fallback to .env for Sarvam key if not set
-    if "sarvam_key" not in api_keys_storage or not api_keys_storage["sarvam_key"]:
+    if not api_keys.get("sarvam_key"):
         sarvam_key = os.getenv("SARVAM_API_KEY")
         if sarvam_key:
-            api_keys_storage["sarvam_key"] = sarvam_key
+            api_keys["sarvam_key"] = sarvam_key
     
     # Load Hugging Face API key from .env if not set
-    if "huggingface_key" not in api_keys_storage or not api_keys_storage["huggingface_key"]:
+    if not api_keys.get("huggingface_key"):
         huggingface_key = os.getenv("HUGGINGFACE_API_KEY")
         if huggingface_key:
-            api_keys_storage["huggingface_key"] = huggingface_key
-            print("Loaded Hugging Face API key from .env")
+            api_keys["huggingface_key"] = huggingface_key
 
     # Handle multiple Gemini keys: GEMINI_API_KEY_1, GEMINI_API_KEY_2, ...
+    gemini_keys = _env_gemini_keys()
+
+    # Keys for rotation; the current one is whichever a worker last rotated to
+    if gemini_keys:
+        api_keys["gemini_keys"] = gemini_keys
+        if "gemini_key" not in api_keys:
+            index = api_keys.get("current_gemini_index", 0) % len(gemini_keys)
+            api_keys["gemini_key"] = gemini_keys[index]
+            api_keys["current_gemini_index"] = index
+    
+    # Only raise error if absolutely no Gemini key exists
+    if "gemini_key" not in api_keys and not gemini_keys:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No Gemini API key found. Please add GEMINI_API_KEY to your .env file."
+        )
+    return api_keys
+
+def _env_gemini_keys():
     gemini_keys = []
     i = 1
     while True:
@@ -88,34 +114,19 @@ def get_api_keys():
         key = os.getenv("GEMINI_API_KEY")
         if key:
             gemini_keys.append(key)
-
-    # Store all keys for rotation
-    if gemini_keys:
-        api_keys_storage["gemini_keys"] = gemini_keys
-        # Use first key initially
-        if "gemini_key" not in api_keys_storage:
-            api_keys_storage["gemini_key"] = gemini_keys[0]
-            api_keys_storage["current_gemini_index"] = 0
-            print(f"✓ Loaded {len(gemini_keys)} Gemini API keys for rotation")
-    
-    # Only raise error if absolutely no Gemini key exists
-    if "gemini_key" not in api_keys_storage and not gemini_keys:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="No Gemini API key found. Please add GEMINI_API_KEY to your .env file."
-        )
-    return api_keys_storage
+    return gemini_keys
 
 def rotate_gemini_key():
     """Rotate to the next Gemini API key when quota is exceeded."""
-    if "gemini_keys" not in api_keys_storage or len(api_keys_storage["gemini_keys"]) <= 1:
+    gemini_keys = _env_gemini_keys()
+    if len(gemini_keys) <= 1:
         return False  # No other keys to rotate to
     
     current_index = api_keys_storage.get("current_gemini_index", 0)
-    next_index = (current_index + 1) % len(api_keys_storage["gemini_keys"])
+    next_index = (current_index + 1) % len(gemini_keys)
     
-    api_keys_storage["gemini_key"] = api_keys_storage["gemini_keys"][next_index]
+    api_keys_storage["gemini_key"] = gemini_keys[next_index]
     api_keys_storage["current_gemini_index"] = next_index
     
     print(f"🔄 Rotated to Gemini API key #{next_index + 1}")
-    return True
\ No newline at end of file
+    return True
@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from pydantic import BaseModel
 from app.services.auth_service import auth_service
 from app.auth.dependencies import get_current_user
+from app.services.executor import run_blocking
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,7 +28,7 @@ async def google_login(request: GoogleLoginRequest):
     """Authenticate with Google and return JWT token"""
     try:
         # Verify Google token
-        user_data = auth_service.verify_google_token(request.token)
+        user_data = await run_blocking(auth_service.verify_google_token, request.token)
         
         # Create JWT token
         access_token = auth_service.create_access_token(user_data)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import FileResponse
 import os
 import mimetypes
-from typing import List
+from typing import List, Optional
 from app.auth.dependencies import get_current_user
 from app.routes.papers import papers_storage
 from app.routes.slides import slides_storage
+from app.services.executor import run_cpu_bound
+from app.services.figure_derivatives import VARIANTS, build_figure_variant, figure_derivatives
 
 router = APIRouter()
 
@@ -23,8 +25,15 @@ async def get_available_images(paper_id: str) -> List[str]:
     return [os.path.basename(img) for img in image_files if os.path.exists(img)]
 
 @router.get("/{paper_id}/{image_name}")
-async def get_image_file(paper_id: str, image_name: str):
-    """Serve individual image files."""
+async def get_image_file(
+    paper_id: str,
+    image_name: str,
+    variant: Optional[str] = Query(None, description="thumb, preview or slide; omit for the original")
+):
+    """Serve individual image files, optionally as a downscaled variant."""
+    
+    if variant is not None and variant not in VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Unknown variant '{variant}'. Use one of: {', '.join(VARIANTS)}")
     
     if paper_id not in papers_storage:
         raise HTTPException(status_code=404, detail="Paper not found")
@@ -42,6 +51,16 @@ async def get_image_file(paper_id: str, image_name: str):
     if not image_path or not os.path.exists(image_path):
         raise HTTPException(status_code=404, detail="Image not found")
     
+    if variant:
+        # Papers ingested before variants existed get them built on first request
+        variant_path = figure_derivatives.resolve(paper_info, image_path, variant)
+        if variant_path is None:
+            variant_path = await run_cpu_bound(build_figure_variant, paper_id, image_path, variant)
+            if variant_path:
+                record_variant(paper_id, image_path, variant, variant_path)
+        if variant_path:
+            image_path = variant_path
+    
     # Determine media type
     media_type, _ = mimetypes.guess_type(image_path)
     if not media_type:
@@ -50,5 +69,22 @@ async def get_image_file(paper_id: str, image_name: str):
     return FileResponse(
         image_path, 
         media_type=media_type,
-        filename=image_name
+        filename=os.path.basename(image_path) if variant else image_name,
+        headers={"Cache-Control": "private, max-age=86400"} if variant else None
+    )
+
+def record_variant(paper_id: str, image_path: str, variant: str, variant_path: str):
+    """Add a variant built on demand to the paper's image_variants so later requests find it.
+
+    Two requests recording variants at once can drop one of them; that
+    variant is then rebuilt from the artifact store on its next request.
+    """
+    paper_info = papers_storage.get(paper_id)
+    if not paper_info:
+        return
+    image_variants = paper_info.get("image_variants") or {}
+    name = os.path.basename(image_path)
+    papers_storage.merge(
+        paper_id,
+        image_variants={**image_variants, name: {**image_variants.get(name, {}), variant: variant_path}}
     )
@@ -0,0 +1,26 @@
+"""
+Background Job Routes
+
+Polling endpoints for jobs queued by the media and slides routers.
+"""
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from app.services.job_manager import job_manager
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str):
+    """Get the state and per-stage progress of a background job."""
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("")
+async def list_jobs(paper_id: Optional[str] = None, job_type: Optional[str] = None):
+    """List background jobs, newest first."""
+    return {"jobs": job_manager.list_jobs(paper_id=paper_id, job_type=job_type)}
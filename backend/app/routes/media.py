@@ -1,7 +1,8 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 import os
 from pathlib import Path
+from typing import Optional
 import traceback
 from app.auth.dependencies import get_current_user
 from app.models.request_models import AudioGenerationRequest, VideoGenerationRequest, MediaResponse
@@ -13,18 +14,121 @@ from app.services.tts_service import ensure_audio_is_generated, ensure_hindi_aud
 from app.services.video_service import create_video_with_audio
 from app.services.hindi_service import generate_hindi_script_with_google
 from app.services.language_service import translate_to_language
+from app.services.job_manager import job_manager, JobProgress
+from app.services.executor import run_blocking, call_cpu_bound
+from app.services.repository import Repository
+from app.services.artifact_store import artifact_store, derivation_key, file_digest
 
 router = APIRouter()
 
-# In-memory storage for media
-media_storage = {}
+# Media records (shared across workers)
+media_storage = Repository("media")
+
+def run_audio_generation(
+    paper_id: str,
+    scripts_info: dict,
+    request: AudioGenerationRequest,
+    api_keys: dict,
+    progress: JobProgress = JobProgress()
+) -> dict:
+    """Translate (if needed) and synthesize narration audio for a paper."""
+    audio_dir = f"temp/audio/{paper_id}"
+    Path(audio_dir).mkdir(parents=True, exist_ok=True)
+
+    sections_scripts = {}
+    for section_name, section_data in scripts_info.get("sections", {}).items():
+        if isinstance(section_data, dict):
+            sections_scripts[section_name] = section_data.get("script", "")
+        else:
+            sections_scripts[section_name] = str(section_data)
+
+    progress.start_stage("translate")
+    if request.selected_language == "Hindi":
+        print("Generating Hindi audio")
+        print(f"Title intro script: {scripts_info.get('title_intro_script', '')}")
+        title_intro_hindi = generate_hindi_script_with_google(
+            scripts_info.get("title_intro_script", ""),
+            api_keys.get("sarvam_key")
+        )
+        hindi_sections_scripts = {
+            name: generate_hindi_script_with_google(script, api_keys.get("sarvam_key"))
+            for name, script in sections_scripts.items()
+        }
+        title_intro_script = title_intro_hindi
+        sections_scripts = hindi_sections_scripts
+        language = "Hindi"
+    elif request.selected_language == "English":
+        title_intro_script = scripts_info.get("title_intro_script", "")
+        language = "English"
+    else:
+        print(f"Translating to {request.selected_language}")
+        title_intro_script = translate_to_language(
+            scripts_info.get("title_intro_script", ""),
+            request.selected_language,
+            api_keys.get("sarvam_key")
+        )
+        sections_scripts = {
+            name: translate_to_language(script, request.selected_language, api_keys.get("sarvam_key"))
+            for name, script in sections_scripts.items()
+        }
+        language = request.selected_language
+    print(f"Title intro script: {title_intro_script}")
+
+    progress.start_stage("synthesize", f"Synthesizing {language} audio")
+    if language == "Hindi":
+        audio_response = ensure_hindi_audio_is_generated(
+            sarvam_api_key=api_keys.get("sarvam_key"),
+            paper_id=paper_id,
+            title_intro_script=title_intro_script,
+            sections_scripts=sections_scripts,
+            voice_selections=request.voice_selection,
+            hinglish_iterations=request.hinglish_iterations,
+            openai_api_key=api_keys.get("openai_key"),
+            show_hindi_debug=request.show_hindi_debug
+        )
+    elif language == "English":
+        audio_response = ensure_audio_is_generated(
+            sarvam_api_key=api_keys.get("sarvam_key"),
+            language=language,
+            paper_id=paper_id,
+            title_intro_script=title_intro_script,
+            sections_scripts=sections_scripts,
+            voice_selections=request.voice_selection,
+            hinglish_iterations=request.hinglish_iterations,
+            openai_api_key=api_keys.get("openai_key"),
+            show_hindi_debug=request.show_hindi_debug
+        )
+    else:
+        audio_response = ensure_language_audio_is_generated(
+            sarvam_api_key=api_keys.get("sarvam_key"),
+            language=language,
+            paper_id=paper_id,
+            title_intro_script=title_intro_script,
+            sections_scripts=sections_scripts,
+            voice_selections=request.voice_selection,
+            hinglish_iterations=request.hinglish_iterations,
+            openai_api_key=api_keys.get("openai_key")
+        )
+
+    audio_files = audio_response["audio_files"]
+    audio_paths = [os.path.join(audio_dir, f) for f in audio_files]
+    artifact_store.ingest_files(paper_id, "audio", audio_paths)
+    media_storage.merge(
+        paper_id,
+        audio_files=audio_paths,
+        audio_dir=audio_dir
+    )
+
+    return {"audio_files": audio_files, "paper_id": paper_id}
 
 @router.post("/{paper_id}/generate-audio", response_model=MediaResponse)
 async def generate_audio(
     paper_id: str,
     request: AudioGenerationRequest,
+    background: bool = False,
     api_keys: dict = Depends(get_api_keys)
 ):
+    """Generate narration audio. With ``background=true`` a job is queued and its ID returned."""
     print(f"using voice selection:, {request.voice_selection}")
     print(f"Generating audio for paper ID: {paper_id}")
     if paper_id not in scripts_storage:
@@ -39,95 +143,17 @@ async def generate_audio(
     if not api_keys.get("sarvam_key"):
         raise HTTPException(status_code=400, detail="Sarvam API key required for TTS")
 
-    try:
-        scripts_info = scripts_storage[paper_id]
-        audio_dir = f"temp/audio/{paper_id}"
-        Path(audio_dir).mkdir(parents=True, exist_ok=True)
-
-        sections_scripts = {}
-        for section_name, section_data in scripts_info.get("sections", {}).items():
-            if isinstance(section_data, dict):
-                sections_scripts[section_name] = section_data.get("script", "")
-            else:
-                sections_scripts[section_name] = str(section_data)
-
-        if request.selected_language == "Hindi":
-            print("Generating Hindi audio")
-            print(f"Title intro script: {scripts_info.get('title_intro_script', '')}")
-            title_intro_hindi = generate_hindi_script_with_google(
-                scripts_info.get("title_intro_script", ""),
-                api_keys.get("sarvam_key")
-            )
-            hindi_sections_scripts = {
-                name: generate_hindi_script_with_google(script, api_keys.get("sarvam_key"))
-                for name, script in sections_scripts.items()
-            }
-            title_intro_script = title_intro_hindi
-            sections_scripts = hindi_sections_scripts
-            language = "Hindi"
-        elif request.selected_language == "English":
-            title_intro_script = scripts_info.get("title_intro_script", "")
-            language = "English"
-        else:
-            print(f"Translating to {request.selected_language}")
-            title_intro_script = translate_to_language(
-                scripts_info.get("title_intro_script", ""),
-                request.selected_language,
-                api_keys.get("sarvam_key")
-            )
-            sections_scripts = {
-                name: translate_to_language(script, request.selected_language, api_keys.get("sarvam_key"))
-                for name, script in sections_scripts.items()
-            }
-            language = request.selected_language
-        print(f"Title intro script: {title_intro_script}")
-        
-        if language == "Hindi":
-            audio_response = ensure_hindi_audio_is_generated(
-                sarvam_api_key=api_keys.get("sarvam_key"),
-                paper_id=paper_id,
-                title_intro_script=title_intro_script,
-                sections_scripts=sections_scripts,
-                voice_selections=request.voice_selection,
-                hinglish_iterations=request.hinglish_iterations,
-                openai_api_key=api_keys.get("openai_key"),
-                show_hindi_debug=request.show_hindi_debug
-            )
-        elif language == "English":
-            audio_response = ensure_audio_is_generated(
-                sarvam_api_key=api_keys.get("sarvam_key"),
-                language=language,
-                paper_id=paper_id,
-                title_intro_script=title_intro_script,
-                sections_scripts=sections_scripts,
-                voice_selections=request.voice_selection,
-                hinglish_iterations=request.hinglish_iterations,
-                openai_api_key=api_keys.get("openai_key"),
-                show_hindi_debug=request.show_hindi_debug
-            )
-        else:
-            audio_response = ensure_language_audio_is_generated(
-                sarvam_api_key=api_keys.get("sarvam_key"),
-                language=language,
-                paper_id=paper_id,
-                title_intro_script=title_intro_script,
-                sections_scripts=sections_scripts,
-                voice_selections=request.voice_selection,
-                hinglish_iterations=request.hinglish_iterations,
-                openai_api_key=api_keys.get("openai_key")
-            )
-
-        audio_files = audio_response["audio_files"]
-        if paper_id not in media_storage:
-            media_storage[paper_id] = {}
-
-        media_storage[paper_id]["audio_files"] = [os.path.join(audio_dir, f) for f in audio_files]
-        media_storage[paper_id]["audio_dir"] = audio_dir
-
-        return MediaResponse(
-            audio_files=audio_files,
-            paper_id=paper_id
+    if background:
+        job = job_manager.submit(
+            "audio", paper_id, run_audio_generation,
+            paper_id, scripts_storage[paper_id], request, api_keys,
+            stages=["translate", "synthesize"]
         )
+        return JSONResponse(status_code=202, content=job)
+
+    try:
+        result = await run_blocking(run_audio_generation, paper_id, scripts_storage[paper_id], request, api_keys)
+        return MediaResponse(**result)
 
     except Exception as e:
         print(f"Error generating audio: {str(e)}")
@@ -181,51 +207,87 @@ async def stream_audio(paper_id: str, filename: str, request: Request):
         )
 
 
+def run_video_generation(
+    paper_id: str,
+    selected_language: str,
+    background_music_file: Optional[str] = None,
+    progress: JobProgress = JobProgress()
+) -> dict:
+    """Render the final video for a paper from its slide images and audio files."""
+    slides_info = slides_storage[paper_id]
+    media_info = media_storage[paper_id]
+
+    # Create video directory
+    video_dir = f"temp/videos/{paper_id}"
+    Path(video_dir).mkdir(parents=True, exist_ok=True)
+
+    # Get slide images and audio files
+    slide_images = slides_info["image_paths"]
+    audio_files = media_info["audio_files"]
+
+    print(f"Creating video with {len(slide_images)} slides and {len(audio_files)} audio files")
+
+    # Generate video (or reuse a render of byte-identical slides and audio)
+    progress.start_stage("render", f"Rendering {len(slide_images)} slides")
+    output_file = os.path.join(video_dir, f"final_video_{selected_language.lower()}.mp4")
+
+    render_key = derivation_key(
+        "video",
+        [file_digest(p) for p in slide_images if os.path.exists(p)],
+        [file_digest(p) for p in audio_files if os.path.exists(p)],
+        file_digest(background_music_file) if background_music_file and os.path.exists(background_music_file) else None
+    )
+    video_path = artifact_store.restore(render_key, output_file)
+    if video_path:
+        print(f"Reusing previously rendered video for paper {paper_id}")
+    else:
+        artifact_store.release(output_file)
+        video_path = call_cpu_bound(
+            create_video_with_audio,
+            slide_images=slide_images,
+            audio_files=audio_files,
+            background_music_file=background_music_file,
+            output_file=output_file
+        )
+        if video_path and os.path.exists(video_path):
+            artifact_store.remember(render_key, artifact_store.ingest(video_path))
+
+    if video_path and os.path.exists(video_path):
+        artifact_store.record_manifest(paper_id, "video", {video_path: file_digest(video_path)})
+
+    media_storage.merge(paper_id, video_path=video_path)
+
+    return {
+        "audio_files": [os.path.basename(f) for f in audio_files],
+        "video_path": os.path.basename(video_path) if video_path else None,
+        "paper_id": paper_id
+    }
+
 @router.post("/{paper_id}/generate-video", response_model=MediaResponse)
 async def generate_video(
     paper_id: str,
     request: VideoGenerationRequest,
-    background_tasks: BackgroundTasks
+    background: bool = False
 ):
-    """Generate final video from slides and audio."""
+    """Generate final video from slides and audio. With ``background=true`` a job is queued and its ID returned."""
     
     if paper_id not in slides_storage:
         raise HTTPException(status_code=404, detail="Slides not found")
     
     if paper_id not in media_storage or "audio_files" not in media_storage[paper_id]:
         raise HTTPException(status_code=404, detail="Audio files not found")
+
+    if background:
+        job = job_manager.submit(
+            "video", paper_id, run_video_generation,
+            paper_id, request.selected_language, request.background_music_file,
+            stages=["render"]
+        )
+        return JSONResponse(status_code=202, content=job)
     
     try:
-        slides_info = slides_storage[paper_id]
-        media_info = media_storage[paper_id]
-        
-        # Create video directory
-        video_dir = f"temp/videos/{paper_id}"
-        Path(video_dir).mkdir(parents=True, exist_ok=True)
-        
-        # Get slide images and audio files
-        slide_images = slides_info["image_paths"]
-        audio_files = media_info["audio_files"]
-        
-        print(f"Creating video with {len(slide_images)} slides and {len(audio_files)} audio files")
-        
-        # Generate video
-        output_file = os.path.join(video_dir, f"final_video_{request.selected_language.lower()}.mp4")
-        
-        video_path = create_video_with_audio(
-            slide_images=slide_images,
-            audio_files=audio_files,
-            background_music_file=request.background_music_file,
-            output_file=output_file
-        )
-        
-        media_storage[paper_id]["video_path"] = video_path
-        
-        return MediaResponse(
-            audio_files=[os.path.basename(f) for f in audio_files],
-            video_path=os.path.basename(video_path) if video_path else None,
-            paper_id=paper_id
-        )
+        result = await run_blocking(run_video_generation, paper_id, request.selected_language, request.background_music_file)
+        return MediaResponse(**result)
         
     except Exception as e:
         print(f"Error generating video: {str(e)}")
@@ -4,7 +4,7 @@ Mind Map Generation Routes
 FastAPI router for generating mind maps from arXiv research papers, PDFs, and LaTeX files.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from datetime import datetime
@@ -14,9 +14,14 @@ import os
 import fitz  # PyMuPDF
 import shutil
 
+from app.auth.dependencies import get_current_user_optional
 from app.services.arxiv_fetcher import ArxivFetcher
-from app.services.gemini_mindmap_processor import GeminiMindmapProcessor
+from app.services.gemini_mindmap_processor import GeminiMindmapProcessor, PAPER_TEXT_LIMIT
+from app.services.pdf_processor import read_pdf_text
 from app.services.mermaid_generator import MermaidGenerator
+from app.services.executor import run_blocking
+from app.services.upload_sessions import UploadError, upload_sessions
+from app.routes.papers import save_upload_file
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -24,7 +29,8 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
-# Initialize services (these will be reused across requests)
+# Initialize services (these will be reused across requests; the fetcher
+# gives every request its own workspace, so concurrent requests are isolated)
 arxiv_fetcher = ArxivFetcher()
 gemini_processor = GeminiMindmapProcessor()
 mermaid_generator = MermaidGenerator()
@@ -114,11 +120,11 @@ async def generate_mindmap(request: MindmapRequest):
         
         # Step 1: Fetch paper from arXiv
         logger.info(f"Fetching paper from: {arxiv_url}")
-        paper_data = arxiv_fetcher.fetch_paper_content(arxiv_url)
+        paper_data = await run_blocking(arxiv_fetcher.fetch_paper_content, arxiv_url, PAPER_TEXT_LIMIT)
         
         # Step 2: Analyze paper with Gemini (with complexity level)
         logger.info(f"Analyzing paper: {paper_data['metadata']['title']} with complexity: {request.complexity_level}")
-        analysis_data = gemini_processor.analyze_paper(paper_data, complexity_level=request.complexity_level)
+        analysis_data = await run_blocking(gemini_processor.analyze_paper, paper_data, complexity_level=request.complexity_level)
         
         # Step 3: Generate Mermaid mind map
         logger.info("Generating Mermaid mind map")
@@ -168,13 +174,6 @@ async def generate_mindmap(request: MindmapRequest):
                 "processing_time_seconds": round(processing_time, 2)
             }
         )
-    
-    finally:
-        # Clean up temporary files
-        try:
-            arxiv_fetcher.cleanup()
-        except Exception as e:
-            logger.warning(f"Cleanup warning: {str(e)}")
 
 
 @router.post("/validate-url", response_model=ValidateUrlResponse)
@@ -213,15 +212,10 @@ async def validate_arxiv_url(request: ValidateUrlRequest):
         )
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from a PDF file."""
+def extract_text_from_pdf(pdf_path: str, max_chars: Optional[int] = None) -> str:
+    """Extract text from a PDF file, page by page, stopping after ``max_chars``."""
     try:
-        doc = fitz.open(pdf_path)
-        full_text = ""
-        for page in doc:
-            full_text += page.get_text() + "\n\n"
-        doc.close()
-        return full_text
+        return read_pdf_text(pdf_path, max_chars)
     except Exception as e:
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
@@ -318,9 +312,11 @@ def extract_metadata_from_latex(latex_content: str) -> Dict:
 
 @router.post("/generate-mindmap-from-file")
 async def generate_mindmap_from_file(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
     title: Optional[str] = Form(None),
-    complexity_level: Optional[str] = Form("medium")
+    complexity_level: Optional[str] = Form("medium"),
+    upload_id: Optional[str] = Form(None),
+    current_user: Optional[dict] = Depends(get_current_user_optional)
 ):
     """
     Generate a mind map from an uploaded PDF or LaTeX file.
@@ -329,6 +325,8 @@ async def generate_mindmap_from_file(
         file: Uploaded PDF or LaTeX file
         title: Optional custom title
         complexity_level: Complexity level ('easy', 'medium', 'advanced')
+        upload_id: A completed resumable upload (``/api/uploads``) of the signed-in user,
+            to use instead of ``file``
         
     Returns:
         MindmapResponse with the generated Mermaid diagram and metadata
@@ -337,28 +335,43 @@ async def generate_mindmap_from_file(
     temp_file_path = None
     
     try:
+        session = None
+        if upload_id:
+            if current_user is None:
+                raise HTTPException(status_code=401, detail="Authentication required")
+            try:
+                session = await run_blocking(upload_sessions.finish, upload_id, current_user["id"])
+            except UploadError as e:
+                raise HTTPException(status_code=e.status_code, detail=str(e))
+        elif file is None:
+            raise HTTPException(status_code=400, detail="Either file or upload_id is required")
+        
         # Validate file type
-        filename = file.filename.lower()
+        filename = (session["filename"] if session else file.filename).lower()
         if not (filename.endswith('.pdf') or filename.endswith('.tex') or filename.endswith('.latex')):
             raise HTTPException(
                 status_code=400,
                 detail="Only PDF and LaTeX (.tex) files are supported"
             )
         
-        # Save uploaded file temporarily
+        # Stream the upload to a temporary file instead of reading it into memory
         with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as temp_file:
             temp_file_path = temp_file.name
-            content = await file.read()
-            temp_file.write(content)
+        if session:
+            await run_blocking(shutil.copyfile, session["path"], temp_file_path)
+        else:
+            await run_blocking(save_upload_file, file, temp_file_path)
         
         # Extract text and metadata based on file type
         if filename.endswith('.pdf'):
             logger.info(f"Processing PDF file: {filename}")
-            full_text = extract_text_from_pdf(temp_file_path)
-            metadata = extract_metadata_from_pdf(temp_file_path)
+            # The analysis prompt only uses the first PAPER_TEXT_LIMIT characters
+            full_text = await run_blocking(extract_text_from_pdf, temp_file_path, PAPER_TEXT_LIMIT)
+            metadata = await run_blocking(extract_metadata_from_pdf, temp_file_path)
         else:  # LaTeX file
             logger.info(f"Processing LaTeX file: {filename}")
-            latex_content = content.decode('utf-8')
+            with open(temp_file_path, 'r', encoding='utf-8') as f:
+                latex_content = f.read()
             full_text = extract_text_from_latex(latex_content)
             metadata = extract_metadata_from_latex(latex_content)
         
@@ -375,7 +388,7 @@ async def generate_mindmap_from_file(
         
         # Step 1: Analyze paper with Gemini (with complexity level)
         logger.info(f"Analyzing paper: {metadata['title']} with complexity: {complexity_level}")
-        analysis_data = gemini_processor.analyze_paper(paper_data, complexity_level=complexity_level)
+        analysis_data = await run_blocking(gemini_processor.analyze_paper, paper_data, complexity_level=complexity_level)
         
         # Step 2: Generate Mermaid mind map
         logger.info("Generating Mermaid mind map")
@@ -405,8 +418,13 @@ async def generate_mindmap_from_file(
         }
         
         logger.info(f"Successfully generated mind map for: {response_data['title']}")
+        if session:
+            await run_blocking(upload_sessions.delete, upload_id)
         return response_data
         
+    except HTTPException:
+        raise
+        
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(
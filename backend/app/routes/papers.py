@@ -1,62 +1,137 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException, BackgroundTasks, Depends
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 import os
+import json
 import zipfile
 import tempfile
 import shutil
 import uuid
 import logging
 from pathlib import Path
-from app.models.request_models import ArxivRequest, PaperResponse, PaperMetadata
-from app.services.arxiv_scraper import ArxivScraper
-from app.services.script_generator import extract_paper_metadata
-from app.services.latex_processor import find_tex_file, find_image_references, find_image_files
-from app.services.pdf_processor import process_pdf_file
+from app.models.request_models import ArxivRequest, BulkArxivRequest, PaperResponse, PaperMetadata
+from app.services.arxiv_ingest import ingest_arxiv_paper, ingest_arxiv_papers
+from app.services.arxiv_cache import arxiv_cache
+from app.services.artifact_store import file_digest
+from app.services.figure_derivatives import figure_derivatives
+from app.services.job_manager import job_manager
+from app.services.paper_fingerprints import file_fingerprint, paper_fingerprints
+from app.services.paper_ingest import INGEST_STAGES, ingest_latex_source, run_paper_ingest, stage_ready
+from app.services.pdf_processor import ingest_pdf_file
 from app.services.storage_manager import storage_manager
+from app.services.executor import run_blocking
 from app.auth.dependencies import get_current_user
 # Configure logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Keep in-memory storage for backward compatibility, but use persistent storage as the primary source
+BULK_MAX_PAPERS = int(os.getenv("ARXIV_BULK_MAX_PAPERS", "1000"))
+
+# Shared papers repository (visible to every worker process)
 papers_storage = storage_manager.get_all_papers()
 
-# Helper function to save paper info to both memory and persistent storage
+# Helper function to save paper info to persistent storage
 def save_paper_info(paper_id: str, info: dict):
-    papers_storage[paper_id] = info
     storage_manager.save_paper(paper_id, info)
 
-@router.post("/upload-zip", response_model=PaperResponse)
-async def upload_zip_file(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    """Upload and extract a ZIP file containing LaTeX source."""
-    if not file.filename.endswith('.zip'):
-        raise HTTPException(status_code=400, detail="Only ZIP files are allowed")
-    
-    paper_id = str(uuid.uuid4())
-    temp_dir = f"temp/papers/{paper_id}"
-    os.makedirs(temp_dir, exist_ok=True)
-    
+def save_upload_file(file: UploadFile, destination: str):
+    """Copy an uploaded file to disk."""
+    with open(destination, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+def extract_zip_file(zip_path: str, extract_dir: str):
+    """Extract a ZIP archive into a directory."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(extract_dir)
+
+def zip_directory(source_dir: str, zip_path: str):
+    """Write every file under source_dir into a ZIP archive."""
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(source_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                arc_name = os.path.relpath(file_path, source_dir)
+                zipf.write(file_path, arc_name)
+
+def start_background_ingest(paper_id: str, source_type: str, path: str, paper_info: dict) -> JSONResponse:
+    """Store a placeholder record for an upload and queue the job that fills it in."""
+    paper_info.update({
+        "status": "processing",
+        "source_type": source_type,
+        "image_files": [],
+        "ingest": {"ready": [], "error": None},
+    })
+    save_paper_info(paper_id, paper_info)
+    # Not throttled: the user is waiting on this, and its work is bounded by the process pool
+    job = job_manager.submit(
+        "ingest", paper_id, run_paper_ingest, paper_id, source_type, path,
+        stages=INGEST_STAGES, throttled=False
+    )
+    papers_storage.merge(paper_id, ingest_job_id=job["job_id"])
+    return JSONResponse(status_code=202, content={"paper_id": paper_id, "status": "processing", "job": job})
+
+def fork_existing_paper(fingerprint: str):
+    """
+    A private copy of the paper already ingested from the same source, as an
+    upload response, or None when there is none to copy.
+    """
+    paper_id = paper_fingerprints.find(fingerprint)
+    forked = paper_fingerprints.fork(paper_id) if paper_id else None
+    if forked is None:
+        return None
+    new_id, paper_info = forked
+    return PaperResponse(
+        paper_id=new_id,
+        metadata=PaperMetadata(**paper_info["metadata"]),
+        image_files=[os.path.basename(f) for f in paper_info.get("image_files", [])],
+        tex_file_path=paper_info["tex_file_path"],
+        status="processed",
+        reused=True
+    )
+
+def find_pdf_files(source_dir: str) -> list:
+    """List PDF files under a source directory."""
+    pdf_files = []
+    for root, dirs, files in os.walk(source_dir):
+        for file in files:
+            if file.lower().endswith('.pdf'):
+                pdf_files.append(os.path.join(root, file))
+    return pdf_files
+
+async def process_zip_upload(paper_id: str, zip_path: str, background: bool = False, reuse_existing: bool = True):
+    """
+    Extract and analyze a ZIP saved in temp/papers/<paper_id>/.
+
+    Shared by the multipart upload and completed resumable uploads. If the
+    same archive was ingested before, the new copy is dropped and a fork of
+    the earlier paper is returned (unless ``reuse_existing`` is false).
+    """
+    temp_dir = os.path.dirname(zip_path)
     try:
-        # Save uploaded ZIP file
-        zip_path = os.path.join(temp_dir, file.filename)
-        with open(zip_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        fingerprint = file_fingerprint(await run_blocking(file_digest, zip_path))
+        reused = await run_blocking(fork_existing_paper, fingerprint) if reuse_existing else None
+        if reused:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return reused
         
-        # Extract ZIP file
+        # Extract the archive off the event loop
         extract_dir = os.path.join(temp_dir, "source")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-        
-        # Find main .tex file
-        tex_file_path = find_tex_file(extract_dir)
+        await run_blocking(extract_zip_file, zip_path, extract_dir)
         
-        # Extract metadata
-        metadata = extract_paper_metadata(tex_file_path)
+        if background:
+            response = start_background_ingest(paper_id, "latex", extract_dir, {
+                "metadata": {"title": Path(zip_path).stem, "authors": "", "date": ""},
+                "source_dir": extract_dir,
+                "zip_file_path": zip_path,
+            })
+            paper_fingerprints.remember(fingerprint, paper_id)
+            return response
         
-        # Find images
-        image_refs = find_image_references(tex_file_path)
-        image_files = find_image_files(extract_dir, image_refs)
+        # Main .tex file, metadata, rendered figures and their variants
+        processed = await ingest_latex_source(paper_id, extract_dir)
+        tex_file_path = processed["tex_file_path"]
+        metadata = processed["metadata"]
+        image_files = processed["image_files"]
         
         # Store paper info
         paper_info = {
@@ -64,11 +139,13 @@ async def upload_zip_file(file: UploadFile = File(...), current_user: dict = Dep
             "tex_file_path": tex_file_path,
             "source_dir": extract_dir,
             "image_files": image_files,
+            "image_variants": processed["image_variants"],
             "zip_file_path": zip_path,  # Store original ZIP path
             "status": "processed",
             "source_type": "latex"
         }
         save_paper_info(paper_id, paper_info)
+        paper_fingerprints.remember(fingerprint, paper_id)
         
         logger.info(f"Processed ZIP file for paper {paper_id}")
         
@@ -85,57 +162,65 @@ async def upload_zip_file(file: UploadFile = File(...), current_user: dict = Dep
         shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"Error processing ZIP file: {str(e)}")
 
+@router.post("/upload-zip", response_model=PaperResponse)
+async def upload_zip_file(file: UploadFile = File(...), background: bool = False, reuse_existing: bool = True,
+                          current_user: dict = Depends(get_current_user)):
+    """Upload and extract a ZIP file containing LaTeX source. With ``background=true`` analysis runs as a job; poll ``/{paper_id}/status``. An archive uploaded before returns a copy of the existing paper."""
+    if not file.filename.endswith('.zip'):
+        raise HTTPException(status_code=400, detail="Only ZIP files are allowed")
+    
+    paper_id = str(uuid.uuid4())
+    temp_dir = f"temp/papers/{paper_id}"
+    os.makedirs(temp_dir, exist_ok=True)
+    
+    # Save uploaded ZIP file
+    zip_path = os.path.join(temp_dir, file.filename)
+    try:
+        await run_blocking(save_upload_file, file, zip_path)
+    except Exception as e:
+        logger.error(f"Error saving ZIP file: {str(e)}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Error processing ZIP file: {str(e)}")
+    
+    return await process_zip_upload(paper_id, zip_path, background, reuse_existing)
+
 @router.post("/scrape-arxiv", response_model=PaperResponse)
 async def scrape_arxiv(request: ArxivRequest):
     """Scrape LaTeX source from arXiv URL."""
-    scraper = ArxivScraper()
-    paper_id = str(uuid.uuid4())
-    
     try:
-        # Download and extract source
-        extracted_dir = scraper.download_source(request.arxiv_url)
-        
-        # Get metadata from arXiv page
-        arxiv_metadata = scraper.get_paper_metadata(request.arxiv_url)
-        
-        # Find main .tex file
-        tex_file_path = find_tex_file(extracted_dir)
-        
-        # Extract metadata from LaTeX file and merge with arXiv metadata
-        latex_metadata = extract_paper_metadata(tex_file_path)
-        metadata = {**latex_metadata, **arxiv_metadata}
-        metadata["arxiv_id"] = scraper.extract_arxiv_id(request.arxiv_url)
-        
-        # Find images
-        image_refs = find_image_references(tex_file_path)
-        image_files = find_image_files(extracted_dir, image_refs)
-        
-        # Store paper info
-        paper_info = {
-            "metadata": metadata,
-            "tex_file_path": tex_file_path,
-            "source_dir": extracted_dir,
-            "image_files": image_files,
-            "arxiv_url": request.arxiv_url,  # Store arXiv URL
-            "status": "processed",
-            "source_type": "arxiv"
-        }
-        save_paper_info(paper_id, paper_info)
-        
-        logger.info(f"Processed arXiv paper {paper_id}")
+        result = await ingest_arxiv_paper(request.arxiv_url, reuse_existing=request.reuse_existing)
+        paper_info = result["paper_info"]
         
         return PaperResponse(
-            paper_id=paper_id,
-            metadata=PaperMetadata(**metadata),
-            image_files=[os.path.basename(f) for f in image_files],
-            tex_file_path=tex_file_path,
-            status="processed"
+            paper_id=result["paper_id"],
+            metadata=PaperMetadata(**paper_info["metadata"]),
+            image_files=[os.path.basename(f) for f in paper_info["image_files"]],
+            tex_file_path=paper_info["tex_file_path"],
+            status="processed",
+            reused=result["reused"]
         )
         
     except Exception as e:
         logger.error(f"Error scraping arXiv: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error scraping arXiv: {str(e)}")
 
+@router.post("/scrape-arxiv/bulk")
+async def scrape_arxiv_bulk(request: BulkArxivRequest):
+    """Scrape many arXiv papers, streaming one NDJSON line per paper as it finishes."""
+    if not request.arxiv_urls:
+        raise HTTPException(status_code=400, detail="arxiv_urls must not be empty")
+    if len(request.arxiv_urls) > BULK_MAX_PAPERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BULK_MAX_PAPERS} papers can be ingested per request"
+        )
+    
+    async def results():
+        async for result in ingest_arxiv_papers(request.arxiv_urls, request.concurrency, request.reuse_existing):
+            yield json.dumps(result, default=str) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.get("/{paper_id}/download-source")
 async def download_paper_source(paper_id: str):
     """Download the original paper source (ZIP or raw files)."""
@@ -162,12 +247,7 @@ async def download_paper_source(paper_id: str):
     os.makedirs(os.path.dirname(temp_zip), exist_ok=True)
     
     try:
-        with zipfile.ZipFile(temp_zip, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arc_name = os.path.relpath(file_path, source_dir)
-                    zipf.write(file_path, arc_name)
+        await run_blocking(zip_directory, source_dir, temp_zip)
         
         return FileResponse(
             temp_zip,
@@ -188,12 +268,7 @@ async def download_paper_pdf(paper_id: str):
     
     # Look for PDF in source directory
     source_dir = paper_info["source_dir"]
-    pdf_files = []
-    
-    for root, dirs, files in os.walk(source_dir):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(root, file))
+    pdf_files = await run_blocking(find_pdf_files, source_dir)
     
     if pdf_files:
         # Return the first PDF found
@@ -207,23 +282,13 @@ async def download_paper_pdf(paper_id: str):
     # If no PDF in source, try to download from arXiv if available
     if "arxiv_url" in paper_info:
         try:
-            import requests
-            arxiv_id = paper_info["metadata"].get("arxiv_id")
-            if arxiv_id:
-                pdf_url = f"https://arxiv.org/pdf/{arxiv_id}.pdf"
-                response = requests.get(pdf_url, stream=True)
-                response.raise_for_status()
-                
-                # Save PDF temporarily
-                temp_pdf = f"temp/downloads/paper_{paper_id}.pdf"
-                os.makedirs(os.path.dirname(temp_pdf), exist_ok=True)
-                
-                with open(temp_pdf, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
+            arxiv_ref = paper_info["arxiv_url"] or paper_info["metadata"].get("arxiv_id")
+            if arxiv_ref:
+                # Served from the shared arXiv cache
+                cached_pdf = await run_blocking(arxiv_cache.get_pdf, arxiv_ref)
                 
                 return FileResponse(
-                    temp_pdf,
+                    cached_pdf,
                     media_type='application/pdf',
                     filename=f"paper_{paper_id}.pdf"
                 )
@@ -232,16 +297,41 @@ async def download_paper_pdf(paper_id: str):
     
     raise HTTPException(status_code=404, detail="PDF not found for this paper")
 
+@router.get("/{paper_id}/status")
+async def get_paper_status(paper_id: str):
+    """
+    Ingestion state of a paper: which stages ("metadata", "text", "images")
+    are ready, plus whatever they produced so far and the ingest job's progress.
+    """
+    paper_info = storage_manager.get_paper(paper_id)
+    if not paper_info:
+        raise HTTPException(status_code=404, detail="Paper not found")
+    
+    ingest = paper_info.get("ingest") or {"ready": list(INGEST_STAGES), "error": None}
+    job = job_manager.get_job(paper_info["ingest_job_id"]) if paper_info.get("ingest_job_id") else None
+    status = paper_info.get("status", "processed")
+    error = ingest.get("error")
+    if status == "processing" and job and job["status"] == "failed":
+        # The job died without updating the paper (e.g. server restart)
+        status, error = "failed", job.get("error")
+    
+    return {
+        "paper_id": paper_id,
+        "status": status,
+        "ready": ingest["ready"],
+        "error": error,
+        "metadata": paper_info.get("metadata") if stage_ready(paper_info, "metadata") else None,
+        "image_files": [os.path.basename(f) for f in paper_info.get("image_files", [])]
+        if stage_ready(paper_info, "images") else None,
+        "job": job,
+    }
+
 @router.get("/{paper_id}/metadata", response_model=PaperMetadata)
 async def get_metadata(paper_id: str):
     """Get paper metadata."""
-    # Try to get from storage manager first
     paper_info = storage_manager.get_paper(paper_id)
     if not paper_info:
-        # Fall back to in-memory storage
-        if paper_id not in papers_storage:
-            raise HTTPException(status_code=404, detail="Paper not found")
-        paper_info = papers_storage[paper_id]
+        raise HTTPException(status_code=404, detail="Paper not found")
     
     metadata = paper_info["metadata"]
     return PaperMetadata(**metadata)
@@ -252,32 +342,42 @@ async def update_metadata(paper_id: str, metadata: PaperMetadata):
     if paper_id not in papers_storage:
         raise HTTPException(status_code=404, detail="Paper not found")
     
-    # Pydantic v2: use model_dump()
-    papers_storage[paper_id]["metadata"] = metadata.model_dump()
+    # Only the metadata field: a background ingest may be merging its stages into the record
+    papers_storage.merge(paper_id, metadata=metadata.model_dump())
     return metadata
 
-@router.post("/upload-pdf", response_model=PaperResponse)
-async def upload_pdf_file(file: UploadFile = File(...)):
-    """Upload and process a PDF file of a research paper."""
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-    
-    paper_id = str(uuid.uuid4())
-    temp_dir = f"temp/papers/{paper_id}"
-    os.makedirs(temp_dir, exist_ok=True)
-    
+async def process_pdf_upload(paper_id: str, pdf_path: str, background: bool = False, reuse_existing: bool = True):
+    """
+    Extract text and images from a PDF saved in temp/papers/<paper_id>/.
+
+    Shared by the multipart upload and completed resumable uploads. If the
+    same PDF was ingested before, the new copy is dropped and a fork of the
+    earlier paper is returned (unless ``reuse_existing`` is false).
+    """
+    temp_dir = os.path.dirname(pdf_path)
     try:
-        # Save uploaded PDF file
-        pdf_path = os.path.join(temp_dir, file.filename)
-        with open(pdf_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        fingerprint = file_fingerprint(await run_blocking(file_digest, pdf_path))
+        reused = await run_blocking(fork_existing_paper, fingerprint) if reuse_existing else None
+        if reused:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return reused
         
-        # Process the PDF file
-        result = process_pdf_file(pdf_path, paper_id)
+        if background:
+            response = start_background_ingest(paper_id, "pdf", pdf_path, {
+                "metadata": {"title": Path(pdf_path).stem, "authors": "", "date": ""},
+                "source_dir": os.path.join(temp_dir, "source"),
+            })
+            paper_fingerprints.remember(fingerprint, paper_id)
+            return response
+        
+        # Extract text and images, with page ranges spread across worker processes
+        result = await ingest_pdf_file(pdf_path, paper_id)
         
         # Store paper info - result now contains tex_file_path for compatibility
         result["source_type"] = "pdf"  # Add source type
+        result["image_variants"] = await figure_derivatives.generate(paper_id, result["image_files"])
         save_paper_info(paper_id, result)
+        paper_fingerprints.remember(fingerprint, paper_id)
         
         # Log the storage info for debugging
         logger.info(f"Paper {paper_id} processed and stored with keys: {list(result.keys())}")
@@ -295,6 +395,27 @@ async def upload_pdf_file(file: UploadFile = File(...)):
         shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"Error processing PDF file: {str(e)}")
 
+@router.post("/upload-pdf", response_model=PaperResponse)
+async def upload_pdf_file(file: UploadFile = File(...), background: bool = False, reuse_existing: bool = True):
+    """Upload and process a PDF file of a research paper. With ``background=true`` extraction runs as a job; poll ``/{paper_id}/status``. A PDF uploaded before returns a copy of the existing paper."""
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    
+    paper_id = str(uuid.uuid4())
+    temp_dir = f"temp/papers/{paper_id}"
+    os.makedirs(temp_dir, exist_ok=True)
+    
+    # Save uploaded PDF file
+    pdf_path = os.path.join(temp_dir, file.filename)
+    try:
+        await run_blocking(save_upload_file, file, pdf_path)
+    except Exception as e:
+        logger.error(f"Error saving PDF file: {str(e)}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Error processing PDF file: {str(e)}")
+    
+    return await process_pdf_upload(paper_id, pdf_path, background, reuse_existing)
+
 @router.get("/debug/storage")
 async def debug_paper_storage():
     """Debug endpoint to check papers_storage content."""
@@ -14,13 +14,15 @@ import logging
 from app.services.podcast_generator import podcast_generator
 from app.services.bhashini_service import bhashini_service
 from app.routes.papers import papers_storage
+from app.services.executor import run_blocking
+from app.services.repository import Repository
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# In-memory storage for podcast data
-podcast_storage = {}
+# Podcast records (shared across workers)
+podcast_storage = Repository("podcasts")
 
 class PodcastRequest(BaseModel):
     num_exchanges: Optional[int] = 8
@@ -73,7 +75,8 @@ async def generate_podcast_script(paper_id: str, request: PodcastRequest):
         
         # Generate dialogue
         try:
-            dialogue = podcast_generator.generate_podcast_script(
+            dialogue = await run_blocking(
+                podcast_generator.generate_podcast_script,
                 paper_content=paper_content,
                 metadata=metadata,
                 num_exchanges=request.num_exchanges,
@@ -186,7 +189,7 @@ async def generate_podcast_audio(paper_id: str, background_tasks: BackgroundTask
             logger.info(f"Generating audio {i+1}/{len(dialogue)}: {speaker}")
             
             # Call Sarvam TTS with language parameter
-            audio_base64 = bhashini_service.text_to_speech(text, gender, language)
+            audio_base64 = await run_blocking(bhashini_service.text_to_speech, text, gender, language)
             
             if audio_base64:
                 # Save base64 audio directly to file
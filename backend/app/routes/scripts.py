@@ -17,9 +17,11 @@ from app.services.script_generator import (
     generate_all_bullet_points_with_gemini,
     extract_paper_metadata
 )
-from app.routes.papers import papers_storage
 from app.routes.api_keys import get_api_keys
 from app.services.storage_manager import storage_manager
+from app.services.repository import Repository
+from app.services.executor import run_blocking, run_cpu_bound
+from app.services.paper_ingest import stage_ready
 from app.auth.dependencies import get_current_user
 
 router = APIRouter()
@@ -28,8 +30,8 @@ router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Enhanced storage for scripts with bullet points
-scripts_storage = {}
+# Enhanced storage for scripts with bullet points (shared across workers)
+scripts_storage = Repository("scripts")
 
 class ScriptGenerationRequest(BaseModel):
     """Request model for script generation"""
@@ -75,15 +77,17 @@ def save_scripts_to_file(paper_id: str, data: Dict) -> bool:
         return False
 
 def get_or_load_scripts(paper_id: str) -> Dict:
-    """Get scripts from memory or load from file"""
-    if paper_id not in scripts_storage:
-        scripts_storage[paper_id] = load_scripts_from_file(paper_id)
+    """Get scripts from the repository or load from file"""
+    script_data = scripts_storage.get(paper_id)
+    if script_data is None:
+        script_data = load_scripts_from_file(paper_id)
+        scripts_storage[paper_id] = script_data
     
     # Ensure proper structure
-    if "sections" not in scripts_storage[paper_id]:
-        scripts_storage[paper_id]["sections"] = {}
+    if "sections" not in script_data:
+        script_data["sections"] = {}
     
-    return scripts_storage[paper_id]
+    return script_data
 
 @router.post("/{paper_id}/generate", response_model=ScriptResponse)
 async def generate_script(
@@ -94,14 +98,13 @@ async def generate_script(
     """Generate presentation script from paper with bullet points."""
     paper_id_str = str(paper_id)  # Ensure we're using a string for comparison
     
-    # Try to get from storage manager first
     paper_info = storage_manager.get_paper(paper_id_str)
     if not paper_info:
-        # Fall back to in-memory storage
-        if paper_id_str not in papers_storage:
-            logger.error(f"Paper ID {paper_id_str} not found in storage. Available IDs: {list(papers_storage.keys())}")
-            raise HTTPException(status_code=404, detail=f"Paper ID {paper_id_str} not found")
-        paper_info = papers_storage[paper_id_str]
+        logger.error(f"Paper ID {paper_id_str} not found in storage")
+        raise HTTPException(status_code=404, detail=f"Paper ID {paper_id_str} not found")
+    
+    if not stage_ready(paper_info, "text"):
+        raise HTTPException(status_code=409, detail="Paper text is still being extracted")
     
     if not api_keys.get("gemini_key"):
         raise HTTPException(status_code=400, detail="Gemini API key required")
@@ -132,11 +135,13 @@ async def generate_script(
             metadata.get("date", "2024")
         )
         print(f"Generated title introduction: {title_intro}")
-        input_text = extract_text_from_file(file_path)
+        # PDF papers send only their body sections, not references/appendices
+        input_text = await run_cpu_bound(extract_text_from_file, file_path, paper_info.get("sections"))
         input_text = clean_text(input_text)
         
         # Generate full script using Gemini with improved prompts and complexity level
-        full_script = generate_full_script_with_gemini(
+        full_script = await run_blocking(
+            generate_full_script_with_gemini,
             api_keys["gemini_key"], 
             input_text,
             complexity_level=request.complexity_level
@@ -152,7 +157,8 @@ async def generate_script(
         
         # Generate bullet points for all sections with a single prompt
         logger.info(f"Generating bullet points for all sections using single prompt")
-        all_bullet_points = generate_all_bullet_points_with_gemini(
+        all_bullet_points = await run_blocking(
+            generate_all_bullet_points_with_gemini,
             api_keys["gemini_key"],
             cleaned_sections
         )
@@ -179,7 +185,7 @@ async def generate_script(
         scripts_storage[paper_id] = script_data
         
         # Save to file immediately
-        if not save_scripts_to_file(paper_id, script_data):
+        if not await run_blocking(save_scripts_to_file, paper_id, script_data):
             logger.warning(f"Failed to save scripts to file for paper {paper_id}")
         
         # Return only script text for compatibility
@@ -260,7 +266,7 @@ async def update_sections(paper_id: str, request: ScriptUpdateRequest):
         # Save to memory and file
         scripts_storage[paper_id] = script_data
         
-        if not save_scripts_to_file(paper_id, script_data):
+        if not await run_blocking(save_scripts_to_file, paper_id, script_data):
             raise HTTPException(status_code=500, detail="Failed to save scripts to file")
         
         logger.info(f"Successfully updated sections: {list(updated_sections.keys())}")
@@ -297,7 +303,7 @@ async def assign_image_to_section(paper_id: str, section_name: str, image_name:
         # Save to memory and file
         scripts_storage[paper_id] = script_data
         
-        if not save_scripts_to_file(paper_id, script_data):
+        if not await run_blocking(save_scripts_to_file, paper_id, script_data):
             raise HTTPException(status_code=500, detail="Failed to save scripts to file")
         
         action = "assigned" if image_name else "removed"
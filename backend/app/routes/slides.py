@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pathlib import Path
 import os
 import shutil
@@ -8,16 +8,126 @@ from app.models.request_models import SlideResponse
 from app.routes.papers import papers_storage
 from app.routes.scripts import scripts_storage
 from app.services.beamer_generator import create_beamer_presentation
+from app.services.job_manager import job_manager, JobProgress
+from app.services.executor import run_blocking, call_cpu_bound
+from app.services.repository import Repository
+from app.services.artifact_store import artifact_store, derivation_key, file_digest
+from app.services.figure_derivatives import figure_derivatives
 from app.utils.latex_to_images import compile_latex, convert_pdf_to_images
 
 router = APIRouter()
 
-# In-memory storage for slides
-slides_storage = {}
+# Slide records (shared across workers)
+slides_storage = Repository("slides")
+
+def run_slide_generation(
+    paper_id: str,
+    paper_info: dict,
+    scripts_info: dict,
+    progress: JobProgress = JobProgress()
+) -> dict:
+    """Build the Beamer deck for a paper, compile it and rasterize the slides."""
+    # Get image assignments
+    image_assignments = {}
+    for section_name, section_data in scripts_info.get("sections", {}).items():
+        if section_data.get("assigned_image"):
+            image_assignments[section_name] = section_data["assigned_image"]
+    
+    # Create Beamer presentation with bullet points (this writes a .tex file)
+    progress.start_stage("latex")
+    latex_file = create_beamer_presentation(
+        paper_id,
+        scripts_info,
+        paper_info["metadata"],
+        image_assignments
+    )
+    # Use the directory where the .tex was generated as the LaTeX working directory
+    latex_dir = os.path.dirname(latex_file)
+
+    # Ensure theme files and images are available relative to the .tex file
+    theme_files = copy_beamer_theme_files(latex_dir)
+    deck_images = copy_paper_images(paper_info.get("image_files", []), latex_dir, paper_info)
+
+    slides_output_dir = f"temp/slides/{paper_id}"
+    slides_images_dir = os.path.join(slides_output_dir, "images")
+    Path(slides_output_dir).mkdir(parents=True, exist_ok=True)
+    pdf_target = os.path.splitext(latex_file)[0] + ".pdf"
+
+    # Same LaTeX source, theme and figures -> same deck; reuse it instead of recompiling.
+    # The figures are the copies pdflatex sees, i.e. the slide-sized variants.
+    with open(latex_file, 'r', encoding='utf-8') as f:
+        latex_source = f.read()
+    render_key = derivation_key(
+        "slides",
+        latex_source,
+        sorted((os.path.basename(p), file_digest(p)) for p in theme_files + deck_images),
+        300
+    )
+    cached = artifact_store.lookup(render_key)
+
+    if cached:
+        progress.start_stage("compile", "Reusing previously compiled slides")
+        try:
+            pdf_path = artifact_store.materialize(cached["pdf"], pdf_target)
+            progress.start_stage("rasterize")
+            shutil.rmtree(slides_images_dir, ignore_errors=True)
+            image_paths = [
+                artifact_store.materialize(digest, os.path.join(slides_images_dir, f"slide_{i:03d}.png"))
+                for i, digest in enumerate(cached["images"])
+            ]
+        except FileNotFoundError:
+            # A blob was evicted after lookup(); compile the deck again
+            cached = None
+
+    if not cached:
+        # Compile LaTeX to PDF in the same directory as the .tex
+        progress.start_stage("compile")
+        artifact_store.release(pdf_target)
+        pdf_path = compile_latex(latex_file, latex_dir)
+        
+        if not pdf_path:
+            raise Exception("Failed to compile LaTeX to PDF")
+        
+        # Convert PDF to images in a clean slides output directory
+        progress.start_stage("rasterize")
+        shutil.rmtree(slides_images_dir, ignore_errors=True)
+        image_paths = call_cpu_bound(convert_pdf_to_images, pdf_path, slides_output_dir, dpi=300)
+        
+        if not image_paths:
+            raise Exception("Failed to convert PDF to images")
+
+    if cached:
+        artifact_store.record_manifest(
+            paper_id, "slides",
+            {pdf_path: cached["pdf"], **dict(zip(image_paths, cached["images"]))}
+        )
+    else:
+        # Identical slides (title cards, section dividers) are stored once
+        stored = artifact_store.ingest_files(paper_id, "slides", [pdf_path] + image_paths)
+        if len(stored) == len(image_paths) + 1:
+            artifact_store.remember(render_key, {
+                "pdf": stored[pdf_path],
+                "images": [stored[p] for p in image_paths]
+            })
+    
+    # Store slide info
+    slides_storage[paper_id] = {
+        "pdf_path": pdf_path,
+        "image_paths": image_paths,
+        "latex_path": latex_file,
+        "output_dir": slides_output_dir,
+        "status": "generated"
+    }
+    
+    return {
+        "pdf_path": pdf_path,
+        "image_paths": [f"/api/slides/{paper_id}/{os.path.basename(p)}" for p in image_paths],
+        "paper_id": paper_id
+    }
 
 @router.post("/{paper_id}/generate", response_model=SlideResponse)
-async def generate_slides(paper_id: str):
-    """Generate slides from scripts with bullet points."""
+async def generate_slides(paper_id: str, background: bool = False):
+    """Generate slides from scripts with bullet points. With ``background=true`` a job is queued and its ID returned."""
     
     if paper_id not in papers_storage:
         raise HTTPException(status_code=404, detail="Paper not found")
@@ -31,66 +141,28 @@ async def generate_slides(paper_id: str):
                 scripts_storage[paper_id] = json.load(f)
         else:
             raise HTTPException(status_code=404, detail="Scripts not generated yet")
-    
-    try:
-        paper_info = papers_storage[paper_id]
-        scripts_info = scripts_storage[paper_id]
-        
-        # Get image assignments
-        image_assignments = {}
-        for section_name, section_data in scripts_info.get("sections", {}).items():
-            if section_data.get("assigned_image"):
-                image_assignments[section_name] = section_data["assigned_image"]
-        
-        # Create Beamer presentation with bullet points (this writes a .tex file)
-        latex_file = create_beamer_presentation(
-            paper_id,
-            scripts_info,
-            paper_info["metadata"],
-            image_assignments
-        )
-        # Use the directory where the .tex was generated as the LaTeX working directory
-        latex_dir = os.path.dirname(latex_file)
 
-        # Ensure theme files and images are available relative to the .tex file
-        copy_beamer_theme_files(latex_dir)
-        copy_paper_images(paper_info.get("image_files", []), latex_dir)
+    paper_info = papers_storage[paper_id]
+    scripts_info = scripts_storage[paper_id]
 
-        # Compile LaTeX to PDF in the same directory as the .tex
-        pdf_path = compile_latex(latex_file, latex_dir)
-        
-        if not pdf_path:
-            raise Exception("Failed to compile LaTeX to PDF")
-        
-        # Convert PDF to images in a clean slides output directory
-        slides_output_dir = f"temp/slides/{paper_id}"
-        Path(slides_output_dir).mkdir(parents=True, exist_ok=True)
-        image_paths = convert_pdf_to_images(pdf_path, slides_output_dir, dpi=300)
-        
-        if not image_paths:
-            raise Exception("Failed to convert PDF to images")
-        
-        # Store slide info
-        slides_storage[paper_id] = {
-            "pdf_path": pdf_path,
-            "image_paths": image_paths,
-            "latex_path": latex_file,
-            "output_dir": slides_output_dir,
-            "status": "generated"
-        }
-        
-        return SlideResponse(
-            pdf_path=pdf_path,
-            image_paths=[f"/api/slides/{paper_id}/{os.path.basename(p)}" for p in image_paths],
-            paper_id=paper_id
+    if background:
+        job = job_manager.submit(
+            "slides", paper_id, run_slide_generation,
+            paper_id, paper_info, scripts_info,
+            stages=["latex", "compile", "rasterize"]
         )
+        return JSONResponse(status_code=202, content=job)
+    
+    try:
+        result = await run_blocking(run_slide_generation, paper_id, paper_info, scripts_info)
+        return SlideResponse(**result)
         
     except Exception as e:
         print(f"Error generating slides: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating slides: {str(e)}")
 
-def copy_beamer_theme_files(output_dir: str):
-    """Copy Beamer theme files to output directory."""
+def copy_beamer_theme_files(output_dir: str) -> list:
+    """Copy Beamer theme files to output directory; returns the copies."""
     theme_files = [
         'beamerthemeSimpleDarkBlue.sty',
         'beamerfontthemeSimpleDarkBlue.sty',
@@ -105,6 +177,7 @@ def copy_beamer_theme_files(output_dir: str):
         '../latex_template'
     ]
     
+    copied = []
     for theme_path in theme_paths:
         if os.path.exists(theme_path):
             for theme_file in theme_files:
@@ -112,19 +185,29 @@ def copy_beamer_theme_files(output_dir: str):
                 if os.path.exists(source_file):
                     dest_file = os.path.join(output_dir, theme_file)
                     shutil.copy2(source_file, dest_file)
+                    copied.append(dest_file)
                     print(f"Copied theme file: {theme_file}")
             break
+    return copied
+
+def copy_paper_images(image_files: list, output_dir: str, paper_info: dict = None) -> list:
+    """Copy paper images to slides output directory; returns the copies.
 
-def copy_paper_images(image_files: list, output_dir: str):
-    """Copy paper images to slides output directory."""
+    Uses each figure's slide-sized variant when one exists (same file name
+    and format, fewer pixels), so pdflatex does not load full-size figures.
+    """
     images_dir = os.path.join(output_dir, "images")
     os.makedirs(images_dir, exist_ok=True)
     
+    copied = []
     for image_file in image_files:
         if os.path.exists(image_file):
+            source = figure_derivatives.resolve(paper_info or {}, image_file, "slide") or image_file
             dest_path = os.path.join(images_dir, os.path.basename(image_file))
-            shutil.copy2(image_file, dest_path)
+            shutil.copy2(source, dest_path)
+            copied.append(dest_path)
             print(f"Copied image: {os.path.basename(image_file)}")
+    return copied
 
 @router.get("/{paper_id}/download")
 async def download_pdf(paper_id: str):
@@ -0,0 +1,24 @@
+"""
+Storage Routes
+
+Disk usage of the temp/ tree and on-demand garbage collection.
+"""
+from fastapi import APIRouter, Depends
+
+from app.auth.dependencies import get_current_user
+from app.services.executor import run_blocking
+from app.services.temp_gc import temp_gc
+
+router = APIRouter()
+
+
+@router.get("/usage")
+async def get_storage_usage():
+    """Bytes used under temp/, per top-level directory, and the configured budget."""
+    return await run_blocking(temp_gc.disk_usage)
+
+
+@router.post("/gc")
+async def run_garbage_collection(dry_run: bool = False, current_user: dict = Depends(get_current_user)):
+    """Run a collection pass now and report the bytes reclaimed."""
+    return await run_blocking(temp_gc.collect, dry_run)
@@ -0,0 +1,141 @@
+"""
+Resumable Upload Routes
+
+Chunked, resumable uploads for large paper archives and PDFs. The protocol
+is described in app/services/upload_sessions.py. A completed upload goes
+through the same ingest path as ``/api/papers/upload-zip`` and ``/upload-pdf``.
+
+Every route requires a signed-in user, and a session is visible only to the
+user who created it.
+"""
+import os
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+
+from app.auth.dependencies import get_current_user
+from app.models.request_models import UploadCreateRequest
+from app.routes.papers import process_pdf_upload, process_zip_upload
+from app.services.executor import run_blocking
+from app.services.upload_sessions import UploadError, parse_checksum_header, upload_sessions
+
+router = APIRouter()
+
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _http_error(e: UploadError) -> HTTPException:
+    # Offset mismatches tell the client where to resume
+    headers = {"Upload-Offset": str(e.offset)} if e.offset is not None else None
+    return HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+
+
+@router.post("", status_code=201)
+async def create_upload(request: UploadCreateRequest, response: Response,
+                        current_user: dict = Depends(get_current_user)):
+    """Start a resumable upload; returns its ID and the suggested chunk size."""
+    try:
+        session = await run_blocking(
+            upload_sessions.create, request.filename, request.length, request.checksum, current_user["id"]
+        )
+    except UploadError as e:
+        raise _http_error(e)
+    response.headers["Location"] = f"/api/uploads/{session['upload_id']}"
+    return session
+
+
+@router.head("/{upload_id}")
+async def get_upload_offset(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """How many bytes the server has (``Upload-Offset``), to resume after an interruption."""
+    try:
+        session = await run_blocking(upload_sessions.get, upload_id, current_user["id"])
+    except UploadError as e:
+        raise _http_error(e)
+    return Response(status_code=200, headers={
+        "Upload-Offset": str(session["offset"]),
+        "Upload-Length": str(session["length"]),
+        "Cache-Control": "no-store",
+    })
+
+
+@router.get("/{upload_id}")
+async def get_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Upload session state, including the current offset."""
+    try:
+        return await run_blocking(upload_sessions.get, upload_id, current_user["id"])
+    except UploadError as e:
+        raise _http_error(e)
+
+
+@router.patch("/{upload_id}", status_code=204)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+    content_type: Optional[str] = Header(None, alias="Content-Type"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Append the chunk in the request body at ``Upload-Offset``.
+
+    The body is streamed to disk as it arrives. An optional
+    ``Upload-Checksum: sha256 <base64 digest>`` header is verified before the
+    chunk counts; a mismatch answers 460 and the chunk can simply be resent.
+    """
+    if (content_type or "").split(";")[0].strip() != CHUNK_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Chunks must be sent as {CHUNK_CONTENT_TYPE}")
+    try:
+        checksum = parse_checksum_header(upload_checksum)
+        offset = await upload_sessions.write_chunk(
+            upload_id, upload_offset, request.stream(), checksum, current_user["id"]
+        )
+    except UploadError as e:
+        raise _http_error(e)
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+
+@router.delete("/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Abandon an upload and free its disk space."""
+    try:
+        deleted = await run_blocking(upload_sessions.delete, upload_id, current_user["id"])
+    except UploadError as e:
+        raise _http_error(e)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return Response(status_code=204)
+
+
+@router.post("/{upload_id}/complete")
+async def complete_upload(upload_id: str, background: bool = False, reuse_existing: bool = True,
+                          current_user: dict = Depends(get_current_user)):
+    """
+    Verify a finished upload and ingest it as a paper (ZIP of LaTeX source or PDF).
+
+    Answers like ``/api/papers/upload-zip`` / ``/upload-pdf``, including
+    ``background=true`` and ``reuse_existing``. If ingestion fails the upload is kept, so this can
+    be retried without sending the file again.
+    """
+    try:
+        session = await run_blocking(upload_sessions.finish, upload_id, current_user["id"])
+    except UploadError as e:
+        raise _http_error(e)
+
+    extension = os.path.splitext(session["filename"])[1].lower()
+    if extension not in (".zip", ".pdf"):
+        raise HTTPException(
+            status_code=400,
+            detail="Only ZIP and PDF uploads become papers; pass LaTeX files to the mind map endpoint as upload_id"
+        )
+
+    paper_id = str(uuid.uuid4())
+    destination = os.path.join(f"temp/papers/{paper_id}", session["filename"])
+    await run_blocking(upload_sessions.claim, upload_id, destination)
+    if extension == ".zip":
+        result = await process_zip_upload(paper_id, destination, background, reuse_existing)
+    else:
+        result = await process_pdf_upload(paper_id, destination, background, reuse_existing)
+    await run_blocking(upload_sessions.delete, upload_id)
+    return result
@@ -13,17 +13,20 @@ import traceback
 
 from app.routes.api_keys import get_api_keys, rotate_gemini_key
 from app.routes.papers import papers_storage
-from app.services.visual_storytelling_service import generate_visual_storytelling_script, VisualStorytellingService
+from app.services.visual_storytelling_service import generate_visual_storytelling_script, render_scene_cards, VisualStorytellingService
 from app.services.ai_image_generator import generate_images_from_prompts, AIImageGenerator
 from app.services.tts_service import ensure_audio_is_generated
 from app.services.cinematic_video_service import create_visual_storytelling_video
 from app.services.script_generator import extract_text_from_file
+from app.services.executor import run_blocking, run_cpu_bound
+from app.services.paper_ingest import stage_ready
+from app.services.repository import Repository
 from pydantic import BaseModel
 
 router = APIRouter()
 
-# In-memory storage for visual storytelling data
-visual_storytelling_storage = {}
+# Visual storytelling records (shared across workers)
+visual_storytelling_storage = Repository("visual_storytelling")
 
 
 class VisualStorytellingRequest(BaseModel):
@@ -73,6 +76,9 @@ async def generate_storytelling_script(
     if not api_keys.get("gemini_key"):
         raise HTTPException(status_code=400, detail="Google Gemini API key required")
     
+    if not stage_ready(papers_storage[paper_id], "text"):
+        raise HTTPException(status_code=409, detail="Paper text is still being extracted")
+    
     try:
         paper_info = papers_storage[paper_id]
         
@@ -81,7 +87,7 @@ async def generate_storytelling_script(
         if not tex_file_path or not os.path.exists(tex_file_path):
             raise HTTPException(status_code=404, detail="Paper text file not found")
         
-        paper_content = extract_text_from_file(tex_file_path)
+        paper_content = await run_cpu_bound(extract_text_from_file, tex_file_path, paper_info.get("sections"))
         
         if not paper_content:
             raise HTTPException(status_code=400, detail="Could not extract paper content")
@@ -94,7 +100,8 @@ async def generate_storytelling_script(
         
         for attempt in range(max_retries):
             try:
-                script_data = generate_visual_storytelling_script(
+                script_data = await run_blocking(
+                    generate_visual_storytelling_script,
                     api_key=api_keys["gemini_key"],
                     paper_content=paper_content,
                     complexity_level=request.complexity_level,
@@ -143,12 +150,12 @@ async def generate_storytelling_script(
             json.dump(script_data, f, indent=2, ensure_ascii=False)
         
         # Update storage
-        if paper_id not in visual_storytelling_storage:
-            visual_storytelling_storage[paper_id] = {}
-        
-        visual_storytelling_storage[paper_id]["script_data"] = script_data
-        visual_storytelling_storage[paper_id]["script_file"] = script_file
-        visual_storytelling_storage[paper_id]["request_params"] = request.dict()
+        visual_storytelling_storage.merge(
+            paper_id,
+            script_data=script_data,
+            script_file=script_file,
+            request_params=request.dict()
+        )
         
         print(f"Visual storytelling script generated: {len(script_data.get('scenes', []))} scenes")
         
@@ -222,99 +229,13 @@ async def generate_storytelling_images(
         image_dir = f"temp/visual_storytelling/{paper_id}/images"
         Path(image_dir).mkdir(parents=True, exist_ok=True)
         
-        # Create simple text cards for each scene
-        from PIL import Image, ImageDraw, ImageFont
-        
-        image_paths = []
-        for i, scene in enumerate(scenes, 1):
-            output_path = os.path.join(image_dir, f"scene_{i:03d}.png")
-            
-            # Create image
-            width, height = 1920, 1080
-            img = Image.new('RGB', (width, height))
-            draw = ImageDraw.Draw(img)
-            
-            # Generate color based on scene number
-            hue = (i * 30) % 360
-            if hue < 120:
-                colors = [(30, 30, 60), (60, 80, 180), (100, 120, 255)]
-            elif hue < 240:
-                colors = [(20, 60, 80), (40, 120, 140), (60, 180, 200)]
-            else:
-                colors = [(50, 20, 60), (120, 60, 140), (180, 100, 200)]
-            
-            # Create gradient
-            for y in range(height):
-                progress = y / height
-                if progress < 0.5:
-                    local_progress = progress * 2
-                    r = int(colors[0][0] + (colors[1][0] - colors[0][0]) * local_progress)
-                    g = int(colors[0][1] + (colors[1][1] - colors[0][1]) * local_progress)
-                    b = int(colors[0][2] + (colors[1][2] - colors[0][2]) * local_progress)
-                else:
-                    local_progress = (progress - 0.5) * 2
-                    r = int(colors[1][0] + (colors[2][0] - colors[1][0]) * local_progress)
-                    g = int(colors[1][1] + (colors[2][1] - colors[1][1]) * local_progress)
-                    b = int(colors[1][2] + (colors[2][2] - colors[1][2]) * local_progress)
-                draw.rectangle([(0, y), (width, y + 1)], fill=(r, g, b))
-            
-            # Add scene number at top
-            try:
-                font_large = ImageFont.truetype("arial.ttf", 80)
-                font_medium = ImageFont.truetype("arial.ttf", 50)
-            except:
-                font_large = ImageFont.load_default()
-                font_medium = ImageFont.load_default()
-            
-            # Scene number
-            scene_text = f"Scene {i}"
-            bbox = draw.textbbox((0, 0), scene_text, font=font_large)
-            text_width = bbox[2] - bbox[0]
-            x = (width - text_width) // 2
-            draw.text((x, 150), scene_text, fill=(255, 255, 255), font=font_large)
-            
-            # Narration text (word wrapped)
-            narration = scene.get("narration", "")
-            words = narration.split()
-            lines = []
-            current_line = []
-            max_width = width - 200
-            
-            for word in words:
-                current_line.append(word)
-                test_line = ' '.join(current_line)
-                bbox = draw.textbbox((0, 0), test_line, font=font_medium)
-                if bbox[2] - bbox[0] > max_width:
-                    if len(current_line) > 1:
-                        current_line.pop()
-                        lines.append(' '.join(current_line))
-                        current_line = [word]
-                    else:
-                        lines.append(word)
-                        current_line = []
-            
-            if current_line:
-                lines.append(' '.join(current_line))
-            
-            # Draw text lines
-            y_offset = 300
-            line_height = 70
-            for line in lines[:8]:  # Max 8 lines
-                bbox = draw.textbbox((0, 0), line, font=font_medium)
-                line_width = bbox[2] - bbox[0]
-                x = (width - line_width) // 2
-                draw.text((x, y_offset), line, fill=(255, 255, 255), font=font_medium)
-                y_offset += line_height
-            
-            img.save(output_path, 'PNG')
-            image_paths.append(output_path)
-            print(f"Generated text card {i}/{len(scenes)}")
+        # Render the cards in a worker process
+        image_paths = await run_cpu_bound(render_scene_cards, scenes, image_dir)
         
         print(f"✓ Created {len(image_paths)} text-based scene cards")
         
         # Store image paths
-        visual_storytelling_storage[paper_id]["image_paths"] = image_paths
-        visual_storytelling_storage[paper_id]["image_dir"] = image_dir
+        visual_storytelling_storage.merge(paper_id, image_paths=image_paths, image_dir=image_dir)
         
         print(f"Generated {len(image_paths)} images")
         
@@ -390,7 +311,7 @@ async def generate_storytelling_audio(
         
         # Test connection
         print("Testing Sarvam TTS connection...")
-        if not tts_client.test_connection():
+        if not await run_blocking(tts_client.test_connection):
             raise HTTPException(
                 status_code=500, 
                 detail="Cannot connect to Sarvam TTS API. Please check your API key and try again."
@@ -422,7 +343,8 @@ async def generate_storytelling_audio(
             print(f"Generating audio for scene {i+1}/{len(scenes)}: {len(cleaned_narration)} chars")
             
             try:
-                success = tts_client.synthesize_long_text(
+                success = await run_blocking(
+                    tts_client.synthesize_long_text,
                     text=cleaned_narration,
                     output_path=audio_path,
                     target_language='en-IN',
@@ -445,8 +367,7 @@ async def generate_storytelling_audio(
             raise ValueError("No audio files were generated successfully. Check Sarvam API key and quota.")
         
         # Store audio paths
-        visual_storytelling_storage[paper_id]["audio_paths"] = audio_paths
-        visual_storytelling_storage[paper_id]["audio_dir"] = audio_dir
+        visual_storytelling_storage.merge(paper_id, audio_paths=audio_paths, audio_dir=audio_dir)
         
         print(f"✓ Generated {len(audio_paths)} audio files successfully")
         
@@ -484,17 +405,19 @@ async def generate_storytelling_video(
         else:
             raise HTTPException(status_code=404, detail="Storytelling data not found")
     
+    storytelling_info = visual_storytelling_storage[paper_id]
+    
     # Check if images and audio exist
-    if "image_paths" not in visual_storytelling_storage[paper_id]:
+    if "image_paths" not in storytelling_info:
         raise HTTPException(status_code=400, detail="Images not generated. Generate images first.")
     
-    if "audio_paths" not in visual_storytelling_storage[paper_id]:
+    if "audio_paths" not in storytelling_info:
         raise HTTPException(status_code=400, detail="Audio not generated. Generate audio first.")
     
     try:
-        script_data = visual_storytelling_storage[paper_id]["script_data"]
-        image_dir = visual_storytelling_storage[paper_id]["image_dir"]
-        audio_dir = visual_storytelling_storage[paper_id]["audio_dir"]
+        script_data = storytelling_info["script_data"]
+        image_dir = storytelling_info["image_dir"]
+        audio_dir = storytelling_info["audio_dir"]
         
         # Create video output directory
         video_dir = f"temp/visual_storytelling/{paper_id}/videos"
@@ -503,7 +426,8 @@ async def generate_storytelling_video(
         output_path = os.path.join(video_dir, f"{paper_id}_storytelling.mp4")
         
         # Generate video (without title card to avoid ImageMagick requirement)
-        video_path = create_visual_storytelling_video(
+        video_path = await run_cpu_bound(
+            create_visual_storytelling_video,
             scenes=script_data.get("scenes", []),
             image_dir=image_dir,
             audio_dir=audio_dir,
@@ -514,7 +438,7 @@ async def generate_storytelling_video(
         )
         
         # Store video path
-        visual_storytelling_storage[paper_id]["video_path"] = video_path
+        visual_storytelling_storage.merge(paper_id, video_path=video_path)
         
         print(f"Visual storytelling video created: {video_path}")
         
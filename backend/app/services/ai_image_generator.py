@@ -4,12 +4,13 @@ Using free placeholder generation with text overlays for development/demo purpos
 """
 
 import os
-import requests
 import base64
 from pathlib import Path
 from typing import List, Optional, Dict
 from PIL import Image, ImageDraw, ImageFont
 import io
+
+from app.services.http_client import http_client
 import hashlib
 import json
 
@@ -117,7 +118,7 @@ class AIImageGenerator:
         }
         
         try:
-            response = requests.post(API_URL, headers=headers, json=payload, timeout=60)
+            response = http_client.post(API_URL, headers=headers, json=payload, timeout=60, retry=True)
             
             if response.status_code == 200:
                 # Save the image
@@ -170,7 +171,7 @@ class AIImageGenerator:
             "steps": 30,
         }
         
-        response = requests.post(
+        response = http_client.post(
             self.endpoints["stability"],
             headers=headers,
             json=data,
@@ -228,7 +229,7 @@ class AIImageGenerator:
             "quality": "standard"
         }
         
-        response = requests.post(
+        response = http_client.post(
             self.endpoints["dalle"],
             headers=headers,
             json=data,
@@ -242,7 +243,7 @@ class AIImageGenerator:
         image_url = result["data"][0]["url"]
         
         # Download the image
-        image_response = requests.get(image_url, timeout=30)
+        image_response = http_client.get(image_url, timeout=30)
         with open(output_path, "wb") as f:
             f.write(image_response.content)
         
@@ -0,0 +1,195 @@
+"""
+Content-Addressed Artifact Store
+
+Generated artifacts (TTS chunks and section audio, slide images, videos) are
+stored once under temp/artifacts/blobs keyed by their SHA-256 digest and
+hard-linked (or copied, where hard links are unavailable) to the paths the
+pipelines and routes already use. Identical title cards, slides or audio
+chunks produced for different papers or re-runs therefore occupy disk once.
+
+Two indexes live in the shared repository:
+- "artifact_manifests": per paper/stage, the files that stage produced
+- "artifact_index": derivation key (hash of a step's inputs) -> output digests,
+  so a step whose inputs have not changed can be skipped entirely
+
+Materialized paths are hard links to shared blobs. Never write into them in
+place; call ``release(path)`` first so the link is dropped and the blob stays
+intact.
+
+A blob that nothing links to may be evicted by temp_gc at any time, including
+between ``lookup()`` and ``materialize()``. ``materialize()`` then raises
+FileNotFoundError, which callers treat as a cache miss (see ``restore()``).
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file, read in 1 MB chunks."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def derivation_key(step: str, *inputs: Any) -> str:
+    """Stable key for a pipeline step given its (JSON-serializable) inputs."""
+    payload = json.dumps([step, *inputs], sort_keys=True, default=str, ensure_ascii=False)
+    return f"{step}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _digests_in(value: Any) -> List[str]:
+    """Flatten the digests recorded for a derivation (a digest, list or dict of them)."""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return [d for item in value for d in _digests_in(item)]
+    return []
+
+
+class ArtifactStore:
+    """SHA-256 keyed blob store with per-paper manifests and a derivation index."""
+
+    def __init__(self, root: str = "temp/artifacts"):
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.tmp_dir = self.root / "tmp"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests = Repository("artifact_manifests")
+        self.index = Repository("artifact_index")
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs_dir / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def put_bytes(self, data: bytes) -> str:
+        """Store raw bytes and return their digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.tmp_dir / f"{uuid.uuid4().hex}.part"
+            with open(temp_file, "wb") as f:
+                f.write(data)
+            os.replace(temp_file, blob)
+        return digest
+
+    def ingest(self, path: str) -> str:
+        """Move a freshly written file into the store and link it back in place.
+
+        If an identical blob already exists the file is replaced by a link to
+        it, so duplicates collapse to a single copy on disk.
+        """
+        digest = file_digest(path)
+        blob = self.blob_path(digest)
+        if blob.exists():
+            self.materialize(digest, path)
+        else:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(path, blob)
+            except OSError:
+                shutil.copy2(path, blob)
+                self.materialize(digest, path)
+        return digest
+
+    def materialize(self, digest: str, dest: str) -> str:
+        """Expose a blob at ``dest`` (hard link, falling back to a copy)."""
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            raise FileNotFoundError(f"Artifact {digest} not found")
+        Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if os.path.samefile(blob, dest):
+                # Already linked; rename() between two links to one file is a no-op
+                return dest
+        except OSError:
+            pass
+        temp_dest = f"{dest}.{uuid.uuid4().hex[:8]}.link"
+        try:
+            os.link(blob, temp_dest)
+        except OSError:
+            shutil.copyfile(blob, temp_dest)
+        os.replace(temp_dest, dest)
+        return dest
+
+    def release(self, path: str):
+        """Drop a materialized path before something rewrites it in place."""
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+    def lookup(self, key: str) -> Optional[Any]:
+        """Return the recorded outputs of a derivation if all its blobs still exist."""
+        value = self.index.get(key)
+        if value is None:
+            return None
+        if not all(self.has(d) for d in _digests_in(value)):
+            return None
+        return value
+
+    def restore(self, key: str, dest: str) -> Optional[str]:
+        """Materialize the single output of a derivation at ``dest``; None on a cache miss."""
+        digest = self.lookup(key)
+        if digest is None:
+            return None
+        try:
+            return self.materialize(digest, dest)
+        except FileNotFoundError:
+            logger.info(f"Artifact for {key} was evicted before it could be linked; regenerating")
+            return None
+
+    def remember(self, key: str, value: Any):
+        """Record the output digest(s) of a derivation (a digest, list or dict of them)."""
+        self.index[key] = value
+
+    def record_manifest(self, paper_id: str, stage: str, files: Dict[str, str]):
+        """Record the files (path -> digest) a pipeline stage produced for a paper."""
+        self.manifests[f"{paper_id}:{stage}"] = {
+            "paper_id": paper_id,
+            "stage": stage,
+            "files": files,
+            "bytes": sum(self.blob_path(d).stat().st_size for d in set(files.values()) if self.has(d)),
+            "created_at": datetime.now().isoformat(),
+        }
+
+    def get_manifest(self, paper_id: str, stage: str) -> Optional[Dict[str, Any]]:
+        return self.manifests.get(f"{paper_id}:{stage}")
+
+    def list_manifests(self, paper_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [m for m in self.manifests.values() if paper_id is None or m.get("paper_id") == paper_id]
+
+    def ingest_files(self, paper_id: str, stage: str, paths: List[str]) -> Dict[str, str]:
+        """Ingest several outputs of one stage and record them in its manifest."""
+        files = {}
+        for path in paths:
+            try:
+                files[path] = self.ingest(path)
+            except Exception as e:
+                logger.warning(f"Could not store artifact {path}: {str(e)}")
+        self.record_manifest(paper_id, stage, files)
+        return files
+
+
+# Global artifact store instance
+artifact_store = ArtifactStore()
@@ -0,0 +1,295 @@
+"""
+ArXiv Download Cache
+
+Local cache for arXiv e-print sources and PDFs, shared by the paper scraper and
+the mindmap fetcher. Entries are keyed by arXiv ID plus version:
+
+- a versioned ID (2301.00001v2) never changes, so a cached copy is served
+  without contacting arXiv
+- an unversioned ID tracks the latest version and is revalidated with
+  If-None-Match / If-Modified-Since once it is older than
+  ARXIV_CACHE_REVALIDATE_SECONDS (default 3600)
+
+Payloads live under temp/arxiv_cache/<id>/<version>/ and the "arxiv_cache"
+repository records the URL, validators, size and fetch times of every entry.
+A hit only touches the payload's mtime, which is what prune() goes by. PDFs
+are stored as-is; e-print sources are unpacked while they download (see
+source_extractor) and cached as an extracted directory tree, so the archive
+never touches disk.
+
+Worker processes share the cache: a download holds a lock on
+``temp/arxiv_cache/.locks/<key>.lock``, so the other workers wait for it and
+then serve the stored copy.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from app.services.http_client import http_client
+from app.services.repository import Repository
+from app.services.source_extractor import source_extractor
+
+logger = logging.getLogger(__name__)
+
+ARXIV_ID_PATTERN = re.compile(
+    r'(?:arxiv\.org/(?:abs|pdf|e-print)/)?'
+    r'(?P<id>[0-9]{4}\.[0-9]{4,5}|[a-z-]+(?:\.[A-Z]{2})?/[0-9]{7})'
+    r'(?P<version>v[0-9]+)?',
+    re.IGNORECASE
+)
+
+DOWNLOAD_URLS = {
+    "source": "https://arxiv.org/e-print/{key}",
+    "pdf": "https://arxiv.org/pdf/{key}",
+}
+
+LATEST = "latest"
+
+
+def parse_arxiv_id(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split an arXiv URL or ID into (base ID, version), e.g. ("2301.00001", "v2")."""
+    match = ARXIV_ID_PATTERN.search(text.strip())
+    if not match:
+        return None, None
+    return match.group("id"), match.group("version")
+
+
+class ArxivCache:
+    """Disk cache for arXiv payloads with conditional revalidation."""
+
+    def __init__(self, cache_dir: str = "temp/arxiv_cache", revalidate_after: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.locks_dir = self.cache_dir / ".locks"
+        self.locks_dir.mkdir(exist_ok=True)
+        self.entries = Repository("arxiv_cache")
+        self.revalidate_after = revalidate_after if revalidate_after is not None else int(
+            os.getenv("ARXIV_CACHE_REVALIDATE_SECONDS", "3600")
+        )
+        self._key_locks_lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._import_index_file()
+
+    def _entry_key(self, kind: str, arxiv_id: str, version: Optional[str]) -> str:
+        return f"{kind}:{arxiv_id}{version or ''}" if version else f"{kind}:{arxiv_id}:{LATEST}"
+
+    def _payload_path(self, kind: str, arxiv_id: str, version: Optional[str]) -> Path:
+        base = self.cache_dir / arxiv_id.replace("/", "_") / (version or LATEST)
+        # Sources are cached as their extracted tree, PDFs as a single file
+        return base / "source" if kind == "source" else base / f"{kind}.bin"
+
+    @contextmanager
+    def _locked(self, key: str):
+        """Hold ``key`` against other threads and worker processes."""
+        with self._key_locks_lock:
+            thread_lock = self._key_locks.setdefault(key, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            lock_name = re.sub(r"[^A-Za-z0-9._-]", "_", key)
+            with open(self.locks_dir / f"{lock_name}.lock", "w") as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                yield
+
+    def _import_index_file(self):
+        """Move entries from the index.json used by earlier versions into the repository."""
+        index_file = self.cache_dir / "index.json"
+        try:
+            with open(index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            index = {}
+        self.entries.insert_missing(index)
+        try:
+            index_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def get_entry(self, kind: str, arxiv_id: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(self._entry_key(kind, arxiv_id, version))
+        if not entry or not os.path.exists(entry["path"]):
+            return None
+        if kind == "source" and not os.path.isdir(entry["path"]):
+            # Written before sources were cached extracted; fetch again
+            return None
+        return entry
+
+    def fetch(self, kind: str, arxiv_ref: str) -> str:
+        """Return the local path of an arXiv payload, downloading or revalidating as needed.
+
+        Args:
+            kind: "source" (e-print) or "pdf"
+            arxiv_ref: arXiv URL or ID, with or without version
+
+        Returns:
+            Path to the cached payload
+        """
+        if kind not in DOWNLOAD_URLS:
+            raise ValueError(f"Unknown arXiv payload kind: {kind}")
+        arxiv_id, version = parse_arxiv_id(arxiv_ref)
+        if not arxiv_id:
+            raise ValueError(f"Could not extract arXiv ID from: {arxiv_ref}")
+
+        key = self._entry_key(kind, arxiv_id, version)
+        with self._locked(key):
+            entry = self.get_entry(kind, arxiv_id, version)
+            now = time.time()
+
+            if entry and (version or now - entry.get("validated_at", 0) < self.revalidate_after):
+                logger.info(f"arXiv cache hit for {key}")
+                _touch(entry["path"])
+                return entry["path"]
+
+            url = DOWNLOAD_URLS[kind].format(key=f"{arxiv_id}{version or ''}")
+            headers = {}
+            if entry:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            response = http_client.get(url, headers=headers, stream=True)
+            try:
+                if entry and response.status_code == 304:
+                    logger.info(f"arXiv cache revalidated {key}")
+                    self.entries.merge(key, validated_at=now)
+                    _touch(entry["path"])
+                    return entry["path"]
+
+                response.raise_for_status()
+                payload_path = self._payload_path(kind, arxiv_id, version)
+                payload_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = payload_path.with_name(f"{payload_path.name}.{uuid.uuid4().hex[:8]}.part")
+                try:
+                    if kind == "source":
+                        size = self._store_source(response, temp_path, arxiv_id.replace("/", "_"))
+                    else:
+                        size = self._store_file(response, temp_path)
+                    _remove(payload_path)
+                    try:
+                        os.replace(temp_path, payload_path)
+                    except OSError:
+                        # Filled concurrently (only possible without fcntl); keep that copy
+                        if not payload_path.exists():
+                            raise
+                        _remove(temp_path)
+                    _touch(str(payload_path))
+                except BaseException:
+                    _remove(temp_path)
+                    raise
+            finally:
+                response.close()
+
+            if entry and entry.get("path") != str(payload_path):
+                _remove(Path(entry["path"]))
+
+            entry = {
+                "kind": kind,
+                "arxiv_id": arxiv_id,
+                "version": version,
+                "url": url,
+                "path": str(payload_path),
+                "size": size,
+                "content_type": response.headers.get("Content-Type"),
+                "content_encoding": response.headers.get("Content-Encoding"),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": now,
+                "validated_at": now,
+            }
+            self.entries[key] = entry
+            logger.info(f"arXiv cache stored {key} ({size} bytes)")
+            return entry["path"]
+
+    def _store_file(self, response, temp_path: Path) -> int:
+        size = 0
+        with open(temp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                f.write(chunk)
+                size += len(chunk)
+        return size
+
+    def _store_source(self, response, temp_path: Path, file_stem: str) -> int:
+        """Unpack the e-print straight from the response body into ``temp_path``."""
+        temp_path.mkdir(parents=True)
+        response.raw.decode_content = True
+        return source_extractor.extract(response.raw, str(temp_path), file_stem)["bytes"]
+
+    def get_source(self, arxiv_ref: str) -> str:
+        """Path of the cached, extracted e-print directory for a paper (read-only)."""
+        return self.fetch("source", arxiv_ref)
+
+    def get_pdf(self, arxiv_ref: str) -> str:
+        """Path of the cached PDF for a paper."""
+        return self.fetch("pdf", arxiv_ref)
+
+    def prune(self, older_than: float) -> int:
+        """Drop entries not used since ``older_than`` (epoch seconds); returns bytes freed."""
+        freed = 0
+        for key, entry in self.entries.items():
+            if _last_used(entry) >= older_than:
+                continue
+            with self._locked(key):
+                # Re-check: another worker may have used or replaced it meanwhile
+                entry = self.entries.get(key)
+                if not entry or _last_used(entry) >= older_than:
+                    continue
+                freed += _remove(Path(entry["path"]))
+                self.entries.pop(key, None)
+        return freed
+
+
+def _touch(path: str):
+    """Record a use of a cached payload in its mtime."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _last_used(entry: Dict[str, Any]) -> float:
+    try:
+        return os.path.getmtime(entry["path"])
+    except OSError:
+        # Payload already gone; the entry is only worth dropping
+        return 0
+
+
+def _remove(path: Path) -> int:
+    """Delete a cached file or directory tree; returns the bytes freed."""
+    freed = 0
+    try:
+        if path.is_dir() and not path.is_symlink():
+            for root, _, files in os.walk(path):
+                for name in files:
+                    try:
+                        freed += os.lstat(os.path.join(root, name)).st_size
+                    except OSError:
+                        pass
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            freed = path.lstat().st_size
+            path.unlink()
+    except OSError:
+        pass
+    return freed
+
+
+# Global cache instance
+arxiv_cache = ArxivCache()
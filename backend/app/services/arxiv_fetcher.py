@@ -4,26 +4,43 @@ ArXiv Paper Fetcher Module
 This module handles fetching research papers from arXiv and extracting text content.
 """
 
-# Python 3.13 compatibility fix for missing cgi module
-import sys
-if sys.version_info >= (3, 13):
-    from app.services import cgi_compat
-    sys.modules['cgi'] = cgi_compat.cgi
-
-import arxiv
 import pdfplumber
-import requests
 import tempfile
 import os
-from typing import Dict, Optional
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
 import re
 
+from app.services.arxiv_cache import arxiv_cache
+from app.services.arxiv_metadata import arxiv_metadata, published_date
+
 
 class ArxivFetcher:
-    """Handles fetching and processing arXiv papers."""
+    """Handles fetching and processing arXiv papers.
+
+    The fetcher holds no per-request state, so one instance can serve many
+    concurrent requests. Each call to ``fetch_paper_content`` works in its own
+    scratch directory (see ``workspace``) that is removed when the call ends.
+    """
+    
+    def __init__(self, workspace_root: str = "temp/mindmap"):
+        self.workspace_root = workspace_root
     
-    def __init__(self):
-        self.temp_dir = tempfile.mkdtemp()
+    @contextmanager
+    def workspace(self) -> Iterator[str]:
+        """
+        Create an isolated scratch directory for one request.
+        
+        Yields:
+            Path to a fresh directory, deleted (with its contents) on exit
+        """
+        os.makedirs(self.workspace_root, exist_ok=True)
+        path = tempfile.mkdtemp(prefix="req_", dir=self.workspace_root)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
     
     def extract_arxiv_id(self, arxiv_url: str) -> Optional[str]:
         """
@@ -65,71 +82,87 @@ class ArxivFetcher:
             Dictionary with paper metadata
         """
         try:
-            search = arxiv.Search(id_list=[arxiv_id])
-            paper = next(search.results())
+            paper = arxiv_metadata.get(arxiv_id)
+            if not paper:
+                raise ValueError(f"arXiv has no paper with ID {arxiv_id}")
             
             return {
-                'title': paper.title,
-                'authors': [author.name for author in paper.authors],
-                'abstract': paper.summary,
-                'published': paper.published,
-                'categories': paper.categories,
-                'pdf_url': paper.pdf_url
+                'title': paper['title'],
+                'authors': paper['authors'],
+                'abstract': paper['abstract'],
+                'published': published_date(paper),
+                'categories': paper['categories'],
+                'pdf_url': paper['pdf_url']
             }
         except Exception as e:
             raise Exception(f"Failed to fetch paper metadata: {str(e)}")
     
-    def download_pdf(self, pdf_url: str) -> str:
+    def download_pdf(self, pdf_url: str, workspace: Optional[str] = None) -> str:
         """
-        Download PDF from URL to temporary file.
+        Get the PDF for an arXiv URL, served from the shared arXiv cache.
         
         Args:
             pdf_url: URL to the PDF file
+            workspace: Request workspace to pin a private copy into. The copy is
+                a hard link where possible, so cache pruning cannot remove the
+                file while it is being read.
             
         Returns:
-            Path to downloaded PDF file
+            Path to the PDF file (read-only; do not modify it)
         """
         try:
-            response = requests.get(pdf_url, stream=True)
-            response.raise_for_status()
-            
-            pdf_path = os.path.join(self.temp_dir, "paper.pdf")
-            with open(pdf_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
+            cached_path = arxiv_cache.get_pdf(pdf_url)
+            if workspace is None:
+                return cached_path
+            pdf_path = os.path.join(workspace, "paper.pdf")
+            try:
+                os.link(cached_path, pdf_path)
+            except OSError:
+                shutil.copyfile(cached_path, pdf_path)
             return pdf_path
         except Exception as e:
             raise Exception(f"Failed to download PDF: {str(e)}")
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
+    def extract_text_from_pdf(self, pdf_path: str, max_chars: Optional[int] = None) -> str:
         """
         Extract text content from PDF file.
         
+        Pages are read one at a time and released after use, so memory does
+        not grow with page count.
+        
         Args:
             pdf_path: Path to PDF file
+            max_chars: Stop reading once this much text is collected
             
         Returns:
             Extracted text content
         """
         try:
             text_content = []
+            total = 0
             with pdfplumber.open(pdf_path) as pdf:
                 for page in pdf.pages:
                     page_text = page.extract_text()
+                    # pdfplumber caches each page's parsed objects until closed
+                    page.close()
                     if page_text:
                         text_content.append(page_text)
+                        total += len(page_text) + 2
+                    if max_chars is not None and total >= max_chars:
+                        break
             
-            return '\n\n'.join(text_content)
+            text = '\n\n'.join(text_content)
+            return text[:max_chars] if max_chars is not None else text
         except Exception as e:
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
     
-    def fetch_paper_content(self, arxiv_url: str) -> Dict:
+    def fetch_paper_content(self, arxiv_url: str, max_chars: Optional[int] = None) -> Dict:
         """
         Main method to fetch complete paper content.
         
         Args:
             arxiv_url: arXiv URL or ID
+            max_chars: Read only this much of the PDF's text (default: all)
             
         Returns:
             Dictionary with metadata and full text content
@@ -143,12 +176,10 @@ class ArxivFetcher:
             # Fetch metadata
             metadata = self.fetch_paper_metadata(arxiv_id)
             
-            # Download and extract PDF content
-            pdf_path = self.download_pdf(metadata['pdf_url'])
-            full_text = self.extract_text_from_pdf(pdf_path)
-            
-            # Clean up temporary file
-            os.remove(pdf_path)
+            # Download and extract PDF content in a private workspace
+            with self.workspace() as workspace:
+                pdf_path = self.download_pdf(metadata['pdf_url'], workspace)
+                full_text = self.extract_text_from_pdf(pdf_path, max_chars)
             
             return {
                 'metadata': metadata,
@@ -159,8 +190,13 @@ class ArxivFetcher:
         except Exception as e:
             raise Exception(f"Error processing arXiv paper: {str(e)}")
     
-    def cleanup(self):
-        """Clean up temporary directory."""
-        import shutil
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+    def cleanup(self, workspace: Optional[str] = None):
+        """
+        Remove a request workspace.
+        
+        Workspaces created through ``workspace()`` are removed automatically;
+        this only exists for callers that manage a workspace path themselves.
+        Shared state is never touched, so it is safe under concurrency.
+        """
+        if workspace and os.path.abspath(workspace).startswith(os.path.abspath(self.workspace_root) + os.sep):
+            shutil.rmtree(workspace, ignore_errors=True)
@@ -0,0 +1,186 @@
+"""
+ArXiv Ingestion
+
+Turns arXiv URLs/IDs into stored papers. Used by the single-paper
+``/api/papers/scrape-arxiv`` endpoint, its bulk variant and the command-line
+entry point (``python -m app.cli ingest-arxiv``).
+
+For bulk runs, metadata for the whole list is resolved up front in batched
+Atom queries. Sources are then downloaded and extracted with at most
+ARXIV_INGEST_CONCURRENCY (default 4) papers in flight, LaTeX analysis
+(find_tex_file / extract_paper_metadata / find_image_files) runs in the shared
+worker process pool, referenced PDF figures are rendered there in parallel,
+and per-paper results are yielded as each one finishes.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.services.arxiv_cache import parse_arxiv_id
+from app.services.arxiv_metadata import arxiv_metadata
+from app.services.arxiv_scraper import ArxivScraper, format_paper_metadata
+from app.services.executor import run_blocking
+from app.services.paper_fingerprints import arxiv_fingerprint, paper_fingerprints
+from app.services.paper_ingest import ingest_latex_source
+from app.services.storage_manager import storage_manager
+
+logger = logging.getLogger(__name__)
+
+INGEST_CONCURRENCY = int(os.getenv("ARXIV_INGEST_CONCURRENCY", "4"))
+MAX_INGEST_CONCURRENCY = 16
+
+
+async def ingest_arxiv_paper(arxiv_url: str, meta: Optional[Dict[str, Any]] = None,
+                             reuse_existing: bool = True) -> Dict[str, Any]:
+    """
+    Download, analyze and store one arXiv paper.
+
+    Args:
+        arxiv_url: arXiv URL or ID
+        meta: Pre-fetched arxiv_metadata entry; fetched when omitted
+        reuse_existing: Fork the paper already ingested from the same
+            arXiv ID and version instead of downloading it again
+
+    Returns:
+        Dictionary with the new "paper_id", the stored "paper_info" and
+        whether it was forked from an existing paper ("reused")
+    """
+    scraper = ArxivScraper()
+
+    if meta is None:
+        try:
+            meta = await run_blocking(arxiv_metadata.get, arxiv_url)
+        except Exception as e:
+            logger.warning(f"arXiv metadata lookup failed for {arxiv_url}: {str(e)}")
+
+    # The same ID and version was scraped before: fork that paper (its files, metadata and scripts)
+    fingerprint = arxiv_fingerprint(arxiv_url, meta)
+    if reuse_existing:
+        existing = await run_blocking(paper_fingerprints.find, fingerprint)
+        # None when the paper was evicted since the lookup: ingest it afresh
+        forked = await run_blocking(paper_fingerprints.fork, existing) if existing else None
+        if forked:
+            return {"paper_id": forked[0], "paper_info": forked[1], "reused": True}
+
+    paper_id = str(uuid.uuid4())
+
+    # Download and extract source
+    extracted_dir = await run_blocking(scraper.download_source, arxiv_url, paper_id)
+
+    # Get metadata from arXiv
+    if meta:
+        arxiv_meta = format_paper_metadata(meta)
+    else:
+        arxiv_meta = await run_blocking(scraper.get_paper_metadata, arxiv_url)
+
+    # Main .tex file, LaTeX metadata, rendered figures and their variants
+    processed = await ingest_latex_source(paper_id, extracted_dir)
+
+    # Merge LaTeX metadata with arXiv metadata
+    metadata = {**processed["metadata"], **arxiv_meta}
+    metadata["arxiv_id"] = scraper.extract_arxiv_id(arxiv_url)
+
+    paper_info = {
+        "metadata": metadata,
+        "tex_file_path": processed["tex_file_path"],
+        "source_dir": extracted_dir,
+        "image_files": processed["image_files"],
+        "image_variants": processed["image_variants"],
+        "arxiv_url": arxiv_url,
+        "status": "processed",
+        "source_type": "arxiv"
+    }
+    await run_blocking(storage_manager.save_paper, paper_id, paper_info)
+    await run_blocking(paper_fingerprints.remember, fingerprint, paper_id)
+    logger.info(f"Processed arXiv paper {paper_id}")
+    return {"paper_id": paper_id, "paper_info": paper_info, "reused": False}
+
+
+def _unique(refs: Iterable[str]) -> Tuple[List[Tuple[int, str]], Dict[int, List[Tuple[int, str]]]]:
+    """
+    Positions of the distinct references in an input list.
+
+    Blanks are skipped, and references to the same arXiv ID and version
+    (e.g. an ID and its abs URL) count as one.
+
+    Returns:
+        ([(input index, ref)] of first occurrences,
+        {first occurrence's index: [(input index, ref)] of its repeats})
+    """
+    first_seen: Dict[Any, int] = {}
+    unique = []
+    repeats: Dict[int, List[Tuple[int, str]]] = {}
+    for index, ref in enumerate(refs):
+        ref = ref.strip()
+        if not ref:
+            continue
+        arxiv_id, version = parse_arxiv_id(ref)
+        key = (arxiv_id, version) if arxiv_id else ref
+        if key in first_seen:
+            repeats.setdefault(first_seen[key], []).append((index, ref))
+        else:
+            first_seen[key] = index
+            unique.append((index, ref))
+    return unique, repeats
+
+
+async def ingest_arxiv_papers(refs: Iterable[str], concurrency: Optional[int] = None,
+                              reuse_existing: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Ingest many arXiv papers, yielding one result per paper as it completes.
+
+    Args:
+        refs: arXiv URLs or IDs; blanks are skipped, and a repeat of the same ID
+            and version is not ingested again but gets the first one's result
+        concurrency: Papers processed at once (default ARXIV_INGEST_CONCURRENCY)
+        reuse_existing: Fork papers already ingested from the same ID and version
+
+    Yields:
+        {"index", "arxiv_url", "status": "processed", "paper_id", "metadata",
+        "image_files", "tex_file_path", "reused"} or {"index", "arxiv_url",
+        "status": "failed", "error"}; "index" is the position in the input list
+    """
+    unique, repeats = _unique(refs)
+    concurrency = max(1, min(concurrency or INGEST_CONCURRENCY, MAX_INGEST_CONCURRENCY))
+
+    try:
+        batch_meta = await run_blocking(arxiv_metadata.get_many, [ref for _, ref in unique])
+    except Exception as e:
+        # Fall back to per-paper lookups
+        logger.warning(f"Batched arXiv metadata lookup failed: {str(e)}")
+        batch_meta = {}
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ingest_one(index: int, ref: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await ingest_arxiv_paper(ref, batch_meta.get(ref), reuse_existing)
+            except Exception as e:
+                logger.error(f"Error ingesting {ref}: {str(e)}")
+                return {"index": index, "arxiv_url": ref, "status": "failed", "error": str(e)}
+            info = result["paper_info"]
+            return {
+                "index": index,
+                "arxiv_url": ref,
+                "status": "processed",
+                "paper_id": result["paper_id"],
+                "metadata": info["metadata"],
+                "image_files": [os.path.basename(f) for f in info["image_files"]],
+                "tex_file_path": info["tex_file_path"],
+                "reused": result["reused"],
+            }
+
+    tasks = [asyncio.create_task(ingest_one(i, ref)) for i, ref in unique]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            yield result
+            for index, ref in repeats.get(result["index"], []):
+                yield {**result, "index": index, "arxiv_url": ref}
+    finally:
+        # The consumer went away (e.g. client disconnected): stop queued papers
+        for task in tasks:
+            task.cancel()
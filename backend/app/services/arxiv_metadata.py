@@ -0,0 +1,167 @@
+"""
+ArXiv Metadata Service
+
+Single source of paper metadata (title, authors, abstract, dates, categories)
+for the scraper, the mindmap fetcher and bulk ingestion. Metadata comes from
+the arXiv Atom API: up to ARXIV_METADATA_BATCH_SIZE (100) IDs are resolved by
+one ``id_list`` query. Results are cached in the "arxiv_metadata" repository
+table:
+- a versioned ID (2301.00001v2) never changes, so it is cached for good
+- an unversioned ID tracks the latest version and is refreshed after
+  ARXIV_METADATA_TTL_SECONDS (default 86400)
+
+Consecutive API calls are spaced by ARXIV_API_DELAY_SECONDS (default 3), as
+arXiv asks of API clients.
+"""
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.arxiv_cache import parse_arxiv_id
+from app.services.http_client import http_client
+from app.services.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://export.arxiv.org/api/query"
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV_NS = "{http://arxiv.org/schemas/atom}"
+
+
+def _text(element: Optional[ET.Element]) -> str:
+    return " ".join((element.text or "").split()) if element is not None else ""
+
+
+def _parse_entry(entry: ET.Element) -> Optional[Dict[str, Any]]:
+    """Convert an Atom <entry> into a metadata dict (None for API error entries)."""
+    arxiv_id, version = parse_arxiv_id(_text(entry.find(f"{ATOM}id")))
+    if not arxiv_id:
+        return None
+
+    pdf_url = None
+    for link in entry.findall(f"{ATOM}link"):
+        if link.get("title") == "pdf" or link.get("type") == "application/pdf":
+            pdf_url = link.get("href")
+            break
+
+    primary = entry.find(f"{ARXIV_NS}primary_category")
+    return {
+        "arxiv_id": arxiv_id,
+        "version": version,
+        "title": _text(entry.find(f"{ATOM}title")),
+        "authors": [_text(a.find(f"{ATOM}name")) for a in entry.findall(f"{ATOM}author")],
+        "abstract": _text(entry.find(f"{ATOM}summary")),
+        "published": _text(entry.find(f"{ATOM}published")) or None,
+        "updated": _text(entry.find(f"{ATOM}updated")) or None,
+        "categories": [c.get("term") for c in entry.findall(f"{ATOM}category") if c.get("term")],
+        "primary_category": primary.get("term") if primary is not None else None,
+        "doi": _text(entry.find(f"{ARXIV_NS}doi")) or None,
+        "journal_ref": _text(entry.find(f"{ARXIV_NS}journal_ref")) or None,
+        "pdf_url": pdf_url or f"https://arxiv.org/pdf/{arxiv_id}{version or ''}",
+        "abs_url": f"https://arxiv.org/abs/{arxiv_id}{version or ''}",
+    }
+
+
+class ArxivMetadataService:
+    """Batched, cached arXiv metadata lookups."""
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("ARXIV_METADATA_BATCH_SIZE", "100"))
+        self.ttl = int(os.getenv("ARXIV_METADATA_TTL_SECONDS", "86400"))
+        self.api_delay = float(os.getenv("ARXIV_API_DELAY_SECONDS", "3"))
+        self.cache = Repository("arxiv_metadata")
+        self._rate_lock = threading.Lock()
+        self._last_call = 0.0
+
+    def _cache_key(self, arxiv_id: str, version: Optional[str]) -> str:
+        return f"{arxiv_id}{version or ''}"
+
+    def _is_fresh(self, entry: Dict[str, Any], versioned: bool, now: float) -> bool:
+        return versioned or now - entry.get("fetched_at", 0) < self.ttl
+
+    def _query(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """Run one id_list query, respecting the API's request spacing."""
+        with self._rate_lock:
+            wait = self._last_call + self.api_delay - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = http_client.get(
+                    API_URL,
+                    params={"id_list": ",".join(keys), "max_results": len(keys)},
+                    timeout=(10, 60),
+                )
+            finally:
+                self._last_call = time.monotonic()
+        response.raise_for_status()
+        root = ET.fromstring(response.content)
+        return [meta for meta in (_parse_entry(e) for e in root.findall(f"{ATOM}entry")) if meta]
+
+    def get_many(self, refs: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve metadata for many arXiv URLs or IDs.
+
+        Args:
+            refs: arXiv URLs or IDs, with or without version
+
+        Returns:
+            Mapping of each resolvable ref to its metadata. Refs that are not
+            valid arXiv IDs, or that arXiv does not know, are left out.
+        """
+        now = time.time()
+        wanted: Dict[str, List[str]] = {}
+        for ref in refs:
+            arxiv_id, version = parse_arxiv_id(ref)
+            if arxiv_id:
+                wanted.setdefault(self._cache_key(arxiv_id, version), []).append(ref)
+
+        cached = self.cache.get_many(list(wanted)) if wanted else {}
+        results: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for key, key_refs in wanted.items():
+            entry = cached.get(key)
+            if entry and self._is_fresh(entry, parse_arxiv_id(key)[1] is not None, now):
+                for ref in key_refs:
+                    results[ref] = entry
+            else:
+                missing.append(key)
+
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            logger.info(f"Fetching arXiv metadata for {len(batch)} papers")
+            entries = self._query(batch)
+            # Entries carry the version they describe; match exact versions first
+            by_id = {meta["arxiv_id"]: meta for meta in entries}
+            by_id.update({self._cache_key(meta["arxiv_id"], meta["version"]): meta for meta in entries})
+            fetched = {}
+            for key in batch:
+                meta = by_id.get(key) or by_id.get(parse_arxiv_id(key)[0])
+                if meta is None:
+                    logger.warning(f"arXiv returned no metadata for {key}")
+                    continue
+                meta = {**meta, "fetched_at": now}
+                fetched[key] = meta
+                for ref in wanted[key]:
+                    results[ref] = meta
+            if fetched:
+                self.cache.put_many(fetched)
+        return results
+
+    def get(self, ref: str) -> Optional[Dict[str, Any]]:
+        """Metadata for a single arXiv URL or ID (None if not found)."""
+        return self.get_many([ref]).get(ref)
+
+
+def published_date(meta: Dict[str, Any]) -> Optional[datetime]:
+    """The publication timestamp of a metadata entry as a datetime."""
+    if not meta.get("published"):
+        return None
+    return datetime.fromisoformat(meta["published"].replace("Z", "+00:00"))
+
+
+# Global metadata service instance
+arxiv_metadata = ArxivMetadataService()
@@ -1,11 +1,18 @@
 import os
-import requests
 import shutil
-import re
-import tarfile
-import gzip
-from bs4 import BeautifulSoup
 from pathlib import Path
+from app.services.arxiv_cache import arxiv_cache, parse_arxiv_id
+from app.services.arxiv_metadata import arxiv_metadata, published_date
+
+
+def _link_or_copy(src, dst):
+    """Hard-link a cached source file into a paper directory (copy across filesystems)."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
 
 class ArxivScraper:
     """Scraper for downloading TeX source files from arXiv papers."""
@@ -16,65 +23,29 @@ class ArxivScraper:
 
     def extract_arxiv_id(self, url):
         """Extract the arXiv ID from a given URL."""
-        match = re.search(r'arxiv\.org/(?:abs|pdf)/([0-9]+\.[0-9]+)(?:v[0-9]+)?', url)
-        if match:
-            return match.group(1)
-        return None
-
-    def download_source(self, url):
-        """Download the TeX source file for a given arXiv paper URL."""
-        arxiv_id = self.extract_arxiv_id(url)
+        arxiv_id, _ = parse_arxiv_id(url)
+        return arxiv_id
+
+    def download_source(self, url, paper_id):
+        """
+        Download the TeX source of an arXiv paper into temp/arxiv_sources/<paper_id>/source.
+
+        Every paper gets its own tree of hard links into the cache, so
+        concurrent or repeated scrapes of one arXiv ID never clear a tree
+        that another paper is reading.
+        """
+        arxiv_id, version = parse_arxiv_id(url)
         if not arxiv_id:
             raise ValueError(f"Could not extract arXiv ID from URL: {url}")
 
-        paper_dir = os.path.join(self.download_dir, arxiv_id.replace(".", "_"))
-        os.makedirs(paper_dir, exist_ok=True)
-
-        source_url = f"https://arxiv.org/e-print/{arxiv_id}"
-        
         try:
-            print(f"Downloading source for arXiv paper {arxiv_id}...")
-            response = requests.get(source_url, stream=True)
-            response.raise_for_status()
-
-            download_path = os.path.join(paper_dir, f"{arxiv_id}.tar.gz")
-            with open(download_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-
-            extracted_dir = os.path.join(paper_dir, "source")
-            os.makedirs(extracted_dir, exist_ok=True)
-
-            extracted_successfully = False
-            try:
-                print(f"Attempting to extract as tar.gz: {download_path}")
-                with tarfile.open(download_path) as tar:
-                    file_list = tar.getnames()
-                    print(f"Found {len(file_list)} files in tar archive")
-                    
-                    for member in tar.getmembers():
-                        if member.name.startswith('/') or '..' in member.name:
-                            continue
-                        try:
-                            tar.extract(member, path=extracted_dir)
-                        except Exception as extract_error:
-                            print(f"Error extracting {member.name}: {extract_error}")
-                    extracted_successfully = True
-                    
-            except tarfile.ReadError:
-                try:
-                    print(f"Attempting to extract as gzip: {download_path}")
-                    with gzip.open(download_path, 'rb') as f_in:
-                        extracted_file = os.path.join(extracted_dir, f"{arxiv_id}.tex")
-                        with open(extracted_file, 'wb') as f_out:
-                            shutil.copyfileobj(f_in, f_out)
-                    extracted_successfully = True
-                except Exception:
-                    pass
+            print(f"Fetching source for arXiv paper {arxiv_id}{version or ''}...")
+            # Served from the local arXiv cache when possible; the cache holds
+            # the already-extracted tree (the tarball is unpacked as it streams)
+            cached_dir = arxiv_cache.get_source(url)
 
-            if not extracted_successfully:
-                fallback_file = os.path.join(extracted_dir, f"{arxiv_id}.raw")
-                shutil.copy2(download_path, fallback_file)
+            extracted_dir = os.path.join(self.download_dir, paper_id, "source")
+            shutil.copytree(cached_dir, extracted_dir, copy_function=_link_or_copy)
 
             extracted_files = os.listdir(extracted_dir)
             if extracted_files:
@@ -88,26 +59,12 @@ class ArxivScraper:
             raise
 
     def get_paper_metadata(self, url):
-        """Get metadata for the paper (title, authors, date)."""
+        """Get metadata for the paper (title, authors, date) from the batched metadata service."""
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            title_elem = soup.find('h1', class_='title mathjax')
-            title = title_elem.get_text().replace('Title:', '').strip() if title_elem else "Unknown Title"
-
-            authors_elem = soup.find('div', class_='authors')
-            authors = authors_elem.get_text().replace('Authors:', '').strip() if authors_elem else "Unknown Authors"
-
-            date_elem = soup.find('div', class_='dateline')
-            date = date_elem.get_text().strip() if date_elem else "Unknown Date"
-
-            return {
-                "title": title,
-                "authors": authors,
-                "date": date
-            }
+            meta = arxiv_metadata.get(url)
+            if not meta:
+                raise ValueError(f"No arXiv metadata found for {url}")
+            return format_paper_metadata(meta)
         except Exception as e:
             print(f"Error fetching metadata: {e}")
             return {
@@ -115,3 +72,13 @@ class ArxivScraper:
                 "authors": "Unknown Authors", 
                 "date": "Unknown Date"
             }
+
+
+def format_paper_metadata(meta):
+    """Shape an arXiv metadata entry like the paper metadata the routes store."""
+    published = published_date(meta)
+    return {
+        "title": meta.get("title") or "Unknown Title",
+        "authors": ", ".join(meta.get("authors") or []) or "Unknown Authors",
+        "date": f"[Submitted on {published.day} {published.strftime('%b %Y')}]" if published else "Unknown Date"
+    }
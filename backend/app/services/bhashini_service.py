@@ -8,6 +8,8 @@ import logging
 import base64
 from typing import Dict, Optional
 
+from app.services.http_client import http_client
+
 logger = logging.getLogger(__name__)
 
 class BhashiniService:
@@ -97,11 +99,12 @@ class BhashiniService:
             logger.info(f"Making request to: {self.endpoint}")
             logger.info(f"Request payload: {payload}")
             
-            response = requests.post(
+            response = http_client.post(
                 self.endpoint,
                 json=payload,
                 headers=self._get_headers(),
-                timeout=30
+                timeout=30,
+                retry=True
             )
             
             logger.info(f"TTS Response Status: {response.status_code}")
@@ -170,12 +173,13 @@ class BhashiniService:
         
         try:
             # Use endpoint directly - it already contains the full path
-            response = requests.post(
+            response = http_client.post(
                 api_endpoint,
                 json=payload,
                 headers=self._get_headers(),
                 timeout=30,
-                verify=False
+                verify=False,
+                retry=True
             )
             
             if response.status_code == 200:
@@ -223,7 +227,7 @@ class BhashiniService:
             True if successful, False otherwise
         """
         try:
-            response = requests.get(audio_url, timeout=60, verify=False)
+            response = http_client.get(audio_url, timeout=60, verify=False)
             
             if response.status_code == 200:
                 with open(output_path, 'wb') as f:
@@ -261,7 +265,7 @@ class BhashiniService:
                 files = {'audio_file': audio_file}
                 
                 # Use endpoint directly - it already contains the full path
-                response = requests.post(
+                response = http_client.post(
                     api_endpoint,
                     files=files,
                     timeout=60,
@@ -308,7 +312,7 @@ class BhashiniService:
                 files = {'file': image_file}
                 
                 # Use endpoint directly - it already contains the full path
-                response = requests.post(
+                response = http_client.post(
                     api_endpoint,
                     files=files,
                     timeout=60,
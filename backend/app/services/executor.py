@@ -0,0 +1,75 @@
+"""
+Execution Layer
+
+Keeps blocking work off the asyncio event loop:
+- blocking network / subprocess / file I/O goes to a bounded thread pool
+- CPU-bound work (rendering, rasterizing, PDF parsing) goes to a process pool
+
+Functions sent to the process pool must be importable top-level functions and
+their arguments/results must be picklable. Worker processes are started with
+"spawn" so they never inherit the server's threads or locks.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+
+_io_pool: Optional[ThreadPoolExecutor] = None
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """Get the shared bounded thread pool for blocking I/O."""
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="saral-io")
+        logger.info(f"Started I/O thread pool with {IO_WORKERS} workers")
+    return _io_pool
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared process pool for CPU-bound work."""
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Started CPU process pool with {CPU_WORKERS} workers")
+    return _cpu_pool
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking call (network, subprocess, disk) on the I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), functools.partial(func, *args, **kwargs))
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a CPU-bound top-level function on the process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def call_cpu_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Synchronous variant of run_cpu_bound for code already running in a worker thread."""
+    return get_process_pool().submit(func, *args, **kwargs).result()
+
+
+def shutdown_executors():
+    """Shut down both pools; called on application shutdown."""
+    global _io_pool, _cpu_pool
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=False, cancel_futures=True)
+        _io_pool = None
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
@@ -0,0 +1,157 @@
+"""
+Figure Derivatives
+
+Source figures are often multi-megabyte PNGs. The image selector only needs a
+thumbnail, and the Beamer deck never needs more pixels than a slide has.
+Three downscaled variants are therefore generated for each raster figure
+when a paper is ingested:
+
+- "thumb":   320 px wide WebP for the image picker
+- "preview": 1024 px wide WebP for the enlarged view
+- "slide":   FIGURE_SLIDE_WIDTH (default 1600) px wide, in the original's
+             format (PNG or JPEG), since pdflatex cannot read WebP
+
+Images are only ever shrunk. Each variant is stored in the artifact store,
+keyed by the source's SHA-256 and the variant settings, and materialized
+under temp/figures/<paper_id>/<variant>/. The same figure in another paper
+costs a hard link, not a re-encode. Vector or unreadable figures (EPS, SVG,
+PDFs that could not be rasterized) get no variants and are served as-is.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import uuid
+from typing import Dict, List, Optional
+
+from app.services.artifact_store import artifact_store, derivation_key, file_digest
+from app.services.executor import run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+FIGURE_SLIDE_WIDTH = int(os.getenv("FIGURE_SLIDE_WIDTH", "1600"))
+
+# variant -> (max width, output format; None keeps the source format)
+VARIANTS = {
+    "thumb": (320, "WEBP"),
+    "preview": (1024, "WEBP"),
+    "slide": (FIGURE_SLIDE_WIDTH, None),
+}
+RASTER_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG"}
+EXTENSIONS = {"WEBP": ".webp", "PNG": ".png", "JPEG": ".jpg"}
+
+
+class FigureDerivatives:
+    """Generates and caches downscaled variants of paper figures."""
+
+    def __init__(self, root: str = "temp/figures"):
+        self.root = root
+
+    def variant_path(self, paper_id: str, image_path: str, variant: str) -> Optional[str]:
+        """Where a variant of a figure lives, or None if the figure gets no variants."""
+        source_format = RASTER_FORMATS.get(os.path.splitext(image_path)[1].lower())
+        if source_format is None or variant not in VARIANTS:
+            return None
+        image_format = VARIANTS[variant][1] or source_format
+        name = os.path.basename(image_path)
+        if VARIANTS[variant][1]:
+            # fig.png -> fig.png.webp, so fig.png and fig.jpg do not collide
+            name += EXTENSIONS[image_format]
+        return os.path.join(self.root, paper_id, variant, name)
+
+    def _encode(self, image_path: str, dest: str, width: int, image_format: str, source_format: str):
+        from PIL import Image
+
+        with Image.open(image_path) as image:
+            if image.width <= width and image_format == source_format:
+                # Already small enough: re-encoding would only cost time (and often bytes)
+                shutil.copyfile(image_path, dest)
+                return
+            image.load()
+            # Palette and exotic modes would resize with nearest-neighbour or fail to encode
+            if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGBA")
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            if image_format == "WEBP":
+                options = {"quality": 82, "method": 4}
+            elif image_format == "JPEG":
+                options = {"quality": 85, "optimize": True}
+            else:
+                options = {"optimize": True}
+            image.save(dest, image_format, **options)
+
+    def build(self, paper_id: str, image_path: str, variant: str) -> Optional[str]:
+        """Create (or link from the cache) one variant of a figure; None if it has none."""
+        dest = self.variant_path(paper_id, image_path, variant)
+        if dest is None:
+            return None
+        width, image_format = VARIANTS[variant]
+        source_format = RASTER_FORMATS[os.path.splitext(image_path)[1].lower()]
+        image_format = image_format or source_format
+        try:
+            key = derivation_key("figure_variant", file_digest(image_path), width, image_format)
+            if artifact_store.restore(key, dest):
+                return dest
+            temp_file = str(artifact_store.tmp_dir / f"{uuid.uuid4().hex}{EXTENSIONS[image_format]}")
+            try:
+                self._encode(image_path, temp_file, width, image_format, source_format)
+                digest = artifact_store.ingest(temp_file)
+            finally:
+                artifact_store.release(temp_file)
+            artifact_store.remember(key, digest)
+            return artifact_store.materialize(digest, dest)
+        except Exception as e:
+            logger.warning(f"Could not build {variant} variant of {image_path}: {str(e)}")
+            return None
+
+    def build_all(self, paper_id: str, image_path: str) -> Dict[str, str]:
+        """Every variant of one figure: variant -> path."""
+        variants = {}
+        for variant in VARIANTS:
+            path = self.build(paper_id, image_path, variant)
+            if path:
+                variants[variant] = path
+        return variants
+
+    async def generate(self, paper_id: str, image_files: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Build the variants of a paper's figures in parallel on the process pool.
+
+        Returns:
+            Image file name -> {variant: path}, for figures that have variants
+        """
+        raster = [path for path in image_files if os.path.splitext(path)[1].lower() in RASTER_FORMATS]
+        results = await asyncio.gather(
+            *(run_cpu_bound(build_figure_variants, paper_id, path) for path in raster),
+            return_exceptions=True
+        )
+        variants = {}
+        for path, result in zip(raster, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not build variants of {path}: {str(result)}")
+            elif result:
+                variants[os.path.basename(path)] = result
+        return variants
+
+    def resolve(self, paper_info: dict, image_path: str, variant: str) -> Optional[str]:
+        """Recorded variant of a figure if it is still on disk."""
+        path = paper_info.get("image_variants", {}).get(os.path.basename(image_path), {}).get(variant)
+        return path if path and os.path.exists(path) else None
+
+
+def build_figure_variants(paper_id: str, image_path: str) -> Dict[str, str]:
+    """Process-pool entry point for FigureDerivatives.build_all."""
+    return figure_derivatives.build_all(paper_id, image_path)
+
+
+def build_figure_variant(paper_id: str, image_path: str, variant: str) -> Optional[str]:
+    """Process-pool entry point for FigureDerivatives.build."""
+    return figure_derivatives.build(paper_id, image_path, variant)
+
+
+# Global figure derivatives instance
+figure_derivatives = FigureDerivatives()
@@ -0,0 +1,90 @@
+"""
+Figure Rasterizer
+
+LaTeX sources often ship figures as vector PDFs, which slides and the image
+endpoints cannot show directly. Only figures the document actually references
+are converted (see ``find_image_files``), one process-pool task per figure.
+
+Each PNG is rendered FIGURE_RENDER_WIDTH pixels wide (default 1600, enough
+for a figure on a 1920x1080 slide) instead of at a fixed DPI, so large
+posters do not turn into huge bitmaps and small plots stay sharp. Renders
+are stored in the artifact store keyed by the PDF's SHA-256 and the width.
+The same figure in another paper, or in a re-upload, is linked from the
+cache instead of being rendered again.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from typing import List
+
+from app.services.artifact_store import artifact_store, derivation_key, file_digest
+from app.services.executor import run_cpu_bound
+
+logger = logging.getLogger(__name__)
+
+FIGURE_RENDER_WIDTH = int(os.getenv("FIGURE_RENDER_WIDTH", "1600"))
+
+
+class FigureRasterizer:
+    """Converts referenced PDF figures to PNG, cached by content hash."""
+
+    def __init__(self, width: int = FIGURE_RENDER_WIDTH):
+        self.width = width
+
+    def _render(self, pdf_path: str, png_path: str) -> bool:
+        from app.services.latex_processor import convert_pdf_to_png
+        return convert_pdf_to_png(pdf_path, png_path, width=self.width)
+
+    def rasterize(self, image_path: str) -> str:
+        """
+        Return a displayable version of a figure.
+
+        Non-PDF images are returned unchanged. A PDF is rendered to a PNG next
+        to it (``fig.pdf`` -> ``fig.png``), reusing a cached render when the
+        same PDF was converted before. If conversion fails, the PDF path is
+        returned.
+        """
+        if not image_path.lower().endswith('.pdf'):
+            return image_path
+
+        png_path = os.path.splitext(image_path)[0] + '.png'
+        try:
+            key = derivation_key("figure_png", file_digest(image_path), self.width)
+            if artifact_store.restore(key, png_path):
+                logger.info(f"Reusing cached render of {image_path}")
+                return png_path
+            # Render outside the source tree: files there may be hard links into the arXiv cache
+            temp_png = str(artifact_store.tmp_dir / f"{uuid.uuid4().hex}.png")
+            try:
+                if not self._render(image_path, temp_png) or not os.path.exists(temp_png):
+                    return image_path
+                digest = artifact_store.ingest(temp_png)
+            finally:
+                artifact_store.release(temp_png)
+            artifact_store.remember(key, digest)
+            artifact_store.materialize(digest, png_path)
+            return png_path
+        except Exception as e:
+            logger.warning(f"Error converting {image_path} to PNG: {str(e)}")
+            return image_path
+
+    async def rasterize_all(self, image_paths: List[str]) -> List[str]:
+        """Rasterize figures concurrently on the process pool, keeping their order."""
+        return list(await asyncio.gather(*(
+            run_cpu_bound(rasterize_figure, path) if path.lower().endswith('.pdf') else _as_is(path)
+            for path in image_paths
+        )))
+
+
+async def _as_is(path: str) -> str:
+    return path
+
+
+def rasterize_figure(image_path: str) -> str:
+    """Process-pool entry point for FigureRasterizer.rasterize."""
+    return figure_rasterizer.rasterize(image_path)
+
+
+# Global figure rasterizer instance
+figure_rasterizer = FigureRasterizer()
@@ -0,0 +1,131 @@
+"""
+Figure Reference Resolution
+
+Maps ``\\includegraphics`` arguments to files in a source tree the way
+graphicx does. A reference is tried relative to the main file's directory,
+then in each ``\\graphicspath`` entry. A reference without an extension is
+tried with each extension in LaTeX's search order.
+
+The tree is indexed once into dicts: normalized relative path ->
+file (exact and case-folded) and stem -> files. Resolving a reference is a
+few dict lookups, independent of how many files the source has. When
+nothing matches by path, a file with the same stem anywhere in the tree is
+used. The extension order and then the shortest path break ties, so the
+choice never depends on directory listing order.
+"""
+import os
+import re
+from typing import Dict, Iterable, List, Optional
+
+# graphicx search order under pdflatex, plus formats we can still convert or show
+IMAGE_EXTENSIONS = ['.pdf', '.png', '.jpg', '.jpeg', '.eps', '.svg']
+# Formats that can be shown without rendering anything first
+RASTER_EXTENSIONS = ['.png', '.jpg', '.jpeg']
+
+GRAPHICSPATH_PATTERN = re.compile(r'\\graphicspath\s*\{((?:\s*\{[^{}]*\})+)\s*\}')
+GRAPHICSPATH_ENTRY_PATTERN = re.compile(r'\{([^{}]*)\}')
+
+
+def parse_graphicspath(content: str) -> List[str]:
+    """Directories listed in every ``\\graphicspath{{a/}{b/}}`` of a document, in order."""
+    paths = []
+    for match in GRAPHICSPATH_PATTERN.finditer(content):
+        for entry in GRAPHICSPATH_ENTRY_PATTERN.findall(match.group(1)):
+            entry = entry.strip()
+            if entry and entry not in paths:
+                paths.append(entry)
+    return paths
+
+
+def _normalize(path: str) -> str:
+    path = os.path.normpath(path.replace('\\', '/')).replace(os.sep, '/')
+    return '' if path == '.' else path
+
+
+def _extension_rank(path: str) -> int:
+    ext = os.path.splitext(path)[1].lower()
+    return IMAGE_EXTENSIONS.index(ext) if ext in IMAGE_EXTENSIONS else len(IMAGE_EXTENSIONS)
+
+
+class FigureResolver:
+    """Index of the image files under a source directory."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.files: List[str] = []
+        self._by_path: Dict[str, str] = {}
+        self._by_folded_path: Dict[str, str] = {}
+        self._by_stem: Dict[str, List[str]] = {}
+
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for file in sorted(files):
+                if os.path.splitext(file)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                full_path = os.path.join(root, file)
+                relative = _normalize(os.path.relpath(full_path, directory))
+                self.files.append(full_path)
+                self._by_path[relative] = full_path
+                self._by_folded_path.setdefault(relative.lower(), full_path)
+                stem = os.path.splitext(file)[0].lower()
+                self._by_stem.setdefault(stem, []).append(full_path)
+
+        for candidates in self._by_stem.values():
+            candidates.sort(key=lambda p: (_extension_rank(p), len(p), p))
+
+    def _lookup(self, relative: str) -> Optional[str]:
+        return self._by_path.get(relative) or self._by_folded_path.get(relative.lower())
+
+    def resolve(self, ref: str, base_dir: Optional[str] = None,
+                graphics_paths: Iterable[str] = ()) -> Optional[str]:
+        """
+        Find the file an ``\\includegraphics`` argument refers to.
+
+        Args:
+            ref: The argument as written, e.g. "figs/plot" or "plot.pdf"
+            base_dir: Directory of the main .tex file (default: the indexed directory)
+            graphics_paths: ``\\graphicspath`` entries, relative to base_dir
+
+        Returns:
+            Path of the matching file, or None
+        """
+        ref = ref.strip().strip('"')
+        if not ref:
+            return None
+        base = _normalize(os.path.relpath(base_dir, self.directory)) if base_dir else ''
+        has_extension = os.path.splitext(ref)[1].lower() in IMAGE_EXTENSIONS
+
+        for search_dir in [''] + list(graphics_paths):
+            stem = _normalize(os.path.join(base, search_dir, ref))
+            if stem.startswith('../'):
+                continue
+            if has_extension:
+                found = self._lookup(stem)
+                if found:
+                    return found
+            for ext in IMAGE_EXTENSIONS:
+                found = self._lookup(stem + ext)
+                if found:
+                    return found
+
+        # Not where LaTeX would look: fall back to the same file name anywhere in the tree
+        name = os.path.basename(ref)
+        stem_key = (os.path.splitext(name)[0] if has_extension else name).lower()
+        candidates = self._by_stem.get(stem_key, [])
+        if has_extension:
+            exact = [p for p in candidates if os.path.basename(p).lower() == name.lower()]
+            candidates = exact or candidates
+        return candidates[0] if candidates else None
+
+    def resolve_all(self, refs: Iterable[str], base_dir: Optional[str] = None,
+                    graphics_paths: Iterable[str] = ()) -> List[str]:
+        """Resolve several references, dropping misses and duplicates (first occurrence wins)."""
+        graphics_paths = list(graphics_paths)
+        resolved = []
+        seen = set()
+        for ref in refs:
+            path = self.resolve(ref, base_dir, graphics_paths)
+            if path and path not in seen:
+                seen.add(path)
+                resolved.append(path)
+        return resolved
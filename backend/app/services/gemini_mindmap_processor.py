@@ -14,6 +14,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Characters of paper text sent to Gemini; extractors can stop reading here
+PAPER_TEXT_LIMIT = 15000
+
 
 class GeminiMindmapProcessor:
     """Handles Gemini API integration for paper analysis."""
@@ -94,7 +97,7 @@ You are an expert research analyst. Please analyze the following research paper
 Paper Title: {paper_title}
 
 Paper Content:
-{paper_text[:15000]}  # Limit to avoid token limits
+{paper_text[:PAPER_TEXT_LIMIT]}  # Limit to avoid token limits
 
 Please analyze this research paper and create a structured mind map with the following requirements:
 
@@ -0,0 +1,185 @@
+"""
+Outbound HTTP Client
+
+Shared client for every external integration (arXiv, Sarvam, Bhashini, image
+generation APIs):
+- one pooled keep-alive requests.Session per host, so repeated calls (e.g.
+  per-chunk TTS) reuse TCP/TLS connections
+- default connect/read timeouts
+- retries with jittered exponential backoff for connection errors and
+  429/5xx responses; idempotent methods retry by default, other methods only
+  when the caller passes ``retry=True``
+- a per-host circuit breaker that fails fast while a service is down
+
+Configuration (environment): HTTP_POOL_SIZE (16), HTTP_MAX_RETRIES (3),
+HTTP_BACKOFF_BASE_SECONDS (0.5), HTTP_BACKOFF_MAX_SECONDS (10),
+HTTP_CIRCUIT_FAILURES (5), HTTP_CIRCUIT_RESET_SECONDS (30).
+"""
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_TIMEOUT = (10, 60)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without contacting a host whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one trial request through after a cool-down."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: allow a trial request; a failure re-opens the circuit
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class HttpClient:
+    """Pooled, retrying HTTP client with a circuit breaker per host."""
+
+    def __init__(self):
+        self.pool_size = int(os.getenv("HTTP_POOL_SIZE", "16"))
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+        self.backoff_base = float(os.getenv("HTTP_BACKOFF_BASE_SECONDS", "0.5"))
+        self.backoff_max = float(os.getenv("HTTP_BACKOFF_MAX_SECONDS", "10"))
+        self.circuit_failures = int(os.getenv("HTTP_CIRCUIT_FAILURES", "5"))
+        self.circuit_reset = float(os.getenv("HTTP_CIRCUIT_RESET_SECONDS", "30"))
+        self._sessions: Dict[str, requests.Session] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session_for(self, url: str) -> requests.Session:
+        """Get the keep-alive session for a URL's host."""
+        host = self._host(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def breaker_for(self, url: str) -> CircuitBreaker:
+        host = self._host(url)
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.circuit_failures, self.circuit_reset)
+                self._breakers[host] = breaker
+            return breaker
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when given."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, url: str, retry: Optional[bool] = None, **kwargs) -> requests.Response:
+        """Send a request through the host's pooled session.
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            retry: Retry transient failures. Defaults to True for idempotent methods.
+            **kwargs: Passed to requests (headers, json, data, stream, verify, timeout...)
+
+        Returns:
+            The final response (which may still be an error status)
+
+        Raises:
+            CircuitOpenError: If the host's circuit breaker is open
+            requests.exceptions.RequestException: If the request could not be completed
+        """
+        method = method.upper()
+        retry = method in IDEMPOTENT_METHODS if retry is None else retry
+        attempts = 1 + (self.max_retries if retry else 0)
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        session = self.session_for(url)
+        breaker = self.breaker_for(url)
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {self._host(url)}; not sending request")
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({str(e)}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if response.status_code in RETRY_STATUSES and attempt + 1 < attempts:
+                delay = self._backoff(attempt, response)
+                logger.warning(f"{method} {url} returned {response.status_code}; retrying in {delay:.1f}s")
+                response.close()
+                time.sleep(delay)
+                continue
+            return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close every pooled session."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Global HTTP client instance
+http_client = HttpClient()
@@ -0,0 +1,457 @@
+"""
+Background Job Manager
+
+Runs long pipelines (audio, slides, video, paper ingestion) outside the HTTP
+request and persists their state under temp/jobs so clients can poll for
+progress.
+
+Several worker processes (``uvicorn --workers N``) share temp/jobs:
+- every process holds an exclusive lock on ``temp/jobs/.owners/<id>.lock``
+  for its lifetime, and each job records the process that runs it. A queued
+  or running job is failed as interrupted only once its owner's lock can be
+  taken, i.e. that process is gone, however it ended.
+- MAX_CONCURRENT_JOBS slots are lock files under ``temp/jobs/.slots``, so the
+  limit holds across processes.
+- job creation and updates are serialized by ``temp/jobs/.lock``.
+- ``temp/jobs/.active`` holds one small file per queued or running job, named
+  after its type and paper and containing its ID, so finding a paper's
+  active job or all active jobs never reads the finished ones.
+The OS drops these locks when a process dies. Without ``fcntl`` (Windows),
+the limit and locking are per process and owners are checked by pid.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from app.services.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+# How often a throttled job waiting for a free slot retries
+SLOT_POLL_SECONDS = 1.0
+
+
+def _try_lock(fd: int) -> bool:
+    """Take an exclusive lock on an open file without waiting."""
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class JobProgress:
+    """Progress reporter handed to job functions.
+
+    A reporter without a manager is a no-op, so the same pipeline function can
+    be called inline from a request handler or from a background job.
+    """
+
+    def __init__(self, manager: Optional["JobManager"] = None, job_id: Optional[str] = None):
+        self.manager = manager
+        self.job_id = job_id
+
+    def start_stage(self, name: str, message: Optional[str] = None):
+        """Mark a stage as running (and any previously running stage as done)."""
+        if not self.manager:
+            return
+
+        def apply(job):
+            for stage in job["stages"]:
+                if stage["status"] == "running":
+                    stage["status"] = "done"
+                    stage["progress"] = 1.0
+            stage = _find_or_add_stage(job, name)
+            stage["status"] = "running"
+            stage["progress"] = 0.0
+            job["current_stage"] = name
+            if message:
+                job["message"] = message
+
+        self.manager._update_job(self.job_id, apply)
+
+    def update(self, progress: float, message: Optional[str] = None):
+        """Set the progress (0.0 - 1.0) of the currently running stage."""
+        if not self.manager:
+            return
+
+        def apply(job):
+            current = job.get("current_stage")
+            if current:
+                stage = _find_or_add_stage(job, current)
+                stage["progress"] = round(max(0.0, min(1.0, progress)), 3)
+            if message:
+                job["message"] = message
+
+        self.manager._update_job(self.job_id, apply)
+
+
+def _find_or_add_stage(job: Dict[str, Any], name: str) -> Dict[str, Any]:
+    for stage in job["stages"]:
+        if stage["name"] == name:
+            return stage
+    stage = {"name": name, "status": "pending", "progress": 0.0}
+    job["stages"].append(stage)
+    return stage
+
+
+def _overall_progress(job: Dict[str, Any]) -> float:
+    stages = job.get("stages", [])
+    if not stages:
+        return 1.0 if job.get("status") == "done" else 0.0
+    return round(sum(stage.get("progress", 0.0) for stage in stages) / len(stages), 3)
+
+
+class JobManager:
+    """Persists job state on disk and runs jobs with bounded concurrency."""
+
+    def __init__(self, jobs_dir: str = "temp/jobs", max_concurrent_jobs: Optional[int] = None):
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_concurrent_jobs = max_concurrent_jobs or int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._interrupted_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.owner = {"id": uuid.uuid4().hex, "pid": os.getpid(), "host": socket.gethostname()}
+        self._owner_lock = self._hold_owner_lock()
+
+    def _hold_owner_lock(self):
+        """Lock that marks this process as alive for as long as it runs."""
+        if fcntl is None:
+            return None
+        owners_dir = self.jobs_dir / ".owners"
+        owners_dir.mkdir(exist_ok=True)
+        lock = open(owners_dir / f"{self.owner['id']}.lock", "w")
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        return lock
+
+    def owner_alive(self, owner: Optional[Dict[str, Any]]) -> bool:
+        if not owner:
+            # Written before owners were recorded, i.e. by an earlier server run
+            return False
+        if owner.get("id") == self.owner["id"]:
+            return True
+        if fcntl is None:
+            return owner.get("host") != self.owner["host"] or _pid_alive(owner.get("pid", 0))
+        lock_path = self.jobs_dir / ".owners" / f"{owner.get('id')}.lock"
+        try:
+            fd = os.open(lock_path, os.O_RDWR)
+        except OSError:
+            return False
+        try:
+            if not _try_lock(fd):
+                return True
+            # Nobody holds it: the owner is gone
+            os.unlink(lock_path)
+            return False
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def _locked(self):
+        """Serialize job file changes among threads and worker processes."""
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.jobs_dir / ".lock", "w")
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _job_file(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _active_file(self, job_type: str, paper_id: str) -> Path:
+        name = re.sub(r"[^A-Za-z0-9_-]", "_", f"{job_type}--{paper_id}")
+        return self.jobs_dir / ".active" / name
+
+    def _write_job(self, job: Dict[str, Any]):
+        """Write job state atomically so pollers never see a partial file. Call under _locked()."""
+        job["updated_at"] = datetime.now().isoformat()
+        job["progress"] = _overall_progress(job)
+        job_file = self._job_file(job["job_id"])
+        temp_file = job_file.with_suffix(".json.tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(job, f, default=str, indent=2)
+        os.replace(temp_file, job_file)
+        self._index_active(job)
+
+    def _index_active(self, job: Dict[str, Any]):
+        """Point the job's ``.active`` entry at it while it is active, drop it after."""
+        active_file = self._active_file(job["job_type"], job["paper_id"])
+        current = self._read_active(active_file)
+        if job["status"] in ACTIVE_STATUSES:
+            # Anything else it points to is finished, or submit() would have reused it
+            if current != job["job_id"]:
+                active_file.parent.mkdir(exist_ok=True)
+                active_file.write_text(job["job_id"], encoding="utf-8")
+        elif current == job["job_id"]:
+            active_file.unlink()
+
+    def _read_active(self, active_file: Path) -> Optional[str]:
+        try:
+            return active_file.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def _read_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job_file = self._job_file(job_id)
+        if not job_file.exists():
+            return None
+        try:
+            with open(job_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading job {job_id}: {str(e)}")
+            return None
+
+    def _update_job(self, job_id: str, apply: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        with self._locked():
+            job = self._read_job(job_id)
+            if job is None:
+                return None
+            apply(job)
+            self._write_job(job)
+            return job
+
+    def on_interrupted(self, job_type: str, handler: Callable[[Dict[str, Any]], None]):
+        """Call ``handler(job)`` when a job of this type is failed because its process died."""
+        self._interrupted_handlers[job_type] = handler
+
+    def _fail_if_orphaned(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Fail an active job whose owning process is gone; such a job can never finish."""
+        if job.get("status") not in ACTIVE_STATUSES or self.owner_alive(job.get("owner")):
+            return job
+        interrupted = []
+
+        def apply(current):
+            if current.get("status") in ACTIVE_STATUSES:
+                current["status"] = "failed"
+                current["error"] = "Interrupted by server restart"
+                current["finished_at"] = datetime.now().isoformat()
+                interrupted.append(True)
+
+        job = self._update_job(job["job_id"], apply) or job
+        handler = self._interrupted_handlers.get(job.get("job_type"))
+        if interrupted and handler:
+            try:
+                handler(job)
+            except Exception as e:
+                logger.error(f"Error handling interrupted job {job['job_id']}: {str(e)}")
+        return job
+
+    def recover_interrupted_jobs(self):
+        """Fail the queued or running jobs of processes that are no longer running.
+
+        Also brings ``.active`` in line with the job files: entries whose job
+        is gone or finished are dropped, and live jobs without one get one.
+        """
+        for job_file in self.jobs_dir.glob("*.json"):
+            job = self._read_job(job_file.stem)
+            if job and self._fail_if_orphaned(job).get("status") in ACTIVE_STATUSES:
+                with self._locked():
+                    job = self._read_job(job_file.stem)
+                    if job:
+                        self._index_active(job)
+        with self._locked():
+            for active_file in (self.jobs_dir / ".active").glob("*"):
+                job_id = self._read_active(active_file)
+                job = self._read_job(job_id) if job_id else None
+                if not job or job.get("status") not in ACTIVE_STATUSES:
+                    active_file.unlink()
+        # Lock files of processes that ended without running a job
+        for lock_path in (self.jobs_dir / ".owners").glob("*.lock"):
+            self.owner_alive({"id": lock_path.stem})
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get job state by ID."""
+        job = self._read_job(job_id)
+        return self._fail_if_orphaned(job) if job else None
+
+    def list_jobs(self, paper_id: Optional[str] = None, job_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List jobs, newest first, optionally filtered by paper or type."""
+        jobs = []
+        for job_file in self.jobs_dir.glob("*.json"):
+            job = self.get_job(job_file.stem)
+            if not job:
+                continue
+            if paper_id and job.get("paper_id") != paper_id:
+                continue
+            if job_type and job.get("job_type") != job_type:
+                continue
+            jobs.append(job)
+        return sorted(jobs, key=lambda j: j.get("created_at", ""), reverse=True)
+
+    def find_active_job(self, job_type: str, paper_id: str) -> Optional[Dict[str, Any]]:
+        """Return the queued/running job of this type for a paper, if any."""
+        job_id = self._read_active(self._active_file(job_type, paper_id))
+        job = self.get_job(job_id) if job_id else None
+        if job and job.get("status") in ACTIVE_STATUSES:
+            return job
+        return None
+
+    def active_jobs(self) -> List[Dict[str, Any]]:
+        """All queued or running jobs."""
+        jobs = []
+        active_dir = self.jobs_dir / ".active"
+        for active_file in active_dir.glob("*") if active_dir.exists() else []:
+            job_id = self._read_active(active_file)
+            job = self.get_job(job_id) if job_id else None
+            if job and job.get("status") in ACTIVE_STATUSES:
+                jobs.append(job)
+        return jobs
+
+    def submit(
+        self,
+        job_type: str,
+        paper_id: str,
+        func: Callable[..., Any],
+        *args,
+        stages: Optional[List[str]] = None,
+        throttled: bool = True,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Queue ``func(*args, progress=JobProgress, **kwargs)`` and return the job record.
+
+        Must be called from a running event loop (i.e. a request handler). If a
+        job of the same type is already active for the paper, that job is
+        returned instead of starting a duplicate. ``func`` may be a coroutine
+        function, in which case it runs on the event loop instead of a thread.
+        Jobs submitted with ``throttled=False`` start at once instead of waiting
+        for one of the MAX_CONCURRENT_JOBS slots; use it for work that is
+        already bounded by the process pool and that the UI is blocked on.
+        """
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "job_type": job_type,
+            "paper_id": paper_id,
+            "owner": self.owner,
+            "status": "queued",
+            "stages": [{"name": name, "status": "pending", "progress": 0.0} for name in (stages or [])],
+            "current_stage": None,
+            "message": None,
+            "result": None,
+            "error": None,
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        # Find-or-create in one step, so concurrent submits (from any worker) share one job
+        with self._locked():
+            existing = self.find_active_job(job_type, paper_id)
+            if existing:
+                logger.info(f"Reusing active {job_type} job {existing['job_id']} for paper {paper_id}")
+                return existing
+            self._write_job(job)
+
+        task = asyncio.get_running_loop().create_task(self._run(job_id, func, args, kwargs, throttled))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+        logger.info(f"Queued {job_type} job {job_id} for paper {paper_id}")
+        return self.get_job(job_id)
+
+    async def _acquire_slot(self):
+        """One of the MAX_CONCURRENT_JOBS slots shared by all worker processes."""
+        slots_dir = self.jobs_dir / ".slots"
+        slots_dir.mkdir(exist_ok=True)
+        while True:
+            for index in range(self.max_concurrent_jobs):
+                slot = open(slots_dir / f"{index}.lock", "w")
+                if _try_lock(slot.fileno()):
+                    return slot
+                slot.close()
+            await asyncio.sleep(SLOT_POLL_SECONDS)
+
+    async def _run(self, job_id: str, func: Callable[..., Any], args: tuple, kwargs: dict, throttled: bool = True):
+        if not throttled:
+            await self._execute(job_id, func, args, kwargs)
+        elif fcntl is None:
+            async with self._semaphore:
+                await self._execute(job_id, func, args, kwargs)
+        else:
+            slot = await self._acquire_slot()
+            try:
+                await self._execute(job_id, func, args, kwargs)
+            finally:
+                slot.close()
+
+    async def _execute(self, job_id: str, func: Callable[..., Any], args: tuple, kwargs: dict):
+        def mark_running(job):
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+
+        self._update_job(job_id, mark_running)
+        progress = JobProgress(self, job_id)
+
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = await func(*args, progress=progress, **kwargs)
+            else:
+                result = await run_blocking(func, *args, progress=progress, **kwargs)
+        except Exception as e:
+            error_message = getattr(e, "detail", None) or str(e)
+            logger.error(f"Job {job_id} failed: {error_message}")
+            logger.error(traceback.format_exc())
+
+            def mark_failed(job):
+                job["status"] = "failed"
+                job["error"] = error_message
+                job["finished_at"] = datetime.now().isoformat()
+                for stage in job["stages"]:
+                    if stage["status"] == "running":
+                        stage["status"] = "failed"
+
+            self._update_job(job_id, mark_failed)
+            return
+
+        def mark_done(job):
+            job["status"] = "done"
+            job["result"] = result
+            job["current_stage"] = None
+            job["finished_at"] = datetime.now().isoformat()
+            for stage in job["stages"]:
+                stage["status"] = "done"
+                stage["progress"] = 1.0
+
+        self._update_job(job_id, mark_done)
+        logger.info(f"Job {job_id} finished")
+
+
+# Global job manager instance
+job_manager = JobManager()
@@ -3,113 +3,100 @@ import re
 from pathlib import Path
 from typing import List, Dict
 
+from app.services.figure_resolver import RASTER_EXTENSIONS, FigureResolver, parse_graphicspath
+from app.services.latex_project import find_main_tex_file, read_latex_document, latex_projects
+
 def find_tex_file(directory):
     """Find the main .tex file in a directory."""
-    tex_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.tex'):
-                tex_files.append(os.path.join(root, file))
-    
-    if not tex_files:
-        raise FileNotFoundError("No .tex files found in the directory")
-    
-    # Prefer main.tex or files with \documentclass
-    for tex_file in tex_files:
-        try:
-            with open(tex_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if '\\documentclass' in content:
-                    return tex_file
-        except:
-            continue
-    
-    # Return the first .tex file found
-    return tex_files[0]
+    return find_main_tex_file(directory)
 
 def find_image_references(tex_file_path):
-    """Find image references in LaTeX file."""
+    """Find image references in LaTeX file, in document order."""
     image_refs = []
     
     try:
-        with open(tex_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Read the flattened document so figures in \input files are found too
+        content = read_latex_document(tex_file_path)
         
-        # Find \includegraphics commands
-        includegraphics_pattern = r'\\includegraphics(?:\[[^\]]*\])?\{([^}]+)\}'
-        matches = re.findall(includegraphics_pattern, content)
-        image_refs.extend(matches)
-        
-        # Find \figure and \begin{figure} environments
-        figure_pattern = r'\\begin\{figure\}.*?\\end\{figure\}'
-        figure_matches = re.findall(figure_pattern, content, re.DOTALL)
-        
-        for figure in figure_matches:
-            img_matches = re.findall(includegraphics_pattern, figure)
-            image_refs.extend(img_matches)
+        # Find \includegraphics commands (inside figure environments or not)
+        includegraphics_pattern = r'\\includegraphics\*?(?:\[[^\]]*\])?\{([^}]+)\}'
+        image_refs.extend(re.findall(includegraphics_pattern, content))
             
     except Exception as e:
         print(f"Error finding image references: {e}")
     
-    return list(set(image_refs))  # Remove duplicates
+    return list(dict.fromkeys(ref.strip() for ref in image_refs))  # Remove duplicates
 
-def find_image_files(directory, image_refs):
-    """Find actual image files in the directory."""
-    image_files = []
-    image_extensions = ['.png', '.jpg', '.jpeg', '.pdf', '.eps', '.svg']
-    
-    # Search for all image files in directory
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            file_lower = file.lower()
-            if any(file_lower.endswith(ext) for ext in image_extensions):
-                full_path = os.path.join(root, file)
-                
-                # Convert PDF to PNG if needed
-                if file_lower.endswith('.pdf'):
-                    try:
-                        png_path = os.path.splitext(full_path)[0] + '.png'
-                        # Use pdf2image or similar library to convert PDF to PNG
-                        convert_pdf_to_png(full_path, png_path)
-                        if os.path.exists(png_path):
-                            image_files.append(png_path)
-                        else:
-                            image_files.append(full_path)  # Fall back to PDF if conversion fails
-                    except Exception as e:
-                        print(f"Error converting PDF to PNG: {e}")
-                        image_files.append(full_path)  # Fall back to PDF
-                else:
-                    image_files.append(full_path)
+def find_graphics_paths(tex_file_path):
+    """Directories listed in the document's \\graphicspath, in order."""
+    try:
+        return parse_graphicspath(read_latex_document(tex_file_path))
+    except Exception as e:
+        print(f"Error reading graphicspath: {e}")
+        return []
+
+def find_image_files(directory, image_refs, tex_file_path=None):
+    """Find the image files a document references.
+
+    References are resolved like graphicx does (main file directory, then
+    \\graphicspath entries, then LaTeX's extension order) through an index
+    of the source tree; see app.services.figure_resolver.
+
+    Nothing is converted here: referenced PDFs are returned as-is and turned
+    into PNGs afterwards by app.services.figure_rasterizer, so figures the
+    paper never uses are not rendered at all. When no reference resolves,
+    the tree's raster images are returned instead; its PDFs (often every
+    page of a bundled paper or slide deck) are left alone.
+    """
+    resolver = FigureResolver(directory)
     
-    # If we have specific references, try to match them
+    # If we have specific references, resolve them
     if image_refs:
-        matched_files = []
-        for ref in image_refs:
-            ref_name = os.path.basename(ref)
-            ref_name_no_ext = os.path.splitext(ref_name)[0]
-            
-            for img_file in image_files:
-                img_name = os.path.basename(img_file)
-                img_name_no_ext = os.path.splitext(img_name)[0]
-                
-                if (ref_name in img_name or 
-                    ref_name_no_ext in img_name_no_ext or
-                    img_name_no_ext in ref_name_no_ext):
-                    matched_files.append(img_file)
-                    break
+        base_dir = os.path.dirname(tex_file_path) if tex_file_path else None
+        graphics_paths = find_graphics_paths(tex_file_path) if tex_file_path else []
+        matched_files = resolver.resolve_all(image_refs, base_dir, graphics_paths)
         
         if matched_files:
             return matched_files
     
-    return image_files
+    return [path for path in resolver.files if os.path.splitext(path)[1].lower() in RASTER_EXTENSIONS]
 
-def convert_pdf_to_png(pdf_path, png_path):
-    """Convert PDF file to PNG using pdf2image."""
+def process_latex_source(source_dir):
+    """Locate the main .tex file, its metadata and its images in an extracted source tree.
+
+    Runs in a worker process (see app.services.executor), so it only takes and
+    returns plain data. Referenced PDF figures come back unconverted; callers
+    pass ``image_files`` through ``figure_rasterizer.rasterize_all``.
+    """
+    from app.services.script_generator import extract_paper_metadata
+
+    tex_file_path = find_tex_file(source_dir)
+    # Index the include graph once; the helpers below read the cached result
+    latex_projects.get(tex_file_path)
+    metadata = extract_paper_metadata(tex_file_path)
+    image_refs = find_image_references(tex_file_path)
+    image_files = find_image_files(source_dir, image_refs, tex_file_path)
+
+    return {
+        "tex_file_path": tex_file_path,
+        "metadata": metadata,
+        "image_files": image_files
+    }
+
+def convert_pdf_to_png(pdf_path, png_path, width=None):
+    """Convert PDF file to PNG using pdf2image.
+
+    With ``width`` the page is rendered to that many pixels across (height
+    follows the aspect ratio); otherwise at 300 DPI.
+    """
     try:
         from pdf2image import convert_from_path
         
         # Convert the first page of the PDF to PNG
-        images = convert_from_path(pdf_path, dpi=300, first_page=1, last_page=1)
+        if width:
+            images = convert_from_path(pdf_path, size=(width, None), first_page=1, last_page=1)
+        else:
+            images = convert_from_path(pdf_path, dpi=300, first_page=1, last_page=1)
         if images:
             images[0].save(png_path, 'PNG')
             print(f"Successfully converted {pdf_path} to {png_path}")
@@ -127,17 +114,12 @@ def extract_image_captions(tex_file_path):
     captions = {}
     
     try:
-        with open(tex_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Find figure environments with captions
-        figure_pattern = r'\\begin\{figure\}(.*?)\\end\{figure\}'
-        figures = re.findall(figure_pattern, content, re.DOTALL)
+        # Figure environments with captions, from the tokenizer's figure events
+        figures = latex_projects.get(tex_file_path).document.events_of("figure")
         
         for i, figure in enumerate(figures):
-            caption_match = re.search(r'\\caption\{([^}]+)\}', figure)
-            if caption_match:
-                captions[f"figure_{i}"] = caption_match.group(1)
+            if figure["caption"]:
+                captions[f"figure_{i}"] = figure["caption"]
                 
     except Exception as e:
         print(f"Error extracting captions: {e}")
@@ -0,0 +1,334 @@
+"""
+LaTeX Project Index
+
+A paper's LaTeX source is often split across files pulled in with
+``\\input``/``\\include`` (and ``\\subfile``, ``\\import``, ``\\subimport``).
+This module picks the main file, walks that include graph once and builds the
+flattened document, with comments stripped and line numbers preserved. A
+source map ties every offset in the flattened text back to its file and line.
+
+Metadata, image references, captions and text extraction all read the
+flattened document instead of re-reading the main file. That way content in
+included files is no longer missed.
+
+Indexes are cached in the "latex_index" repository table, keyed by the main
+file's absolute path. A cached index is reused while every file in its include
+graph keeps the same size and mtime and no include that was missing has
+appeared. The last few indexes are also kept in memory per process.
+"""
+import bisect
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.latex_tokenizer import LatexDocument, parse_latex
+from app.services.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+MAX_INCLUDE_DEPTH = 20
+MEMORY_CACHE_SIZE = 32
+
+# A % starts a comment unless escaped by an odd number of backslashes ("\\%" is a line break, then a comment)
+COMMENT_PATTERN = re.compile(r'(?<!\\)((?:\\\\)*)%.*')
+INCLUDE_PATTERN = re.compile(
+    r'\\(?P<cmd>input|include|subfile)\s*\{(?P<name>[^}]+)\}'
+    r'|\\(?P<bare>input)\s+(?P<bare_name>[^\s{}\\%]+)'
+    r'|\\(?P<icmd>import|subimport|inputfrom|subinputfrom|includefrom|subincludefrom)\*?'
+    r'\s*\{(?P<idir>[^}]*)\}\s*\{(?P<iname>[^}]+)\}'
+)
+PREFERRED_MAIN_NAMES = ("main.tex", "ms.tex", "paper.tex", "article.tex")
+
+
+def _read_tex(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def _strip_comments(content: str) -> str:
+    """Drop % comments but keep every line (so line numbers stay valid)."""
+    return COMMENT_PATTERN.sub(r'\1', content)
+
+
+def _file_stamp(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def find_main_tex_file(directory: str) -> str:
+    """
+    Pick the main .tex file of a source tree, reading each file at most once.
+
+    Files with ``\\documentclass`` win. Ties go to files that also contain
+    ``\\begin{document}``, then to conventional names (main.tex, ms.tex...),
+    then to the shallowest, largest file.
+    """
+    tex_files = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.tex'):
+                tex_files.append(os.path.join(root, file))
+
+    if not tex_files:
+        raise FileNotFoundError("No .tex files found in the directory")
+
+    candidates = []
+    for tex_file in tex_files:
+        try:
+            content = _strip_comments(_read_tex(tex_file))
+        except OSError:
+            continue
+        if '\\documentclass' not in content:
+            continue
+        candidates.append((
+            '\\begin{document}' not in content,
+            os.path.basename(tex_file).lower() not in PREFERRED_MAIN_NAMES,
+            os.path.relpath(tex_file, directory).count(os.sep),
+            -len(content),
+            tex_file,
+        ))
+
+    if candidates:
+        return min(candidates)[-1]
+    # Return the first .tex file found
+    return tex_files[0]
+
+
+class LatexProject:
+    """Flattened view of a LaTeX document and its include graph."""
+
+    def __init__(self, main_file: str, text: str, files: Dict[str, List[int]],
+                 segments: List[Tuple[int, str, int]], missing: List[str],
+                 missing_paths: Optional[List[str]] = None):
+        self.main_file = main_file
+        self.root_dir = os.path.dirname(main_file)
+        self.text = text
+        # path -> [size, mtime_ns] for every file in the include graph
+        self.files = files
+        # (offset in text, file, line in file) for each emitted chunk
+        self.segments = segments
+        self.missing = missing
+        # Paths that would have satisfied a missing include (None: not recorded)
+        self.missing_paths = missing_paths
+        self._offsets = [offset for offset, _, _ in segments]
+        self._document: Optional[LatexDocument] = None
+
+    @property
+    def document(self) -> LatexDocument:
+        """Prose, sections and structural events of the flattened text (parsed once)."""
+        if self._document is None:
+            self._document = parse_latex(self.text)
+        return self._document
+
+    @property
+    def file_paths(self) -> List[str]:
+        return list(self.files)
+
+    def locate(self, offset: int) -> Tuple[str, int]:
+        """Map an offset in the flattened text to (file, 1-based line)."""
+        index = max(0, bisect.bisect_right(self._offsets, offset) - 1)
+        start, path, line = self.segments[index]
+        return path, line + self.text.count('\n', start, offset)
+
+    def is_current(self) -> bool:
+        """True if no file in the include graph changed and no missing include appeared since indexing."""
+        if self.missing_paths is None and self.missing:
+            # Indexed before candidate paths were recorded
+            return False
+        if any(os.path.isfile(path) for path in self.missing_paths or []):
+            return False
+        return all(_file_stamp(path) == stamp for path, stamp in self.files.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "main_file": self.main_file,
+            "text": self.text,
+            "files": self.files,
+            "segments": self.segments,
+            "missing": self.missing,
+            "missing_paths": self.missing_paths,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatexProject":
+        return cls(
+            data["main_file"],
+            data["text"],
+            data["files"],
+            [tuple(segment) for segment in data["segments"]],
+            data.get("missing", []),
+            data.get("missing_paths"),
+        )
+
+
+class _Flattener:
+    """Expands include commands recursively, recording a source map."""
+
+    def __init__(self, main_file: str):
+        self.base_dir = os.path.dirname(main_file)
+        self.root = os.path.realpath(self.base_dir)
+        self.parts: List[str] = []
+        self.segments: List[Tuple[int, str, int]] = []
+        self.files: Dict[str, List[int]] = {}
+        self.missing: List[str] = []
+        self.missing_paths: List[str] = []
+        self.offset = 0
+
+    def _emit(self, text: str, path: str, line: int):
+        if not text:
+            return
+        self.segments.append((self.offset, path, line))
+        self.parts.append(text)
+        self.offset += len(text)
+
+    def _candidates(self, name: str, search_dirs: List[str]) -> List[str]:
+        name = name.strip()
+        paths = []
+        for directory in search_dirs:
+            for candidate in (name, name + '.tex'):
+                path = os.path.normpath(os.path.join(directory, candidate))
+                # Paper sources are untrusted: never read outside the project
+                if os.path.realpath(path).startswith(self.root + os.sep):
+                    paths.append(path)
+        return paths
+
+    def _resolve(self, name: str, search_dirs: List[str]) -> Optional[str]:
+        candidates = self._candidates(name, search_dirs)
+        for path in candidates:
+            if os.path.isfile(path):
+                return path
+        # Checked again by is_current, so adding the file later rebuilds the index
+        self.missing_paths.extend(candidates)
+        return None
+
+    def expand(self, path: str, stack: Tuple[str, ...] = ()):
+        real = os.path.realpath(path)
+        if real in stack or len(stack) >= MAX_INCLUDE_DEPTH:
+            logger.warning(f"Skipping recursive or too deep include of {path}")
+            return
+        try:
+            content = _strip_comments(_read_tex(path))
+        except OSError as e:
+            logger.warning(f"Could not read {path}: {str(e)}")
+            self.missing.append(path)
+            if not os.path.isfile(path):
+                # Removed since it was resolved; unreadable files are not retried on every lookup
+                self.missing_paths.append(path)
+            return
+        self.files[path] = _file_stamp(path)
+
+        current_dir = os.path.dirname(path)
+        position = 0
+        line = 1
+        for match in INCLUDE_PATTERN.finditer(content):
+            before = content[position:match.start()]
+            self._emit(before, path, line)
+            line += before.count('\n')
+
+            if match.group('cmd'):
+                name, dirs = match.group('name'), [self.base_dir, current_dir]
+            elif match.group('bare'):
+                name, dirs = match.group('bare_name'), [self.base_dir, current_dir]
+            else:
+                import_dir = match.group('idir')
+                relative = match.group('icmd').startswith('sub')
+                base = current_dir if relative else self.base_dir
+                name, dirs = match.group('iname'), [os.path.join(base, import_dir)]
+
+            target = self._resolve(name, dirs)
+            if target is None:
+                logger.info(f"Include not found: {name} (from {path})")
+                self.missing.append(name)
+                self._emit(match.group(0), path, line)
+            else:
+                self.expand(target, stack + (real,))
+                # Keep the included text on its own lines
+                self._emit('\n', path, line)
+            line += match.group(0).count('\n')
+            position = match.end()
+
+        self._emit(content[position:], path, line)
+
+
+def build_latex_project(main_file: str) -> LatexProject:
+    """Flatten a LaTeX document starting from its main file."""
+    flattener = _Flattener(main_file)
+    flattener.expand(main_file)
+    return LatexProject(
+        main_file,
+        "".join(flattener.parts),
+        flattener.files,
+        flattener.segments,
+        flattener.missing,
+        flattener.missing_paths,
+    )
+
+
+class LatexProjectIndex:
+    """Cache of flattened LaTeX projects (repository table + small in-memory LRU)."""
+
+    def __init__(self):
+        self.table = Repository("latex_index")
+        self._memory: "OrderedDict[str, LatexProject]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, project: LatexProject):
+        with self._lock:
+            self._memory[key] = project
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_CACHE_SIZE:
+                self._memory.popitem(last=False)
+
+    def get(self, main_file: str) -> LatexProject:
+        """Flattened project for a main .tex file, rebuilt only if a file changed."""
+        key = os.path.abspath(main_file)
+        with self._lock:
+            project = self._memory.get(key)
+        if project is not None and project.is_current():
+            return project
+
+        stored = self.table.get(key)
+        if stored is not None:
+            project = LatexProject.from_dict(stored)
+            if project.is_current():
+                self._remember(key, project)
+                return project
+
+        project = build_latex_project(key)
+        self.table[key] = project.to_dict()
+        self._remember(key, project)
+        logger.info(f"Indexed LaTeX project {key}: {len(project.files)} files, {len(project.text)} chars")
+        return project
+
+    def for_directory(self, directory: str) -> LatexProject:
+        """Find the main file of a source tree and return its flattened project."""
+        return self.get(find_main_tex_file(directory))
+
+    def prune(self) -> int:
+        """Drop indexes whose main file no longer exists; returns how many."""
+        stale = [key for key in self.table if not os.path.exists(key)]
+        for key in stale:
+            self.invalidate(key)
+        return len(stale)
+
+    def invalidate(self, main_file: str):
+        key = os.path.abspath(main_file)
+        with self._lock:
+            self._memory.pop(key, None)
+        self.table.pop(key, None)
+
+
+def read_latex_document(tex_file_path: str) -> str:
+    """The flattened text of the document rooted at ``tex_file_path``."""
+    return latex_projects.get(tex_file_path).text
+
+
+# Global project index
+latex_projects = LatexProjectIndex()
@@ -0,0 +1,435 @@
+"""
+LaTeX Tokenizer
+
+Single-pass replacement for the regex chain that used to strip LaTeX markup.
+``tokenize`` scans the source once and produces commands, group braces, math
+shifts and text runs. ``parse_latex`` walks those tokens once and returns:
+- ``prose``: readable text with paragraph breaks, section headings on their
+  own lines and inline math kept as ``$...$``
+- ``events``: structural events in document order (section, figure, table,
+  caption, equation), each tagged with the section it appears in
+- ``sections``: section title -> prose of that section
+
+Both passes are linear in the size of the input. Display math, floats,
+bibliographies and verbatim blocks are kept out of the prose and reported as
+events or skipped.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Token kinds
+COMMAND = "command"
+BEGIN_GROUP = "{"
+END_GROUP = "}"
+MATH_SHIFT = "$"
+TEXT = "text"
+
+# One alternation per token kind. Together they match every character, so
+# findall() returns contiguous pieces and positions are running lengths.
+TOKEN_PATTERN = re.compile(
+    r'\\(?:([a-zA-Z@]+\*?)|(.?))'    # control word, control symbol
+    r'|([{}])'                        # group braces
+    r'|(\$\$?)'                       # math shift
+    r'|(%[^\n]*)'                     # comment (skipped)
+    r'|(~)'                           # tie
+    r'|([\[\]]|[^\\{}$%~\[\]]+)',     # brackets (for optional args) and text runs
+    re.DOTALL
+)
+
+SECTION_LEVELS = {
+    "part": 0, "chapter": 1, "section": 2, "subsection": 3,
+    "subsubsection": 4, "paragraph": 5, "subparagraph": 6,
+}
+# Commands whose arguments are not prose
+DROP_ARGS = {
+    "documentclass", "usepackage", "RequirePackage", "newcommand", "renewcommand",
+    "providecommand", "newenvironment", "renewenvironment", "def", "let",
+    "DeclareMathOperator", "newtheorem", "setlength", "setcounter", "addtolength",
+    "vspace", "hspace", "label", "ref", "eqref", "autoref", "cref", "Cref", "pageref",
+    "cite", "citep", "citet", "citealp", "citeauthor", "citeyear", "nocite",
+    "includegraphics", "bibliography", "bibliographystyle", "graphicspath",
+    "title", "author", "date", "thanks", "affiliation", "address", "email",
+    "institute", "keywords", "maketitle", "url", "href", "hypersetup",
+    "pagestyle", "thispagestyle", "input", "include", "color", "definecolor",
+    "caption", "footnote", "bibitem",
+}
+DEFINITIONS = {"def", "let", "newcommand", "renewcommand", "providecommand", "DeclareMathOperator"}
+SYMBOLS = {
+    "%": "%", "&": "&", "$": "$", "#": "#", "_": "_", "{": "{", "}": "}",
+    ",": " ", ";": " ", ":": " ", " ": " ", "\\": "\n", "-": "",
+    "ldots": "...", "dots": "...", "LaTeX": "LaTeX", "TeX": "TeX", "etal": "et al.",
+    "ie": "i.e.", "eg": "e.g.", "textendash": "-", "textemdash": "-", "S": "Section ",
+    "par": "\n\n", "noindent": "", "quad": " ", "qquad": " ",
+}
+FLOAT_ENVIRONMENTS = {"figure", "figure*", "table", "table*", "wrapfigure", "wraptable", "algorithm", "algorithm*"}
+MATH_ENVIRONMENTS = {
+    "equation", "equation*", "align", "align*", "gather", "gather*", "multline",
+    "multline*", "eqnarray", "eqnarray*", "displaymath", "math", "flalign", "flalign*",
+}
+SKIP_ENVIRONMENTS = {
+    "thebibliography", "verbatim", "verbatim*", "lstlisting", "minted", "comment",
+    "tikzpicture", "tabular", "tabular*", "tabularx", "filecontents", "filecontents*",
+}
+
+Token = Tuple[str, str, int, int]
+
+
+def tokenize(source: str) -> List[Token]:
+    """Split LaTeX source into (kind, value, start, end) tokens in one scan."""
+    tokens: List[Token] = []
+    append = tokens.append
+    position = 0
+    for word, symbol, brace, math, comment, tie, text in TOKEN_PATTERN.findall(source):
+        if text:
+            end = position + len(text)
+            append((TEXT, text, position, end))
+        elif word:
+            end = position + 1 + len(word)
+            append((COMMAND, word, position, end))
+        elif brace:
+            end = position + 1
+            append((brace, brace, position, end))
+        elif comment:
+            end = position + len(comment)
+        elif math:
+            end = position + len(math)
+            append((MATH_SHIFT, math, position, end))
+        elif tie:
+            end = position + 1
+            append((TEXT, " ", position, end))
+        else:
+            end = position + 1 + len(symbol)
+            append((COMMAND, symbol, position, end))
+        position = end
+    return tokens
+
+
+class LatexDocument:
+    """Result of walking a LaTeX document."""
+
+    def __init__(self, prose: str, events: List[Dict[str, Any]], sections: Dict[str, str]):
+        self.prose = prose
+        self.events = events
+        self.sections = sections
+
+    def events_of(self, kind: str) -> List[Dict[str, Any]]:
+        return [event for event in self.events if event["type"] == kind]
+
+
+class _Walker:
+    """Consumes tokens once, writing prose and collecting structural events.
+
+    Nested walkers (captions, section titles, floats) share the parent's token
+    list and only walk their own index range, so nothing is tokenized twice.
+    """
+
+    def __init__(self, source: str, tokens: Optional[List[Token]] = None,
+                 start: int = 0, stop: Optional[int] = None):
+        self.source = source
+        self.tokens = tokens if tokens is not None else tokenize(source)
+        self.index = start
+        self.stop = len(self.tokens) if stop is None else stop
+        self.out: List[str] = []
+        self.length = 0
+        self.events: List[Dict[str, Any]] = []
+        self.section_starts: List[Tuple[str, int]] = []
+
+    def _sub(self, start: int, stop: int) -> "_Walker":
+        return _Walker(self.source, self.tokens, start, stop)
+
+    # Token helpers
+
+    def _peek(self) -> Optional[Token]:
+        return self.tokens[self.index] if self.index < self.stop else None
+
+    def _skip_spaces(self):
+        tokens = self.tokens
+        while self.index < self.stop and tokens[self.index][0] == TEXT and not tokens[self.index][1].strip():
+            self.index += 1
+
+    def _read_optional(self, skip_spaces: bool = True) -> Optional[Tuple[int, int]]:
+        """Consume a [...] argument if one follows; returns its inner token range."""
+        start = self.index
+        if skip_spaces:
+            self._skip_spaces()
+        token = self._peek()
+        if not token or token[0] != TEXT or token[1] != '[':
+            self.index = start
+            return None
+        self.index += 1
+        body = self.index
+        depth = 0
+        tokens = self.tokens
+        while self.index < self.stop:
+            kind, value = tokens[self.index][:2]
+            self.index += 1
+            if kind == BEGIN_GROUP:
+                depth += 1
+            elif kind == END_GROUP:
+                depth -= 1
+            elif kind == TEXT and value == ']' and depth == 0:
+                return body, self.index - 1
+        return body, self.index
+
+    def _read_group(self) -> Optional[Tuple[int, int]]:
+        """Consume a {...} argument if one follows; returns its inner token range."""
+        start = self.index
+        self._skip_spaces()
+        token = self._peek()
+        if not token or token[0] != BEGIN_GROUP:
+            self.index = start
+            return None
+        self.index += 1
+        body = self.index
+        depth = 1
+        tokens = self.tokens
+        while self.index < self.stop:
+            kind = tokens[self.index][0]
+            self.index += 1
+            if kind == BEGIN_GROUP:
+                depth += 1
+            elif kind == END_GROUP:
+                depth -= 1
+                if depth == 0:
+                    return body, self.index - 1
+        return body, self.index
+
+    def _raw(self, span: Optional[Tuple[int, int]]) -> Optional[str]:
+        """Source text covered by a token range."""
+        if span is None:
+            return None
+        first, last = span
+        if first >= last:
+            return ""
+        return self.source[self.tokens[first][2]:self.tokens[last - 1][3]]
+
+    def _text(self, span: Optional[Tuple[int, int]]) -> Optional[str]:
+        """A token range rendered as single-line plain text."""
+        return None if span is None else self._sub(*span).walk_text()
+
+    def _skip_until_end(self, env: str) -> Tuple[int, int]:
+        """Skip to the matching \\end{env}; returns the body's token range."""
+        body = self.index
+        depth = 1
+        tokens = self.tokens
+        while self.index < self.stop:
+            kind, value = tokens[self.index][:2]
+            self.index += 1
+            if kind == COMMAND and (value == "begin" or value == "end"):
+                end_of_command = self.index - 1
+                name = self._raw(self._read_group())
+                if name is not None and name.strip() == env:
+                    depth += 1 if value == "begin" else -1
+                    if depth == 0:
+                        return body, end_of_command
+        return body, self.index
+
+    # Output helpers
+
+    def _write(self, text: str):
+        if text:
+            self.out.append(text)
+            self.length += len(text)
+
+    def _event(self, kind: str, **fields):
+        section = self.section_starts[-1][0] if self.section_starts else None
+        self.events.append({"type": kind, "section": section, **fields})
+
+    # Walking
+
+    def walk(self) -> LatexDocument:
+        self._walk_until(None)
+        raw = ''.join(self.out)
+        starts = [start for _, start in self.section_starts]
+        # Section starts sit on paragraph breaks, so normalizing each chunk on
+        # its own gives the same prose as normalizing the whole text
+        chunks = [_normalize(raw[start:end]) for start, end in zip([0] + starts, starts + [len(raw)])]
+        prose = '\n\n'.join(chunk for chunk in chunks if chunk)
+        return LatexDocument(prose, self.events, self._split_sections(chunks[1:]))
+
+    def walk_text(self) -> str:
+        self._walk_until(None)
+        return ' '.join(''.join(self.out).split())
+
+    def _walk_until(self, stop: Optional[str]):
+        tokens = self.tokens
+        out = self.out
+        while self.index < self.stop:
+            kind, value, start, end = tokens[self.index]
+            self.index += 1
+            if kind == TEXT:
+                out.append(value)
+                self.length += len(value)
+            elif kind == COMMAND:
+                if value == "end" and stop == "end":
+                    self._read_group()
+                    return
+                self._command(value)
+            elif kind == BEGIN_GROUP:
+                self._walk_until(END_GROUP)
+            elif kind == END_GROUP:
+                if stop == END_GROUP:
+                    return
+            elif kind == MATH_SHIFT:
+                self._math(value, end)
+
+    def _math(self, delimiter: str, body_start: int):
+        """Inline $...$ stays in the prose; $$...$$ becomes an equation event."""
+        tokens = self.tokens
+        while self.index < self.stop:
+            kind, value, token_start, _ = tokens[self.index]
+            self.index += 1
+            if kind == MATH_SHIFT and value == delimiter:
+                latex = self.source[body_start:token_start].strip()
+                if delimiter == '$$':
+                    self._event("equation", latex=latex, display=True)
+                else:
+                    self._event("equation", latex=latex, display=False)
+                    self._write(f"${latex}$")
+                return
+
+    def _command(self, name: str):
+        if name in SYMBOLS:
+            self._write(SYMBOLS[name])
+            return
+        base = name.rstrip('*')
+        if base in SECTION_LEVELS:
+            self._read_optional()
+            title = self._text(self._read_group()) or ""
+            self._write("\n\n")
+            self._event("section", level=SECTION_LEVELS[base], title=title)
+            self.section_starts.append((title, self.length))
+            self._write(f"{title}\n\n")
+        elif name == "begin":
+            env = (self._raw(self._read_group()) or "").strip()
+            self._environment(env)
+        elif name in ("[", "("):
+            closing = "]" if name == "[" else ")"
+            body = self.index
+            tokens = self.tokens
+            while self.index < self.stop and tokens[self.index][:2] != (COMMAND, closing):
+                self.index += 1
+            latex = (self._raw((body, self.index)) or "").strip()
+            self.index = min(self.index + 1, self.stop)
+            self._event("equation", latex=latex, display=name == "[")
+            if name == "(":
+                self._write(f"${latex}$")
+        elif name == "end":
+            # Stray \end (e.g. \end{document}); matched ones are handled by _environment
+            self._read_group()
+        elif name == "item":
+            label = self._text(self._read_optional())
+            self._write("\n- " + (f"{label} " if label else ""))
+        elif base in DROP_ARGS:
+            self._drop_arguments(base)
+        # Other commands (\textbf, \emph, unknown macros...) are dropped and
+        # any {...} argument after them is walked as ordinary text
+
+    def _drop_arguments(self, name: str):
+        """Consume the arguments of a non-prose command, e.g. \\newcommand{\\x}[1]{...}."""
+        token = self._peek()
+        if name in DEFINITIONS and token and token[0] == COMMAND:
+            # The macro being defined: \def\foo... / \newcommand\foo...
+            self.index += 1
+            if name == "let":
+                # \let\a\b or \let\a=\b
+                while self._peek() and self._peek()[0] == TEXT and self._peek()[1].strip() in ("", "="):
+                    self.index += 1
+                if self._peek() and self._peek()[0] == COMMAND:
+                    self.index += 1
+                return
+            if name == "def":
+                # Parameter text (#1#2...) up to the body
+                while self._peek() and self._peek()[0] == TEXT:
+                    self.index += 1
+        self._read_optional()
+        consumed = False
+        while True:
+            if consumed and self._read_optional(skip_spaces=False) is not None:
+                continue
+            if self._read_group() is None:
+                break
+            consumed = True
+
+    def _environment(self, env: str):
+        if env in MATH_ENVIRONMENTS:
+            body = self._skip_until_end(env)
+            self._event("equation", latex=(self._raw(body) or "").strip(), display=True, environment=env)
+        elif env in FLOAT_ENVIRONMENTS:
+            self._float(env, self._skip_until_end(env))
+        elif env in SKIP_ENVIRONMENTS:
+            self._skip_until_end(env)
+        elif env == "abstract":
+            self._write("\n\n")
+            self._event("section", level=SECTION_LEVELS["section"], title="Abstract")
+            self.section_starts.append(("Abstract", self.length))
+            self._write("Abstract\n\n")
+            self._walk_until("end")
+        else:
+            self._walk_until("end")
+            if env in ("itemize", "enumerate", "description"):
+                self._write("\n")
+
+    def _float(self, env: str, body: Tuple[int, int]):
+        """Report a figure/table with its caption, label and graphics."""
+        inner = self._sub(*body)
+        caption = label = None
+        images = []
+        tokens = self.tokens
+        while inner.index < inner.stop:
+            kind, value = tokens[inner.index][:2]
+            inner.index += 1
+            if kind != COMMAND:
+                continue
+            if value in ("caption", "caption*"):
+                inner._read_optional()
+                caption = inner._text(inner._read_group())
+            elif value == "label":
+                label = (inner._raw(inner._read_group()) or "").strip()
+            elif value == "includegraphics":
+                inner._read_optional()
+                path = inner._raw(inner._read_group())
+                if path:
+                    images.append(path.strip())
+        kind = "table" if env.startswith(("table", "wraptable")) else "figure"
+        self._event(kind, environment=env, caption=caption, label=label, images=images)
+        if caption:
+            self._event("caption", text=caption, label=label, figure_type=kind)
+
+    def _split_sections(self, chunks: List[str]) -> Dict[str, str]:
+        sections: Dict[str, str] = {}
+        for (title, _), text in zip(self.section_starts, chunks):
+            # Drop the heading line itself
+            text = text[len(title):].strip() if text.startswith(title) else text
+            key = title
+            suffix = 2
+            while key in sections:
+                key = f"{title} ({suffix})"
+                suffix += 1
+            sections[key] = text
+        return sections
+
+
+def _normalize(text: str) -> str:
+    """Collapse runs of spaces and keep at most one blank line between paragraphs."""
+    paragraphs = []
+    for block in text.split('\n\n'):
+        lines = [' '.join(line.split()) for line in block.split('\n')]
+        block = '\n'.join(line for line in lines if line)
+        if block:
+            paragraphs.append(block)
+    return '\n\n'.join(paragraphs)
+
+
+def parse_latex(source: str) -> LatexDocument:
+    """Walk a LaTeX document once, returning prose, events and per-section text."""
+    begin = source.find('\\begin{document}')
+    if begin >= 0:
+        # The preamble is configuration, not content
+        source = source[begin + len('\\begin{document}'):]
+    return _Walker(source).walk()
+
+
+def latex_to_text(source: str) -> str:
+    """Plain prose of a LaTeX document."""
+    return parse_latex(source).prose
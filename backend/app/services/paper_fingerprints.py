@@ -0,0 +1,187 @@
+"""
+Paper Fingerprints
+
+Maps the identity of an ingested source to the paper that was made from it.
+Uploading the same PDF again, or scraping the same arXiv paper, then forks
+the existing paper instead of ingesting the source again. The fork is a new
+paper_id whose extracted text, figures and figure variants are hard links to
+the original's files, and which starts with copies of its metadata and
+scripts. Each uploader edits their own copy. Audio, slides and videos made
+from unchanged scripts come out of the artifact store, so no extraction,
+Gemini, Sarvam or render work is repeated.
+
+Fingerprints:
+- arXiv: ``arxiv:<id><version>``, e.g. ``arxiv:2301.00001v2``. An
+  unversioned reference uses the latest version reported by the metadata
+  API. If that is unknown, no fingerprint is taken, since a new version must
+  never be answered with an older one.
+- Uploads: ``sha256:<hex digest>`` of the uploaded ZIP or PDF bytes.
+
+Entries live in the ``paper_fingerprints`` table. A fingerprint whose paper
+was evicted, failed to ingest or lost its ingest job is dropped when it is
+next looked up (and by the temp collector).
+"""
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.arxiv_cache import parse_arxiv_id
+from app.services.job_manager import ACTIVE_STATUSES, job_manager
+from app.services.repository import Repository
+from app.services.storage_manager import storage_manager
+
+logger = logging.getLogger(__name__)
+
+# Per-paper trees under temp/ holding a paper's ingest output
+PAPER_TREES = ("papers", "figures", "arxiv_sources")
+
+
+def arxiv_fingerprint(arxiv_ref: str, meta: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Fingerprint of an arXiv reference.
+
+    Args:
+        arxiv_ref: arXiv URL or ID, with or without version
+        meta: Raw arxiv_metadata entry, whose "version" pins unversioned references
+
+    Returns:
+        "arxiv:<id><version>", or None when the version cannot be determined
+    """
+    arxiv_id, version = parse_arxiv_id(arxiv_ref)
+    if not arxiv_id:
+        return None
+    if not version and meta and meta.get("arxiv_id") == arxiv_id:
+        version = meta.get("version")
+    return f"arxiv:{arxiv_id}{version}" if version else None
+
+
+def file_fingerprint(digest: str) -> str:
+    """Fingerprint of an uploaded file from its SHA-256 hex digest."""
+    return f"sha256:{digest}"
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _rebase(value: Any, moves: Dict[str, str]) -> Any:
+    """Point the paths in a paper record at the fork's copies of its trees."""
+    if isinstance(value, str):
+        for old, new in moves.items():
+            if value == old or value.startswith(old + "/"):
+                return new + value[len(old):]
+        return value
+    if isinstance(value, dict):
+        return {key: _rebase(item, moves) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_rebase(item, moves) for item in value]
+    return value
+
+
+class PaperFingerprints:
+    """Fingerprint -> canonical paper_id index."""
+
+    def __init__(self):
+        self.table = Repository("paper_fingerprints")
+
+    def _usable(self, paper_id: str) -> bool:
+        paper_info = storage_manager.get_paper(paper_id)
+        if not paper_info or paper_info.get("status") == "failed":
+            return False
+        if paper_info.get("status") == "processing":
+            # A background ingest whose job died (e.g. server restart) never finishes
+            job_id = paper_info.get("ingest_job_id")
+            job = job_manager.get_job(job_id) if job_id else None
+            return job is not None and job["status"] in ACTIVE_STATUSES
+        return True
+
+    def find(self, fingerprint: Optional[str]) -> Optional[str]:
+        """The paper already ingested from this source, if it is still around."""
+        if not fingerprint:
+            return None
+        entry = self.table.get(fingerprint)
+        if entry is None:
+            return None
+        if not self._usable(entry["paper_id"]):
+            self.table.pop(fingerprint, None)
+            return None
+        logger.info(f"{fingerprint} was already ingested as paper {entry['paper_id']}")
+        return entry["paper_id"]
+
+    def remember(self, fingerprint: Optional[str], paper_id: str):
+        """Record the paper made from a source (also stored on the paper as "fingerprint")."""
+        if not fingerprint:
+            return
+        self.table[fingerprint] = {"paper_id": paper_id, "created_at": time.time()}
+        storage_manager.get_all_papers().merge(paper_id, fingerprint=fingerprint)
+
+    def fork(self, paper_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Copy a processed paper into a new paper_id for another request for the same source.
+
+        Args:
+            paper_id: The canonical paper (from ``find``)
+
+        Returns:
+            (new paper_id, its paper_info), or None if the original is not
+            processed or disappeared while being copied
+        """
+        paper_info = storage_manager.get_paper(paper_id)
+        if not paper_info or paper_info.get("status") != "processed":
+            return None
+        new_id = str(uuid.uuid4())
+        moves = {}
+        try:
+            for tree in PAPER_TREES:
+                source = f"temp/{tree}/{paper_id}"
+                if os.path.isdir(source):
+                    shutil.copytree(source, f"temp/{tree}/{new_id}", copy_function=_link_or_copy)
+                    moves[source] = f"temp/{tree}/{new_id}"
+            self._copy_scripts(paper_id, new_id)
+        except OSError as e:
+            # Evicted by the temp collector mid-copy
+            logger.warning(f"Could not fork paper {paper_id}: {str(e)}")
+            for tree in PAPER_TREES:
+                shutil.rmtree(f"temp/{tree}/{new_id}", ignore_errors=True)
+            Repository("scripts").pop(new_id, None)
+            return None
+
+        forked = _rebase(paper_info, moves)
+        forked.pop("ingest_job_id", None)
+        forked["forked_from"] = paper_id
+        storage_manager.save_paper(new_id, forked)
+        logger.info(f"Forked paper {paper_id} as {new_id}")
+        return new_id, forked
+
+    def _copy_scripts(self, paper_id: str, new_id: str):
+        scripts = Repository("scripts")
+        script_data = scripts.get(paper_id)
+        scripts_file = f"temp/scripts/{paper_id}_scripts.json"
+        if script_data is None and os.path.exists(scripts_file):
+            with open(scripts_file, "r", encoding="utf-8") as f:
+                script_data = json.load(f)
+        if script_data is None:
+            return
+        scripts[new_id] = script_data
+        os.makedirs("temp/scripts", exist_ok=True)
+        with open(f"temp/scripts/{new_id}_scripts.json", "w", encoding="utf-8") as f:
+            json.dump(script_data, f, ensure_ascii=False, indent=2)
+
+    def prune(self) -> int:
+        """Drop fingerprints of papers that no longer exist or failed; returns how many."""
+        stale = [key for key, entry in self.table.items() if not self._usable(entry["paper_id"])]
+        for key in stale:
+            self.table.pop(key, None)
+        return len(stale)
+
+
+# Global paper fingerprints instance
+paper_fingerprints = PaperFingerprints()
@@ -0,0 +1,140 @@
+"""
+Two-Phase Paper Ingestion
+
+With ``?background=true``, ``/api/papers/upload-zip`` and ``/upload-pdf``
+return a paper ID as soon as the upload is on disk. The analysis runs as an
+"ingest" job, and each of its stages is merged into the stored paper as soon
+as it finishes:
+
+- "metadata": title, authors and date
+- "text":     the file script generation reads (the main .tex file, or the
+              extracted PDF text and its sections)
+- "images":   figures, rasterized, with their thumb/preview/slide variants
+
+The names of finished stages are kept in ``paper_info["ingest"]["ready"]``.
+``GET /api/papers/{paper_id}/status`` reports them, so the UI can show the
+title and move on to script configuration while figures are still being
+extracted. Script generation only needs "text".
+
+The LaTeX pipeline here is shared with the synchronous uploads and arXiv
+ingestion, which call it without a ``publish`` callback.
+"""
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from app.services.executor import run_blocking, run_cpu_bound
+from app.services.figure_derivatives import figure_derivatives
+from app.services.figure_rasterizer import figure_rasterizer
+from app.services.job_manager import JobProgress, job_manager
+from app.services.latex_processor import process_latex_source
+from app.services.pdf_processor import Publish, ingest_pdf_file
+from app.services.storage_manager import storage_manager
+
+logger = logging.getLogger(__name__)
+
+INGEST_STAGES = ["metadata", "text", "images"]
+
+
+def stage_ready(paper_info: Dict[str, Any], stage: str) -> bool:
+    """Whether a stage's fields are in the paper record (always true for papers ingested in one go)."""
+    ingest = paper_info.get("ingest")
+    return ingest is None or stage in ingest.get("ready", [])
+
+
+async def ingest_latex_source(paper_id: str, source_dir: str, publish: Optional[Publish] = None) -> Dict[str, Any]:
+    """
+    Analyze an extracted LaTeX source tree and prepare its figures.
+
+    Args:
+        paper_id: Paper the figure variants are stored under
+        source_dir: Extracted source directory
+        publish: Optional ``await publish(stage, fields)`` callback, called with
+            the "metadata" and "text" fields before figures are rendered
+
+    Returns:
+        {"metadata", "tex_file_path", "image_files", "image_variants"}
+    """
+    # Find main .tex file, metadata and images in a worker process
+    processed = await run_cpu_bound(process_latex_source, source_dir)
+    if publish is not None:
+        await publish("metadata", {"metadata": processed["metadata"]})
+        await publish("text", {"tex_file_path": processed["tex_file_path"]})
+    # Render referenced PDF figures in parallel (cached by content hash)
+    image_files = await figure_rasterizer.rasterize_all(processed["image_files"])
+    # Thumbnail / preview / slide-sized variants for the image APIs and Beamer
+    image_variants = await figure_derivatives.generate(paper_id, image_files)
+    return {
+        "metadata": processed["metadata"],
+        "tex_file_path": processed["tex_file_path"],
+        "image_files": image_files,
+        "image_variants": image_variants,
+    }
+
+
+def fail_interrupted_ingest(job: Dict[str, Any]):
+    """Mark the paper of an ingest job that died with its server process as failed."""
+    papers = storage_manager.get_all_papers()
+    paper_info = papers.get(job["paper_id"])
+    if paper_info and paper_info.get("status") == "processing" and paper_info.get("ingest_job_id") == job["job_id"]:
+        ingest = {**(paper_info.get("ingest") or {"ready": []}), "error": job.get("error")}
+        papers.merge(job["paper_id"], status="failed", ingest=ingest)
+        logger.info(f"Paper {job['paper_id']}: ingest interrupted, marked failed")
+
+
+job_manager.on_interrupted("ingest", fail_interrupted_ingest)
+
+
+class IngestRecorder:
+    """Merges finished stages into the stored paper and advances the job's stages."""
+
+    def __init__(self, paper_id: str, progress: Optional[JobProgress] = None):
+        self.paper_id = paper_id
+        self.progress = progress or JobProgress()
+        self.ready: List[str] = []
+
+    def _merge(self, **fields):
+        storage_manager.get_all_papers().merge(self.paper_id, **fields)
+
+    async def publish(self, stage: str, fields: Dict[str, Any]):
+        self.ready.append(stage)
+        await run_blocking(self._merge, **fields, ingest={"ready": list(self.ready), "error": None})
+        remaining = [name for name in INGEST_STAGES if name not in self.ready]
+        if remaining:
+            await run_blocking(self.progress.start_stage, remaining[0])
+        logger.info(f"Paper {self.paper_id}: {stage} ready")
+
+    async def fail(self, error: str):
+        await run_blocking(self._merge, status="failed", ingest={"ready": list(self.ready), "error": error})
+
+
+async def run_paper_ingest(paper_id: str, source_type: str, path: str,
+                           progress: Optional[JobProgress] = None) -> Dict[str, Any]:
+    """
+    Background "ingest" job for an uploaded paper.
+
+    Args:
+        paper_id: Paper whose record (saved by the upload) is filled in
+        source_type: "pdf" or "latex"
+        path: The uploaded PDF, or the extracted LaTeX source directory
+        progress: Job progress reporter
+
+    Returns:
+        {"paper_id", "image_files": [file names]}
+    """
+    recorder = IngestRecorder(paper_id, progress)
+    await run_blocking(recorder.progress.start_stage, INGEST_STAGES[0])
+    try:
+        if source_type == "pdf":
+            result = await ingest_pdf_file(path, paper_id, publish=recorder.publish)
+            result["image_variants"] = await figure_derivatives.generate(paper_id, result["image_files"])
+        else:
+            result = await ingest_latex_source(paper_id, path, publish=recorder.publish)
+        # Metadata was published first and may have been edited since
+        result.pop("metadata", None)
+        await recorder.publish("images", {**result, "status": "processed"})
+    except Exception as e:
+        logger.error(f"Error ingesting paper {paper_id}: {str(e)}")
+        await recorder.fail(str(e))
+        raise
+    return {"paper_id": paper_id, "image_files": [os.path.basename(f) for f in result["image_files"]]}
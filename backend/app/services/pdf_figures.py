@@ -0,0 +1,186 @@
+"""
+Vector Figure Detection
+
+Papers typeset from LaTeX often draw their plots as vector paths and embed no
+raster images at all. This module finds those figures from the page's
+drawing commands:
+
+1. ``page.get_drawings()`` bounding boxes are clustered: boxes closer than
+   CLUSTER_GAP points join the same cluster.
+2. Clusters that are too small, or made only of horizontal/vertical rules
+   and empty boxes (table lines, underlines, frames), are dropped.
+3. Each caption ("Figure 3:", "Fig. 3."), i.e. a text block that *starts*
+   with the label rather than an in-text mention, claims the nearest cluster
+   just above (or, failing that, just below) it. Large, dense clusters
+   without a caption are kept as well.
+
+Each region is grown a little to take in axis labels and is rendered once,
+scaled to FIGURE_RENDER_WIDTH pixels wide.
+"""
+import os
+import re
+from typing import List, Optional
+
+import fitz  # PyMuPDF
+
+from app.services.figure_rasterizer import FIGURE_RENDER_WIDTH
+
+CLUSTER_GAP = 12.0            # points between drawings of the same figure
+LABEL_MARGIN = 14.0           # room for tick labels around the drawn area
+CAPTION_DISTANCE = 60.0       # max points between a figure and its caption
+MIN_FIGURE_SIDE = 50.0        # points
+MIN_UNCAPTIONED_DRAWINGS = 30 # paths an uncaptioned cluster needs to count as a figure
+MAX_ZOOM = 6.0
+
+CAPTION_PATTERN = re.compile(r'^\s*(?:fig(?:ure)?\.?|FIGURE)\s*\d+[a-z]?\s*[:.|]', re.I)
+
+
+class _Cluster:
+    def __init__(self, rect: fitz.Rect, has_content: bool):
+        self.rect = fitz.Rect(rect)
+        self.count = 1
+        self.has_content = has_content
+
+    def absorb(self, other: "_Cluster"):
+        self.rect |= other.rect
+        self.count += other.count
+        self.has_content = self.has_content or other.has_content
+
+
+def _is_rule(drawing: dict) -> bool:
+    """
+    Straight horizontal/vertical lines, thin bars and unfilled boxes: table
+    rules, underlines and frames rather than figure content. Curves,
+    diagonal lines and filled shapes (bars, markers, patches) are content.
+    """
+    filled = drawing.get("fill") is not None
+    for item in drawing.get("items", []):
+        kind = item[0]
+        if kind == "l":
+            p1, p2 = item[1], item[2]
+            if abs(p1.x - p2.x) > 0.5 and abs(p1.y - p2.y) > 0.5:
+                return False
+        elif kind == "re":
+            rect = item[1]
+            if filled and min(rect.width, rect.height) >= 2:
+                return False
+        else:
+            return False
+    return True
+
+
+def _near(a: fitz.Rect, b: fitz.Rect, gap: float = CLUSTER_GAP) -> bool:
+    # Rect.intersects() treats zero-width lines (axes, ticks) as empty, so compare coordinates
+    return a.x0 - gap <= b.x1 and b.x0 <= a.x1 + gap and a.y0 - gap <= b.y1 and b.y0 <= a.y1 + gap
+
+
+def _cluster_drawings(page: fitz.Page) -> List[_Cluster]:
+    clusters: List[_Cluster] = []
+    page_rect = page.rect
+    for drawing in page.get_drawings():
+        rect = fitz.Rect(drawing["rect"])
+        if not _near(rect, page_rect, 0) or (rect.width == 0 and rect.height == 0):
+            continue
+        # Page-sized backgrounds would swallow every other drawing
+        if rect.width > page_rect.width * 0.95 and rect.height > page_rect.height * 0.95:
+            continue
+        new = _Cluster(rect, not _is_rule(drawing))
+        touching = [c for c in clusters if _near(rect, c.rect)]
+        for cluster in touching:
+            new.absorb(cluster)
+            clusters.remove(cluster)
+        clusters.append(new)
+
+    # Merging can make earlier clusters overlap; settle until stable
+    merged = True
+    while merged:
+        merged = False
+        for i, cluster in enumerate(clusters):
+            for other in clusters[i + 1:]:
+                if _near(cluster.rect, other.rect):
+                    cluster.absorb(other)
+                    clusters.remove(other)
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return [
+        c for c in clusters
+        if c.has_content and c.rect.width >= MIN_FIGURE_SIDE and c.rect.height >= MIN_FIGURE_SIDE
+    ]
+
+
+def _captions(page: fitz.Page) -> List[fitz.Rect]:
+    captions = []
+    for x0, y0, x1, y1, text, _, block_type in page.get_text("blocks"):
+        if block_type == 0 and CAPTION_PATTERN.match(text):
+            captions.append(fitz.Rect(x0, y0, x1, y1))
+    return captions
+
+
+def _horizontal_overlap(a: fitz.Rect, b: fitz.Rect) -> float:
+    return max(0.0, min(a.x1, b.x1) - max(a.x0, b.x0))
+
+
+def _nearest_cluster(caption: fitz.Rect, clusters: List[_Cluster], taken: set) -> Optional[int]:
+    best, best_distance = None, CAPTION_DISTANCE
+    for index, cluster in enumerate(clusters):
+        if index in taken or _horizontal_overlap(caption, cluster.rect) <= 0:
+            continue
+        if cluster.rect.y1 <= caption.y0 + 2:
+            distance = caption.y0 - cluster.rect.y1            # figure above its caption
+        elif cluster.rect.y0 >= caption.y1 - 2:
+            distance = cluster.rect.y0 - caption.y1 + 10       # caption above the figure: allowed, less likely
+        else:
+            continue
+        if distance <= best_distance:
+            best, best_distance = index, distance
+    return best
+
+
+def find_figure_regions(page: fitz.Page) -> List[fitz.Rect]:
+    """Regions of a page that hold vector figures, top to bottom."""
+    clusters = _cluster_drawings(page)
+    if not clusters:
+        return []
+
+    taken = set()
+    regions = []
+    for caption in _captions(page):
+        index = _nearest_cluster(caption, clusters, taken)
+        if index is None:
+            continue
+        taken.add(index)
+        region = fitz.Rect(clusters[index].rect)
+        # Tick and axis labels sit just outside the drawn area, but never take in the caption
+        region = fitz.Rect(region.x0 - LABEL_MARGIN, region.y0 - LABEL_MARGIN,
+                           region.x1 + LABEL_MARGIN, region.y1 + LABEL_MARGIN)
+        if region.y1 > caption.y0 and clusters[index].rect.y1 <= caption.y0 + 2:
+            region.y1 = caption.y0
+        regions.append(region & page.rect)
+
+    for index, cluster in enumerate(clusters):
+        if index not in taken and cluster.count >= MIN_UNCAPTIONED_DRAWINGS:
+            region = fitz.Rect(cluster.rect.x0 - LABEL_MARGIN, cluster.rect.y0 - LABEL_MARGIN,
+                               cluster.rect.x1 + LABEL_MARGIN, cluster.rect.y1 + LABEL_MARGIN)
+            regions.append(region & page.rect)
+
+    return sorted(regions, key=lambda r: (r.y0, r.x0))
+
+
+def render_region(page: fitz.Page, region: fitz.Rect, path: str, width: int = FIGURE_RENDER_WIDTH) -> str:
+    """Rasterize one page region to a PNG ``width`` pixels wide (capped at MAX_ZOOM)."""
+    zoom = min(MAX_ZOOM, width / max(region.width, 1.0))
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=region)
+    pix.save(path)
+    return path
+
+
+def save_page_figures(page: fitz.Page, page_index: int, output_dir: str) -> List[str]:
+    """Detect and render the vector figures of one page; returns the PNG paths."""
+    image_files = []
+    for figure_index, region in enumerate(find_figure_regions(page)):
+        image_path = os.path.join(output_dir, f"figure_{page_index+1}_{figure_index+1}.png")
+        image_files.append(render_region(page, region, image_path))
+    return image_files
@@ -1,23 +1,33 @@
+import asyncio
+import hashlib
+import math
 import os
 import fitz  # PyMuPDF
-import re
 import tempfile
 import uuid
 import shutil
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
-def process_pdf_file(pdf_path: str, paper_id: str) -> Dict:
-    """
-    Process a PDF file to extract text, images, and metadata.
-    
-    Args:
-        pdf_path: Path to the PDF file
-        paper_id: Unique identifier for the paper
-        
-    Returns:
-        Dictionary with metadata, extracted images, and text
-    """
+from app.services.executor import CPU_WORKERS, run_blocking, run_cpu_bound
+from app.services.pdf_figures import save_page_figures
+from app.services.pdf_sections import read_page, segment_sections
+
+# Smallest page range worth sending to a worker process (each one reopens the PDF)
+PDF_MIN_SHARD_PAGES = int(os.getenv("PDF_MIN_SHARD_PAGES", "8"))
+
+# Text-only "dict" extraction: image blocks would copy every image's bytes into the result
+TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Embedded images below these sizes (in pixels) are icons, bullets or rules, not figures
+PDF_MIN_IMAGE_WIDTH = int(os.getenv("PDF_MIN_IMAGE_WIDTH", "80"))
+PDF_MIN_IMAGE_HEIGHT = int(os.getenv("PDF_MIN_IMAGE_HEIGHT", "80"))
+PDF_MIN_IMAGE_AREA = int(os.getenv("PDF_MIN_IMAGE_AREA", "20000"))
+
+# publish(stage, fields): receives each ingestion stage's results as soon as they exist
+Publish = Callable[[str, Dict], Awaitable[None]]
+
+def _prepare_dirs(paper_id: str) -> Tuple[str, str]:
     # Create directory for extracted content
     extract_dir = f"temp/papers/{paper_id}/source"
     os.makedirs(extract_dir, exist_ok=True)
@@ -25,26 +35,126 @@ def process_pdf_file(pdf_path: str, paper_id: str) -> Dict:
     # Create directory for images
     image_dir = os.path.join(extract_dir, "images")
     os.makedirs(image_dir, exist_ok=True)
-    
-    # Extract images and text from PDF
-    doc = fitz.open(pdf_path)
-    
-    # Extract metadata
-    metadata = extract_pdf_metadata(doc)
-    
-    # Extract text
-    full_text = ""
-    for page in doc:
-        full_text += page.get_text() + "\n\n"
-    
-    # Extract and save images
-    image_files = extract_pdf_images(doc, image_dir)
-    
-    # Create a text file with the extracted content
-    text_file_path = os.path.join(extract_dir, "extracted_text.txt")
-    with open(text_file_path, "w", encoding="utf-8") as f:
-        f.write(full_text)
-    
+    return extract_dir, image_dir
+
+def page_shards(page_count: int, workers: int = CPU_WORKERS) -> List[Tuple[int, int]]:
+    """Split pages into contiguous [start, stop) ranges, one or more per worker."""
+    size = max(PDF_MIN_SHARD_PAGES, math.ceil(page_count / max(1, workers)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def iter_pdf_pages(pdf_path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page index, page text) one page at a time.
+
+    Only the current page is held in memory, so callers that write or
+    consume text as they go stay bounded regardless of page count.
+    """
+    with fitz.open(pdf_path) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_index in range(start, stop):
+            yield page_index, doc[page_index].get_text()
+
+def read_pdf_text(pdf_path: str, max_chars: Optional[int] = None) -> str:
+    """
+    The text of a PDF, pages separated by blank lines.
+
+    With ``max_chars``, reading stops once that much text is collected, so a
+    500-page thesis costs no more than its first few pages.
+    """
+    parts = []
+    total = 0
+    for _, text in iter_pdf_pages(pdf_path):
+        parts.append(text + "\n\n")
+        total += len(text) + 2
+        if max_chars is not None and total >= max_chars:
+            break
+    text = "".join(parts)
+    return text[:max_chars] if max_chars is not None else text
+
+def extract_page_range(pdf_path: str, start: int, stop: int, image_dir: Optional[str], text_path: str) -> Dict:
+    """
+    Extract text, font layout and embedded images of pages [start, stop) in one pass.
+
+    Page text is appended to ``text_path`` as each page is read (each page
+    followed by a blank line) instead of being returned, so memory stays at
+    one page no matter how long the range is. With ``image_dir=None`` only
+    the text is extracted (see extract_image_range).
+
+    Top-level so it can run in a worker process; each call opens its own
+    PyMuPDF document.
+
+    Returns:
+        {"pages": [{"length", "sizes", "candidates"}, ...],
+        "images": [{"path", "xref", "digest"}, ...]}
+    """
+    pages = []
+    images = []
+    seen = set()
+    with fitz.open(pdf_path) as doc, open(text_path, "w", encoding="utf-8") as out:
+        for page_index in range(start, stop):
+            page = doc[page_index]
+            # One text extraction gives both the plain text and the font sizes for segmentation
+            layout = read_page(page.get_text("dict", flags=TEXT_FLAGS))
+            out.write(layout.pop("text") + "\n\n")
+            pages.append(layout)
+            if image_dir is not None:
+                images.extend(_save_page_images(doc, page, page_index, image_dir, seen))
+    return {"pages": pages, "images": images}
+
+def extract_image_range(pdf_path: str, start: int, stop: int, image_dir: str) -> List[Dict]:
+    """Save the embedded images of pages [start, stop); records as in extract_page_range."""
+    images = []
+    seen = set()
+    with fitz.open(pdf_path) as doc:
+        for page_index in range(start, stop):
+            images.extend(_save_page_images(doc, doc[page_index], page_index, image_dir, seen))
+    return images
+
+def _merge_images(records: List[Dict]) -> List[str]:
+    """Keep the first copy of each image across shards and delete the rest from disk."""
+    image_files = []
+    seen = set()
+    for record in records:
+        if record["xref"] in seen or record["digest"] in seen:
+            try:
+                os.remove(record["path"])
+            except OSError:
+                pass
+            continue
+        seen.update((record["xref"], record["digest"]))
+        image_files.append(record["path"])
+    return image_files
+
+def extract_figure_range(pdf_path: str, start: int, stop: int, output_dir: str) -> List[str]:
+    """Vector figures of pages [start, stop) (worker-process entry point)."""
+    image_files = []
+    with fitz.open(pdf_path) as doc:
+        for page_index in range(start, stop):
+            image_files.extend(_page_figures(doc[page_index], page_index, output_dir))
+    return image_files
+
+def _text_path(extract_dir: str) -> str:
+    return os.path.join(extract_dir, "extracted_text.txt")
+
+def _join_text_parts(text_file_path: str, part_paths: List[str]):
+    """Concatenate per-shard text files in page order, streaming, then drop them."""
+    with open(text_file_path, "wb") as out:
+        for part_path in part_paths:
+            with open(part_path, "rb") as part:
+                shutil.copyfileobj(part, out, 1024 * 1024)
+            os.remove(part_path)
+
+def _text_fields(extract_dir: str, pages: List[Dict]) -> Dict:
+    # The text itself was already streamed to this file page by page
+    text_file_path = _text_path(extract_dir)
+    return {
+        "text_file_path": text_file_path,
+        "tex_file_path": text_file_path,  # Add this for compatibility with script generator
+        "source_dir": extract_dir,
+        "sections": segment_sections(pages),
+    }
+
+def _finish(pdf_path: str, extract_dir: str, metadata: Dict, text_fields: Dict, image_files: List[str]) -> Dict:
     # Save a copy of the PDF
     pdf_copy_path = os.path.join(extract_dir, f"paper.pdf")
     shutil.copy(pdf_path, pdf_copy_path)
@@ -52,16 +162,116 @@ def process_pdf_file(pdf_path: str, paper_id: str) -> Dict:
     # Create a structure compatible with the script generator
     return {
         "metadata": metadata,
-        "text_file_path": text_file_path,
-        "tex_file_path": text_file_path,  # Add this for compatibility with script generator
-        "source_dir": extract_dir,
+        **text_fields,
         "image_files": image_files,
         "pdf_path": pdf_copy_path,
         "status": "processed"
     }
 
-def extract_pdf_metadata(doc: fitz.Document) -> Dict:
-    """Extract metadata from the PDF document."""
+def _read_document_info(pdf_path: str) -> Tuple[int, Dict, str]:
+    """Page count, info dictionary and first page text (all that metadata extraction needs)."""
+    with fitz.open(pdf_path) as doc:
+        first_text = read_page(doc[0].get_text("dict", flags=TEXT_FLAGS))["text"] if doc.page_count else ""
+        return doc.page_count, dict(doc.metadata or {}), first_text
+
+def process_pdf_file(pdf_path: str, paper_id: str) -> Dict:
+    """
+    Process a PDF file to extract text, images, and metadata.
+    
+    Sequential version of ingest_pdf_file, for callers that are already
+    running in a worker process.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        paper_id: Unique identifier for the paper
+        
+    Returns:
+        Dictionary with metadata, extracted images, and text
+    """
+    extract_dir, image_dir = _prepare_dirs(paper_id)
+    page_count, pdf_metadata, first_text = _read_document_info(pdf_path)
+    
+    # Extract text and images in one pass over the pages
+    extracted = extract_page_range(pdf_path, 0, page_count, image_dir, _text_path(extract_dir))
+    image_files = _merge_images(extracted["images"])
+    
+    # If no images found, try alternative extraction method for figures
+    if not image_files:
+        image_files = extract_figure_range(pdf_path, 0, page_count, image_dir)
+    
+    metadata = extract_pdf_metadata(pdf_metadata, first_text)
+    return _finish(pdf_path, extract_dir, metadata, _text_fields(extract_dir, extracted["pages"]), image_files)
+
+async def _publish(publish: Optional[Publish], stage: str, fields: Dict):
+    if publish is not None:
+        await publish(stage, fields)
+
+async def ingest_pdf_file(pdf_path: str, paper_id: str, publish: Optional[Publish] = None) -> Dict:
+    """
+    Parallel version of process_pdf_file.
+
+    Pages are split into contiguous ranges (see page_shards), and each range
+    is extracted by its own process-pool task with its own PyMuPDF document.
+    Each range streams its text to a part file, and the parts are
+    concatenated in page order. Without ``publish`` each range also saves its
+    embedded images in the same pass. With it, images are saved by a second
+    set of range tasks that run alongside the text ones, so the "text" stage
+    is published without waiting for the figures. The text file and image
+    list match the sequential version exactly, and the parent never holds
+    the document text.
+    
+    Args:
+        pdf_path: Path to the PDF file
+        paper_id: Unique identifier for the paper
+        publish: Optional ``await publish(stage, fields)`` callback, called with
+            the "metadata" and then the "text" fields as soon as each is known
+        
+    Returns:
+        Dictionary with metadata, extracted images, and text
+    """
+    extract_dir, image_dir = await run_blocking(_prepare_dirs, paper_id)
+    page_count, pdf_metadata, first_text = await run_blocking(_read_document_info, pdf_path)
+    metadata = extract_pdf_metadata(pdf_metadata, first_text)
+    await _publish(publish, "metadata", {"metadata": metadata})
+    shards = page_shards(page_count)
+    
+    text_file_path = _text_path(extract_dir)
+    part_paths = [f"{text_file_path}.part{index}" for index in range(len(shards))]
+    # Only split the image work off when someone is waiting for the text
+    images_separately = publish is not None
+    image_tasks = None
+    if images_separately:
+        image_tasks = asyncio.gather(*(
+            run_cpu_bound(extract_image_range, pdf_path, start, stop, image_dir) for start, stop in shards
+        ))
+    try:
+        results = await asyncio.gather(*(
+            run_cpu_bound(extract_page_range, pdf_path, start, stop,
+                          None if images_separately else image_dir, part_path)
+            for (start, stop), part_path in zip(shards, part_paths)
+        ))
+        await run_blocking(_join_text_parts, text_file_path, part_paths)
+        text_fields = _text_fields(extract_dir, [page for result in results for page in result["pages"]])
+        await _publish(publish, "text", text_fields)
+        images = await image_tasks if images_separately else [result["images"] for result in results]
+    except BaseException:
+        if image_tasks is not None:
+            image_tasks.cancel()
+        raise
+    # Shards dedupe on their own; the same logo can still appear in several of them
+    image_files = _merge_images([record for shard in images for record in shard])
+    
+    # If no images found, try alternative extraction method for figures
+    if not image_files:
+        figures = await asyncio.gather(*(
+            run_cpu_bound(extract_figure_range, pdf_path, start, stop, image_dir) for start, stop in shards
+        ))
+        image_files = [path for shard in figures for path in shard]
+    
+    return await run_blocking(_finish, pdf_path, extract_dir, metadata, text_fields, image_files)
+
+def extract_pdf_metadata(pdf_metadata: Dict, first_page_text: str = "") -> Dict:
+    """Extract metadata from the PDF's info dictionary (``doc.metadata``) and first page text."""
     metadata = {
         "title": "Research Paper",
         "authors": "Author",
@@ -69,20 +279,20 @@ def extract_pdf_metadata(doc: fitz.Document) -> Dict:
     }
     
     # Try to get metadata from PDF
-    if doc.metadata:
+    if pdf_metadata:
         # Title
-        if doc.metadata.get("title"):
-            metadata["title"] = doc.metadata.get("title")
+        if pdf_metadata.get("title"):
+            metadata["title"] = pdf_metadata.get("title")
         
         # Authors
-        if doc.metadata.get("author"):
-            metadata["authors"] = doc.metadata.get("author")
+        if pdf_metadata.get("author"):
+            metadata["authors"] = pdf_metadata.get("author")
         
         # Date - try to extract from different fields
         date_fields = ["creationDate", "modDate"]
         for field in date_fields:
-            if doc.metadata.get(field):
-                date_str = doc.metadata.get(field)
+            if pdf_metadata.get(field):
+                date_str = pdf_metadata.get(field)
                 # Convert from PDF date format if needed (D:YYYYMMDD...)
                 if date_str.startswith("D:"):
                     date_str = date_str[2:6]  # Extract just year
@@ -91,8 +301,7 @@ def extract_pdf_metadata(doc: fitz.Document) -> Dict:
     
     # Fallback: Try to extract title from first page if metadata doesn't have it
     if metadata["title"] == "Research Paper":
-        first_page = doc[0].get_text()
-        lines = first_page.split('\n')
+        lines = first_page_text.split('\n')
         if lines and len(lines) > 0:
             # First non-empty line might be the title
             for line in lines:
@@ -113,45 +322,69 @@ def extract_pdf_images(doc: fitz.Document, output_dir: str) -> List[str]:
     Returns:
         List of paths to saved image files
     """
+    seen = set()
     image_files = []
-    image_count = 0
-    
     for page_index, page in enumerate(doc):
-        # Get images
-        image_list = page.get_images(full=True)
-        
-        for img_index, img in enumerate(image_list):
-            xref = img[0]
-            
-            # Extract image
-            base_image = doc.extract_image(xref)
-            image_bytes = base_image["image"]
-            
-            # Get extension
-            ext = base_image["ext"]
-            if ext.lower() == "jpeg":
-                ext = "jpg"
-            
-            # Save image
-            image_filename = f"image_{page_index+1}_{img_index+1}.{ext}"
-            image_path = os.path.join(output_dir, image_filename)
-            
-            with open(image_path, "wb") as f:
-                f.write(image_bytes)
-            
-            image_files.append(image_path)
-            image_count += 1
+        image_files.extend(record["path"] for record in _save_page_images(doc, page, page_index, output_dir, seen))
     
     # If no images found, try alternative extraction method for figures
-    if image_count == 0:
+    if not image_files:
         image_files = extract_figures_from_pdf(doc, output_dir)
     
     return image_files
 
+def _is_figure_sized(width: int, height: int) -> bool:
+    return (width >= PDF_MIN_IMAGE_WIDTH and height >= PDF_MIN_IMAGE_HEIGHT
+            and width * height >= PDF_MIN_IMAGE_AREA)
+
+def _save_page_images(doc: fitz.Document, page: fitz.Page, page_index: int, output_dir: str,
+                      seen: set) -> List[Dict]:
+    """
+    Save the images embedded in one page, skipping tiny ones and repeats.
+
+    ``seen`` holds the xrefs and content hashes already saved (shared across
+    pages), so a logo repeated on every page is written once.
+    """
+    image_files = []
+    
+    # Get images
+    image_list = page.get_images(full=True)
+    
+    for img_index, img in enumerate(image_list):
+        xref, width, height = img[0], img[2], img[3]
+        if xref in seen or not _is_figure_sized(width, height):
+            continue
+        seen.add(xref)
+        
+        # Extract image
+        base_image = doc.extract_image(xref)
+        image_bytes = base_image["image"]
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        
+        # Get extension
+        ext = base_image["ext"]
+        if ext.lower() == "jpeg":
+            ext = "jpg"
+        
+        # Save image
+        image_filename = f"image_{page_index+1}_{img_index+1}.{ext}"
+        image_path = os.path.join(output_dir, image_filename)
+        
+        with open(image_path, "wb") as f:
+            f.write(image_bytes)
+        
+        image_files.append({"path": image_path, "xref": xref, "digest": digest})
+    
+    return image_files
+
 def extract_figures_from_pdf(doc: fitz.Document, output_dir: str) -> List[str]:
     """
     Alternative method to extract figures as images from the PDF.
-    This tries to identify figure regions and extract them as images.
+    For documents without embedded rasters: finds vector figures from the
+    page drawings and their captions, and renders each region once.
     
     Args:
         doc: PyMuPDF document
@@ -161,101 +394,27 @@ def extract_figures_from_pdf(doc: fitz.Document, output_dir: str) -> List[str]:
         List of paths to saved figure files
     """
     image_files = []
-    
-    # Try to find figures based on text patterns
-    figure_patterns = [r"Figure \d+", r"Fig\. \d+", r"FIGURE \d+"]
-    
     for page_index, page in enumerate(doc):
-        text_blocks = page.get_text("dict")["blocks"]
-        
-        for block_index, block in enumerate(text_blocks):
-            if "lines" in block:
-                for line in block["lines"]:
-                    if "spans" in line:
-                        for span in line["spans"]:
-                            text = span.get("text", "")
-                            
-                            # Check if this might be a figure caption
-                            is_figure_caption = False
-                            for pattern in figure_patterns:
-                                if re.search(pattern, text):
-                                    is_figure_caption = True
-                                    break
-                            
-                            if is_figure_caption:
-                                # Try to capture the area above this caption as a figure
-                                # This is an approximation - figures are usually above captions
-                                caption_rect = fitz.Rect(span["bbox"])
-                                figure_rect = fitz.Rect(
-                                    caption_rect.x0 - 20,
-                                    caption_rect.y0 - 200,  # Look 200 points above
-                                    caption_rect.x1 + 20,
-                                    caption_rect.y0 - 10
-                                )
-                                
-                                # Make sure the rect is within page bounds
-                                figure_rect.intersect(page.rect)
-                                
-                                # Only proceed if the rect has sufficient area
-                                if figure_rect.width > 100 and figure_rect.height > 100:
-                                    # Render this region as an image
-                                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), clip=figure_rect)
-                                    image_filename = f"figure_{page_index+1}_{block_index+1}.png"
-                                    image_path = os.path.join(output_dir, image_filename)
-                                    pix.save(image_path)
-                                    image_files.append(image_path)
-    
+        image_files.extend(_page_figures(page, page_index, output_dir))
     return image_files
 
+def _page_figures(page: fitz.Page, page_index: int, output_dir: str) -> List[str]:
+    """Render the vector figures found on one page (see app.services.pdf_figures)."""
+    return save_page_figures(page, page_index, output_dir)
+
 def extract_text_sections_from_pdf(doc: fitz.Document) -> Dict[str, str]:
     """
-    Try to extract structured sections (intro, methods, results, etc.) from PDF.
+    Extract structured sections from PDF, using heading font metrics.
     
     Args:
         doc: PyMuPDF document
         
     Returns:
-        Dictionary mapping section names to their text content
+        Dictionary mapping section headings to their text content, in order
     """
-    sections = {
-        "Introduction": "",
-        "Methodology": "",
-        "Results": "",
-        "Discussion": "",
-        "Conclusion": ""
-    }
-    
-    # Common section heading patterns in academic papers
-    section_patterns = {
-        "Introduction": [r"introduction", r"1\.?\s+introduction"],
-        "Methodology": [r"methodology", r"methods", r"experimental setup", r"materials and methods"],
-        "Results": [r"results", r"findings", r"experimental results"],
-        "Discussion": [r"discussion"],
-        "Conclusion": [r"conclusion", r"conclusions", r"summary", r"final remarks"]
+    pages = [read_page(page.get_text("dict", flags=TEXT_FLAGS)) for page in doc]
+    full_text = "\n\n".join(page["text"] for page in pages)
+    return {
+        section["title"]: full_text[section["start"]:section["end"]].split("\n", 1)[-1].strip()
+        for section in segment_sections(pages)
     }
-    
-    full_text = ""
-    for page in doc:
-        full_text += page.get_text() + "\n\n"
-    
-    # Split text into lines
-    lines = full_text.split("\n")
-    
-    current_section = None
-    for i, line in enumerate(lines):
-        line_lower = line.strip().lower()
-        
-        # Check if this line is a section heading
-        for section, patterns in section_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, line_lower):
-                    current_section = section
-                    break
-            if current_section:
-                break
-        
-        # If we're in a section, add text to it
-        if current_section and i < len(lines) - 1:
-            sections[current_section] += lines[i+1] + "\n"
-    
-    return sections 
\ No newline at end of file
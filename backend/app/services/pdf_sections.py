@@ -0,0 +1,198 @@
+"""
+PDF Section Segmentation
+
+Finds section headings in a PDF from its layout rather than from keywords.
+While pages are read (one ``page.get_text("dict")`` per page, in the
+extraction workers), ``read_page`` rebuilds the page's plain text. It also
+records:
+- how many characters are set in each font size
+- the short lines that could be headings, each with its size, bold flag
+  and offset in the page text
+
+``segment_sections`` then takes the most common size as the body font. It
+keeps candidates that are clearly larger than the body, or bold at body
+size, and turns them into sections with levels, character ranges in the
+extracted text and page ranges.
+
+Script generation uses the sections to send Gemini the paper's body only,
+without references, acknowledgements or appendices.
+"""
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+BOLD_FLAG = 16
+MAX_HEADING_CHARS = 90
+MAX_HEADING_WORDS = 12
+HEADING_SIZE_RATIO = 1.12
+
+NUMBERING_PATTERN = re.compile(r'^(?:(?P<num>\d+(?:\.\d+)*)\.?|(?P<roman>[IVX]+)\.|(?P<letter>[A-Z])\.)\s+\S')
+NOT_HEADING_PATTERN = re.compile(r'^(?:fig(?:ure)?|table|algorithm|eq(?:uation)?|theorem|lemma|proof|definition)\b', re.I)
+# Sections that add length but not content to a video script
+BACK_MATTER_PATTERN = re.compile(
+    r'^(?:[\dIVXA-Z]+(?:\.\d+)*\.?\s+)?(?:references|bibliography|acknowledge?ments?|appendix|appendices|'
+    r'supplementary material)\b', re.I
+)
+
+
+def _size_key(size: float) -> float:
+    return round(size * 2) / 2
+
+
+def read_page(page_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Plain text and heading candidates of one page from ``page.get_text("dict")``.
+
+    Returns:
+        {"text": str, "length": len(text), "sizes": {size: chars},
+        "candidates": [{"offset", "text", "size", "bold"}]}; offsets are into "text"
+    """
+    parts = []
+    offset = 0
+    sizes: Counter = Counter()
+    candidates = []
+    for block in page_dict.get("blocks", []):
+        for line in block.get("lines", []):
+            spans = [span for span in line.get("spans", []) if span.get("text")]
+            line_text = "".join(span["text"] for span in spans)
+            stripped = line_text.strip()
+            if stripped:
+                for span in spans:
+                    sizes[_size_key(span["size"])] += len(span["text"].strip())
+                visible = [span for span in spans if span["text"].strip()]
+                if (len(stripped) <= MAX_HEADING_CHARS and len(stripped.split()) <= MAX_HEADING_WORDS
+                        and stripped[0].isalnum() and not NOT_HEADING_PATTERN.match(stripped)):
+                    candidates.append({
+                        "offset": offset,
+                        "text": stripped,
+                        "size": _size_key(max(span["size"] for span in visible)),
+                        "bold": all(span.get("flags", 0) & BOLD_FLAG for span in visible),
+                    })
+            parts.append(line_text + "\n")
+            offset += len(line_text) + 1
+    if sizes:
+        # Plain lines in the page's main font cannot be headings; dropping them
+        # keeps the per-page record small on long documents
+        page_size = sizes.most_common(1)[0][0]
+        candidates = [c for c in candidates if c["bold"] or c["size"] > page_size]
+    return {"text": "".join(parts), "length": offset, "sizes": dict(sizes), "candidates": candidates}
+
+
+def _is_heading(candidate: Dict[str, Any], body_size: float) -> bool:
+    text = candidate["text"]
+    if text.endswith((',', ';')) or (text.endswith('.') and not NUMBERING_PATTERN.match(text)):
+        return False
+    if text.replace('.', '').isdigit():
+        # Page numbers
+        return False
+    if candidate["size"] >= body_size * HEADING_SIZE_RATIO:
+        return True
+    return candidate["bold"] and candidate["size"] >= body_size - 0.5 and (
+        NUMBERING_PATTERN.match(text) is not None or text.isupper() or len(text.split()) <= 6
+    )
+
+
+def _numbered_level(text: str) -> Optional[int]:
+    numbering = NUMBERING_PATTERN.match(text)
+    if numbering and numbering.group("num"):
+        return numbering.group("num").count('.') + 1
+    return None
+
+
+def segment_sections(pages: List[Dict[str, Any]], separator: str = "\n\n") -> List[Dict[str, Any]]:
+    """
+    Turn per-page layout (from ``read_page``) into sections.
+
+    Args:
+        pages: read_page results in page order ("text" may be dropped; only "length" is used)
+        separator: What joins page texts in the extracted text file
+
+    Returns:
+        [{"title", "level", "start", "end", "page_start", "page_end"}];
+        start/end are character offsets into the joined text (the heading
+        line included), pages are 1-based
+    """
+    sizes: Counter = Counter()
+    for page in pages:
+        sizes.update({float(size): chars for size, chars in page["sizes"].items()})
+    if not sizes:
+        return []
+    body_size = sizes.most_common(1)[0][0]
+
+    headings = []
+    page_start = 0
+    page_offsets = []
+    for page_index, page in enumerate(pages):
+        page_offsets.append(page_start)
+        for candidate in page["candidates"]:
+            if _is_heading(candidate, body_size):
+                headings.append((page_start + candidate["offset"], page_index, candidate))
+        page_start += page["length"] + len(separator)
+    if not headings:
+        return []
+
+    # Numbered headings ("2.1 ...") give their depth as the level and tie a font size to it.
+    # Unnumbered ones take the level of the nearest numbered size at least as large.
+    numbered_levels: Dict[float, int] = {}
+    for _, _, candidate in headings:
+        level = _numbered_level(candidate["text"])
+        if level:
+            numbered_levels[candidate["size"]] = min(level, numbered_levels.get(candidate["size"], level))
+    heading_sizes = sorted({candidate["size"] for _, _, candidate in headings}, reverse=True)
+
+    def level_of(candidate: Dict[str, Any]) -> int:
+        level = _numbered_level(candidate["text"])
+        if level:
+            return level
+        larger = [size for size in numbered_levels if size >= candidate["size"]]
+        if larger:
+            return numbered_levels[min(larger)]
+        if numbered_levels and candidate["size"] > max(numbered_levels):
+            # Larger than every numbered heading (a title, an unnumbered part)
+            return 1
+        if numbered_levels:
+            # Smaller than every numbered heading: one level below the deepest
+            return max(numbered_levels.values()) + 1
+        return heading_sizes.index(candidate["size"]) + 1
+
+    total = page_start - len(separator)
+    sections = []
+    for i, (start, page_index, candidate) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else total
+        end_page = headings[i + 1][1] if i + 1 < len(headings) else len(pages) - 1
+        if i + 1 < len(headings) and headings[i + 1][0] == page_offsets[end_page]:
+            end_page = max(page_index, end_page - 1)
+        sections.append({
+            "title": candidate["text"],
+            "level": level_of(candidate),
+            "start": start,
+            "end": end,
+            "page_start": page_index + 1,
+            "page_end": end_page + 1,
+        })
+    return sections
+
+
+def is_back_matter(section: Dict[str, Any]) -> bool:
+    return BACK_MATTER_PATTERN.match(section["title"]) is not None
+
+
+def select_script_text(full_text: str, sections: Optional[List[Dict[str, Any]]]) -> str:
+    """
+    The part of a paper worth scripting: everything before the first
+    top-level back-matter section (references, acknowledgements, appendix).
+    Returns the full text when no sections are known.
+    """
+    if not sections:
+        return full_text
+    kept = []
+    for section in sections:
+        if is_back_matter(section):
+            # Everything after References/Appendix is back matter too
+            if section["level"] <= min(s["level"] for s in sections):
+                break
+            continue
+        kept.append(full_text[section["start"]:section["end"]].strip())
+    preamble = full_text[:sections[0]["start"]].strip()
+    body = "\n\n".join(part for part in kept if part)
+    return f"{preamble}\n\n{body}".strip() if body else full_text
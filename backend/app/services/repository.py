@@ -0,0 +1,319 @@
+"""
+Shared Repository Layer
+
+Dict-like repositories for papers, scripts, slides, media, podcasts and visual
+storytelling state. Records live in a store shared by every uvicorn worker:
+SQLite (WAL mode) on local disk by default, or Redis when REDIS_URL is set and
+the optional ``redis`` package is installed.
+
+Values are JSON documents. Reads always go to the store, so mutating a value
+returned by a repository does not persist it -- assign it back (or use
+``merge``) after changing it.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STORAGE_DB_PATH = os.getenv("STORAGE_DB_PATH", "temp/storage/storage.db")
+
+_NAMESPACE_PATTERN = re.compile(r"^[a-z][a-z0-9_]*$")
+
+
+class SQLiteBackend:
+    """One table per namespace in a single SQLite database."""
+
+    def __init__(self, db_path: str = STORAGE_DB_PATH):
+        self.db_path = db_path
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._tables = set()
+        self._tables_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _table(self, namespace: str) -> str:
+        if namespace not in self._tables:
+            with self._tables_lock:
+                self._connect().execute(
+                    f"CREATE TABLE IF NOT EXISTS {namespace} ("
+                    "key TEXT PRIMARY KEY, "
+                    "data TEXT NOT NULL, "
+                    "updated_at REAL NOT NULL)"
+                )
+                self._tables.add(namespace)
+        return namespace
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self._connect().execute(
+            f"SELECT data FROM {self._table(namespace)} WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, data: str):
+        self._connect().execute(
+            f"INSERT INTO {self._table(namespace)} (key, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (key, data, time.time())
+        )
+
+    def get_many(self, namespace: str, keys: List[str]) -> Dict[str, str]:
+        table = self._table(namespace)
+        found = {}
+        conn = self._connect()
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            found.update(conn.execute(
+                f"SELECT key, data FROM {table} WHERE key IN ({placeholders})", batch
+            ))
+        return found
+
+    def set_many(self, namespace: str, items: List[Tuple[str, str]]):
+        self._write_many(namespace, items, "INSERT OR IGNORE INTO {table} (key, data, updated_at) VALUES (?, ?, ?)")
+
+    def put_many(self, namespace: str, items: List[Tuple[str, str]]):
+        self._write_many(
+            namespace, items,
+            "INSERT INTO {table} (key, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at"
+        )
+
+    def _write_many(self, namespace: str, items: List[Tuple[str, str]], statement: str):
+        conn = self._connect()
+        table = self._table(namespace)
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(statement.format(table=table), [(key, data, now) for key, data in items])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, namespace: str, key: str) -> bool:
+        cursor = self._connect().execute(f"DELETE FROM {self._table(namespace)} WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def clear(self, namespace: str):
+        self._connect().execute(f"DELETE FROM {self._table(namespace)}")
+
+    def contains(self, namespace: str, key: str) -> bool:
+        row = self._connect().execute(
+            f"SELECT 1 FROM {self._table(namespace)} WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None
+
+    def keys(self, namespace: str) -> List[str]:
+        return [row[0] for row in self._connect().execute(f"SELECT key FROM {self._table(namespace)}")]
+
+    def items(self, namespace: str) -> List[Tuple[str, str]]:
+        return list(self._connect().execute(f"SELECT key, data FROM {self._table(namespace)}"))
+
+    def count(self, namespace: str) -> int:
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self._table(namespace)}").fetchone()[0]
+
+    def merge(self, namespace: str, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Atomically merge fields into the JSON document stored at key."""
+        conn = self._connect()
+        table = self._table(namespace)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT data FROM {table} WHERE key = ?", (key,)).fetchone()
+            value = json.loads(row[0]) if row else {}
+            value.update(fields)
+            conn.execute(
+                f"INSERT INTO {table} (key, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (key, json.dumps(value, default=str), time.time())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+
+class RedisBackend:
+    """One Redis hash per namespace (works with any Redis-compatible server)."""
+
+    def __init__(self, url: str, prefix: str = "saral"):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    def _hash(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}"
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        return self.client.hget(self._hash(namespace), key)
+
+    def set(self, namespace: str, key: str, data: str):
+        self.client.hset(self._hash(namespace), key, data)
+
+    def get_many(self, namespace: str, keys: List[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        values = self.client.hmget(self._hash(namespace), keys)
+        return {key: data for key, data in zip(keys, values) if data is not None}
+
+    def set_many(self, namespace: str, items: List[Tuple[str, str]]):
+        pipe = self.client.pipeline()
+        for key, data in items:
+            pipe.hsetnx(self._hash(namespace), key, data)
+        pipe.execute()
+
+    def put_many(self, namespace: str, items: List[Tuple[str, str]]):
+        if items:
+            self.client.hset(self._hash(namespace), mapping=dict(items))
+
+    def delete(self, namespace: str, key: str) -> bool:
+        return self.client.hdel(self._hash(namespace), key) > 0
+
+    def clear(self, namespace: str):
+        self.client.delete(self._hash(namespace))
+
+    def contains(self, namespace: str, key: str) -> bool:
+        return bool(self.client.hexists(self._hash(namespace), key))
+
+    def keys(self, namespace: str) -> List[str]:
+        return list(self.client.hkeys(self._hash(namespace)))
+
+    def items(self, namespace: str) -> List[Tuple[str, str]]:
+        return list(self.client.hgetall(self._hash(namespace)).items())
+
+    def count(self, namespace: str) -> int:
+        return self.client.hlen(self._hash(namespace))
+
+    def merge(self, namespace: str, key: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Atomically merge fields into the JSON document stored at key."""
+        import redis
+        name = self._hash(namespace)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    current = pipe.hget(name, key)
+                    value = json.loads(current) if current else {}
+                    value.update(fields)
+                    pipe.multi()
+                    pipe.hset(name, key, json.dumps(value, default=str))
+                    pipe.execute()
+                    return value
+                except redis.WatchError:
+                    continue
+
+
+def create_backend():
+    """Use Redis when REDIS_URL is configured and available, SQLite otherwise."""
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        try:
+            backend = RedisBackend(redis_url)
+            backend.client.ping()
+            logger.info("Repository backend: Redis")
+            return backend
+        except ImportError:
+            logger.warning("REDIS_URL is set but the redis package is not installed; falling back to SQLite")
+        except Exception as e:
+            logger.warning(f"Could not connect to Redis ({str(e)}); falling back to SQLite")
+    logger.info(f"Repository backend: SQLite ({STORAGE_DB_PATH})")
+    return SQLiteBackend()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Get the process-wide store backend."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+class Repository(MutableMapping):
+    """Dict-like view of one namespace in the shared store."""
+
+    def __init__(self, namespace: str):
+        if not _NAMESPACE_PATTERN.match(namespace):
+            raise ValueError(f"Invalid repository namespace: {namespace}")
+        self.namespace = namespace
+
+    @property
+    def backend(self):
+        return get_backend()
+
+    def __getitem__(self, key: str) -> Any:
+        data = self.backend.get(self.namespace, key)
+        if data is None:
+            raise KeyError(key)
+        return json.loads(data)
+
+    def __setitem__(self, key: str, value: Any):
+        self.backend.set(self.namespace, key, json.dumps(value, default=str))
+
+    def __delitem__(self, key: str):
+        if not self.backend.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.backend.contains(self.namespace, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.backend.keys(self.namespace))
+
+    def __len__(self) -> int:
+        return self.backend.count(self.namespace)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """All (key, value) pairs, fetched in one round trip."""
+        return [(key, json.loads(data)) for key, data in self.backend.items(self.namespace)]
+
+    def values(self) -> List[Any]:
+        return [value for _, value in self.items()]
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Values for the given keys that exist, fetched in one round trip."""
+        return {key: json.loads(data) for key, data in self.backend.get_many(self.namespace, list(keys)).items()}
+
+    def put_many(self, items: Dict[str, Any]):
+        """Bulk-write records in one transaction, overwriting existing keys."""
+        self.backend.put_many(
+            self.namespace,
+            [(key, json.dumps(value, default=str)) for key, value in items.items()]
+        )
+
+    def clear(self):
+        self.backend.clear(self.namespace)
+
+    def merge(self, key: str, **fields) -> Dict[str, Any]:
+        """Atomically update some fields of a stored dict (creating it if needed)."""
+        return self.backend.merge(self.namespace, key, fields)
+
+    def insert_missing(self, items: Dict[str, Any]):
+        """Bulk-insert records, leaving existing keys untouched."""
+        self.backend.set_many(
+            self.namespace,
+            [(key, json.dumps(value, default=str)) for key, value in items.items()]
+        )
@@ -7,6 +7,7 @@ import subprocess
 from pathlib import Path
 from typing import Dict, List, Optional
 import requests
+from .http_client import http_client
 import re
 import tempfile
 
@@ -31,6 +32,14 @@ class SarvamTTS:
         }
         self.supported_sample_rates = [8000, 16000, 22050, 24000]
         self.default_sample_rate = 22050
+        # Everything besides text, language, voice and rate that shapes the audio
+        self.voice_settings = {
+            "pitch": 0,
+            "pace": 1.0,
+            "loudness": 1.5,
+            "enable_preprocessing": True,
+            "model": "bulbul:v2"
+        }
     
     def test_connection(self) -> bool:
         """Test API connection with minimal complexity"""
@@ -44,15 +53,11 @@ class SarvamTTS:
                 "inputs": ["test"],
                 "target_language_code": "hi-IN",
                 "speaker": "vidya",
-                "pitch": 0,
-                "pace": 1.0,
-                "loudness": 1.5,
                 "speech_sample_rate": self.default_sample_rate,
-                "enable_preprocessing": True,
-                "model": "bulbul:v2"
+                **self.voice_settings
             }
             
-            response = requests.post(self.base_url, headers=headers, json=test_data, timeout=30)
+            response = http_client.post(self.base_url, headers=headers, json=test_data, timeout=30, retry=True)
             return response.status_code == 200
         except Exception as e:
             print(f"Connection test failed: {e}")
@@ -76,16 +81,12 @@ class SarvamTTS:
                 "inputs": [text],
                 "target_language_code": target_language,
                 "speaker": voice,
-                "pitch": 0,
-                "pace": 1.0,
-                "loudness": 1.5,
                 "speech_sample_rate": sample_rate,
-                "enable_preprocessing": True,
-                "model": "bulbul:v2"
+                **self.voice_settings
             }
             
             print(f"Making TTS request for {len(text)} characters...")
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=60)
+            response = http_client.post(self.base_url, headers=headers, json=data, timeout=60, retry=True)
             
             if response.status_code != 200:
                 raise SarvamTTSError(f"API request failed: {response.status_code} - {response.text}")
@@ -4,6 +4,9 @@ import unicodedata
 from typing import Dict, List
 import os
 
+from app.services.latex_project import latex_projects, read_latex_document
+from app.services.pdf_sections import select_script_text
+
 def extract_paper_metadata(file_path):
     """Extract paper metadata from LaTeX or PDF text file."""
     metadata = {
@@ -47,10 +50,9 @@ def extract_paper_metadata(file_path):
         
         return metadata
     
-    # Original TeX file processing
+    # Original TeX file processing (flattened, so \input files are included)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        content = read_latex_document(file_path)
         
         title_match = re.search(r'\\title\{([^}]+)\}', content)
         if title_match:
@@ -69,30 +71,26 @@ def extract_paper_metadata(file_path):
     
     return metadata
 
-def extract_text_from_file(file_path):
-    """Extract clean text from LaTeX or text file."""
+def extract_text_from_file(file_path, sections=None):
+    """Extract clean text from LaTeX or text file.
+
+    For text extracted from a PDF, ``sections`` (paper_info["sections"]) limits
+    the result to the paper body, leaving out references and appendices.
+    """
     # Check if it's a text file (likely from PDF) or a TeX file
     if file_path.endswith('.txt'):
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-            return content
+            return select_script_text(content, sections)
         except Exception as e:
             print(f"Error extracting text from text file: {e}")
             return ""
     
-    # Original TeX file processing
+    # Original TeX file processing (flattened, so \input files are included)
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Remove LaTeX commands and comments
-        content = re.sub(r'%.*?\n', '\n', content)
-        content = re.sub(r'\\[a-zA-Z]+\*?(\[[^\]]*\])?(\{[^}]*\})*', ' ', content)
-        content = re.sub(r'\{[^}]*\}', ' ', content)
-        content = re.sub(r'\s+', ' ', content)
-        
-        return content.strip()
+        # Single pass over the source: prose with section headings, no markup
+        return latex_projects.get(file_path).document.prose
     except Exception as e:
         print(f"Error extracting text from LaTeX file: {e}")
         return ""
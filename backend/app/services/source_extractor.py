@@ -0,0 +1,200 @@
+"""
+Streaming arXiv Source Extraction
+
+arXiv e-prints come back as a gzipped tarball, a single gzipped TeX file, a
+bare tarball or (for PDF-only submissions) an unwrapped file. The format is
+detected from the first bytes of the stream and the payload is unpacked while
+it is still downloading, so the archive itself is never written to disk.
+
+Extraction is hardened against hostile archives:
+- absolute paths, ``..`` components, links and device files are skipped
+- per-file size, total size and member count are capped (the caps count the
+  bytes actually written, so a gzip bomb is cut off too)
+
+Limits (environment): SOURCE_MAX_FILE_MB (100), SOURCE_MAX_TOTAL_MB (512),
+SOURCE_MAX_FILES (10000).
+"""
+import gzip
+import io
+import logging
+import os
+import tarfile
+from typing import BinaryIO, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+PDF_MAGIC = b"%PDF"
+TAR_BLOCK = 512
+COPY_CHUNK = 64 * 1024
+
+
+class SourceTooLargeError(ValueError):
+    """Raised when an archive exceeds the configured extraction limits."""
+
+
+class _PrefixedStream(io.RawIOBase):
+    """Replays already-consumed header bytes in front of the rest of a stream."""
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        return n
+
+
+def _read_head(stream: BinaryIO, size: int) -> bytes:
+    """Read up to ``size`` bytes, tolerating short reads from network streams."""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        data = stream.read(remaining)
+        if not data:
+            break
+        chunks.append(data)
+        remaining -= len(data)
+    return b"".join(chunks)
+
+
+def _is_tar_header(block: bytes) -> bool:
+    """Check a 512-byte block for a ustar magic or a valid header checksum."""
+    if len(block) < TAR_BLOCK:
+        return False
+    if block[257:262] == b"ustar":
+        return True
+    try:
+        recorded = int(block[148:156].strip(b"\0 ") or b"-1", 8)
+    except ValueError:
+        return False
+    computed = sum(block[:148]) + 8 * 0x20 + sum(block[156:TAR_BLOCK])
+    return recorded == computed
+
+
+def _looks_like_text(head: bytes) -> bool:
+    return b"\0" not in head[:TAR_BLOCK]
+
+
+class SourceExtractor:
+    """Detects and unpacks an arXiv e-print stream into a directory."""
+
+    def __init__(
+        self,
+        max_file_bytes: Optional[int] = None,
+        max_total_bytes: Optional[int] = None,
+        max_files: Optional[int] = None,
+    ):
+        self.max_file_bytes = max_file_bytes or int(os.getenv("SOURCE_MAX_FILE_MB", "100")) * 1024 * 1024
+        self.max_total_bytes = max_total_bytes or int(os.getenv("SOURCE_MAX_TOTAL_MB", "512")) * 1024 * 1024
+        self.max_files = max_files or int(os.getenv("SOURCE_MAX_FILES", "10000"))
+
+    def extract(self, stream: BinaryIO, dest_dir: str, file_stem: str) -> Dict[str, int]:
+        """
+        Unpack an e-print stream into ``dest_dir``.
+
+        Args:
+            stream: Readable binary stream (e.g. ``response.raw``), consumed once
+            dest_dir: Existing, empty directory to extract into
+            file_stem: Name for the output file when the payload is a single file
+
+        Returns:
+            Dictionary with the detected "format", extracted "files" and "bytes"
+
+        Raises:
+            SourceTooLargeError: If a size or member-count limit is exceeded
+        """
+        head = _read_head(stream, TAR_BLOCK)
+        stream = _PrefixedStream(head, stream)
+        fmt = "plain"
+
+        if head.startswith(GZIP_MAGIC):
+            stream = gzip.GzipFile(fileobj=io.BufferedReader(stream, COPY_CHUNK), mode="rb")
+            head = _read_head(stream, TAR_BLOCK)
+            stream = _PrefixedStream(head, stream)
+            fmt = "gzip"
+
+        if _is_tar_header(head):
+            fmt = "tar.gz" if fmt == "gzip" else "tar"
+            files, total = self._extract_tar(io.BufferedReader(stream, COPY_CHUNK), dest_dir)
+        else:
+            if head.startswith(PDF_MAGIC):
+                suffix = ".pdf"
+            elif _looks_like_text(head):
+                suffix = ".tex"
+            else:
+                suffix = ".raw"
+            target = os.path.join(dest_dir, f"{file_stem}{suffix}")
+            total = self._copy_limited(stream, target, 0)
+            files = 1
+
+        logger.info(f"Extracted {fmt} source: {files} files, {total} bytes")
+        return {"format": fmt, "files": files, "bytes": total}
+
+    def _safe_target(self, dest_dir: str, name: str) -> Optional[str]:
+        """Resolve a member name inside ``dest_dir``, or None if it would escape."""
+        normalized = os.path.normpath(name.replace("\\", "/"))
+        if os.path.isabs(normalized) or normalized == ".." or normalized.startswith(".." + os.sep):
+            return None
+        if normalized in ("", "."):
+            return None
+        root = os.path.realpath(dest_dir)
+        target = os.path.realpath(os.path.join(root, normalized))
+        if not target.startswith(root + os.sep):
+            return None
+        return target
+
+    def _extract_tar(self, stream: BinaryIO, dest_dir: str):
+        files = 0
+        total = 0
+        with tarfile.open(fileobj=stream, mode="r|") as tar:
+            for member in tar:
+                target = self._safe_target(dest_dir, member.name)
+                if target is None:
+                    logger.warning(f"Skipping unsafe archive member: {member.name}")
+                    continue
+                if member.isdir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                if not member.isfile():
+                    logger.warning(f"Skipping non-regular archive member: {member.name}")
+                    continue
+                if member.size > self.max_file_bytes:
+                    raise SourceTooLargeError(f"Archive member {member.name} exceeds the per-file limit")
+                files += 1
+                if files > self.max_files:
+                    raise SourceTooLargeError(f"Archive has more than {self.max_files} files")
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                fileobj = tar.extractfile(member)
+                total = self._copy_limited(fileobj, target, total)
+        return files, total
+
+    def _copy_limited(self, src: BinaryIO, target: str, total: int) -> int:
+        """Copy a stream to ``target`` enforcing the per-file and total limits."""
+        written = 0
+        with open(target, "wb") as out:
+            while True:
+                chunk = src.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > self.max_file_bytes:
+                    raise SourceTooLargeError(f"{os.path.basename(target)} exceeds the per-file limit")
+                if total + written > self.max_total_bytes:
+                    raise SourceTooLargeError("Source archive exceeds the total size limit")
+                out.write(chunk)
+        return total + written
+
+
+# Global extractor instance
+source_extractor = SourceExtractor()
@@ -3,71 +3,76 @@ import json
 import logging
 from pathlib import Path
 from typing import Dict, Any, Optional
+from app.services.repository import Repository
 from app.services.session_manager import session_manager
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 class StorageManager:
-    """Manages persistent storage of paper information."""
+    """Manages persistent storage of paper information.
+
+    Papers live in the shared "papers" repository, so every worker process sees
+    the same records. The legacy papers_storage.json file is imported on first
+    start.
+    """
     
     def __init__(self, storage_dir: str = "temp/storage"):
         self.storage_dir = storage_dir
         Path(storage_dir).mkdir(parents=True, exist_ok=True)
         self.papers_file = os.path.join(storage_dir, "papers_storage.json")
-        self.memory_cache = {}
-        self._load_papers()
-    
-    def _load_papers(self):
-        """Load papers from disk into memory."""
-        if os.path.exists(self.papers_file):
-            try:
-                with open(self.papers_file, 'r') as f:
-                    data = json.load(f)
-                    self.memory_cache = data
-                    logger.info(f"Loaded {len(data)} papers from storage")
-            except Exception as e:
-                logger.error(f"Error loading papers from storage: {str(e)}")
-                self.memory_cache = {}
-        else:
-            logger.info("No papers storage file found, starting with empty cache")
-            self.memory_cache = {}
+        self.papers = Repository("papers")
+        self._migrate_json_file()
     
-    def _save_papers(self):
-        """Save papers from memory to disk."""
+    def _migrate_json_file(self):
+        """Import papers_storage.json into the repository once, then set the file aside."""
+        if not os.path.exists(self.papers_file):
+            return
         try:
-            with open(self.papers_file, 'w') as f:
-                json.dump(self.memory_cache, f)
-            logger.info(f"Saved {len(self.memory_cache)} papers to storage")
-            return True
+            with open(self.papers_file, 'r') as f:
+                data = json.load(f)
+            self.papers.insert_missing(data)
+            os.replace(self.papers_file, self.papers_file + ".migrated")
+            logger.info(f"Migrated {len(data)} papers from {self.papers_file}")
         except Exception as e:
-            logger.error(f"Error saving papers to storage: {str(e)}")
-            return False
+            logger.error(f"Error migrating papers from JSON storage: {str(e)}")
     
     def get_paper(self, paper_id: str) -> Optional[Dict[str, Any]]:
         """Get paper info by ID."""
-        return self.memory_cache.get(paper_id)
+        return self.papers.get(paper_id)
     
     def save_paper(self, paper_id: str, paper_info: Dict[str, Any]) -> bool:
         """Save paper info."""
-        self.memory_cache[paper_id] = paper_info
-        return self._save_papers()
+        try:
+            self.papers[paper_id] = paper_info
+            return True
+        except Exception as e:
+            logger.error(f"Error saving paper {paper_id} to storage: {str(e)}")
+            return False
     
     def delete_paper(self, paper_id: str) -> bool:
         """Delete paper info."""
-        if paper_id in self.memory_cache:
-            del self.memory_cache[paper_id]
-            return self._save_papers()
-        return False
+        try:
+            del self.papers[paper_id]
+            return True
+        except KeyError:
+            return False
+        except Exception as e:
+            logger.error(f"Error deleting paper {paper_id} from storage: {str(e)}")
+            return False
     
-    def get_all_papers(self) -> Dict[str, Any]:
-        """Get all papers."""
-        return self.memory_cache
+    def get_all_papers(self) -> Repository:
+        """Get the papers repository (a live, dict-like view of all papers)."""
+        return self.papers
     
     def clear_all(self) -> bool:
         """Clear all papers."""
-        self.memory_cache = {}
-        return self._save_papers()
+        try:
+            self.papers.clear()
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing paper storage: {str(e)}")
+            return False
 
 # Create global instance
 storage_manager = StorageManager()
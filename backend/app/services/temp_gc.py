@@ -0,0 +1,450 @@
+"""
+Temp Directory Garbage Collector
+
+Keeps the temp/ tree within a disk budget. Each pass:
+1. removes intermediates (TTS chunk directories, served downloads, partial
+   artifact writes) older than the grace period, and resumable uploads idle
+   for UPLOAD_SESSION_TTL_HOURS
+2. drops cached artifact blobs that no paper links to any more, oldest first,
+   and cached arXiv downloads, when they exceed the maximum age or the tree is
+   over budget
+3. evicts whole paper artifact sets (sources, LaTeX, slides, audio, videos,
+   podcasts, storytelling output and their records), least recently used first,
+   when they exceed the maximum age or the tree is still over budget
+
+A paper's last use is the later of its newest file and its last API request.
+``PaperActivityMiddleware`` records requests to ``/api/<area>/<paper_id>/...``
+in the ``paper_access`` table (at most once a minute per paper and worker).
+While a request that can write (anything but GET/HEAD) is in flight, it
+holds a lease in ``paper_leases``. This covers synchronous renders and the
+background tasks that run after the response.
+
+Papers with a queued or running job, a lease held by a live worker, or use
+within the grace period are never evicted.
+
+Configuration (environment):
+- TEMP_DISK_BUDGET_MB: size limit for temp/ (0 disables budget eviction)
+- TEMP_MAX_AGE_HOURS: evict paper sets unused for this long (0 disables)
+- TEMP_GC_GRACE_MINUTES: minimum idle time before anything is collected (default 30)
+- TEMP_GC_INTERVAL_SECONDS: time between background passes (default 900)
+"""
+import asyncio
+import glob
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from app.services.arxiv_cache import arxiv_cache
+from app.services.artifact_store import artifact_store
+from app.services.executor import run_blocking
+from app.services.job_manager import job_manager
+from app.services.latex_project import latex_projects
+from app.services.paper_fingerprints import paper_fingerprints
+from app.services.repository import Repository
+from app.services.upload_sessions import upload_sessions
+
+logger = logging.getLogger(__name__)
+
+# Per-paper locations; every one of them belongs to exactly one paper
+PAPER_DIRS = [
+    "papers", "figures", "audio", "latex", "slides", "videos", "podcasts", "visual_storytelling",
+]
+PAPER_FILE_PATTERNS = [
+    "downloads/paper_{paper_id}*",
+    "scripts/{paper_id}_scripts.json",
+]
+PAPER_REPOSITORIES = [
+    "papers", "scripts", "slides", "media", "podcasts", "visual_storytelling", "paper_access",
+]
+# Requests under these API areas whose first path segment is a paper ID count as a use of that paper
+PAPER_REQUEST_PATTERN = re.compile(
+    r"^/api/(?:papers|scripts|slides|media|images|podcast|visual-storytelling)/([0-9a-fA-F-]{36})(?:/|$)"
+)
+# Granularity of recorded access times
+ACCESS_RESOLUTION_SECONDS = 60
+
+
+def _path_stats(path: str, seen: Optional[Set] = None) -> Dict[str, float]:
+    """Bytes (hard links counted once per ``seen`` set) and newest mtime under a path."""
+    seen = set() if seen is None else seen
+    total = 0
+    try:
+        newest = os.lstat(path).st_mtime
+    except OSError:
+        newest = 0.0
+    paths = [path] if os.path.isfile(path) else (
+        os.path.join(root, name) for root, _, files in os.walk(path) for name in files
+    )
+    for file_path in paths:
+        try:
+            st = os.lstat(file_path)
+        except OSError:
+            continue
+        newest = max(newest, st.st_mtime)
+        inode = (st.st_dev, st.st_ino)
+        if inode in seen:
+            continue
+        seen.add(inode)
+        total += st.st_size
+    return {"bytes": total, "mtime": newest}
+
+
+def _remove(path: str):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class TempGarbageCollector:
+    """Evicts temp/ content by age and LRU to stay within a disk budget."""
+
+    def __init__(
+        self,
+        root: str = "temp",
+        budget_mb: Optional[int] = None,
+        max_age_hours: Optional[float] = None,
+        grace_minutes: Optional[float] = None,
+        interval_seconds: Optional[int] = None
+    ):
+        self.root = root
+        budget_mb = budget_mb if budget_mb is not None else int(os.getenv("TEMP_DISK_BUDGET_MB", "0"))
+        max_age_hours = max_age_hours if max_age_hours is not None else float(os.getenv("TEMP_MAX_AGE_HOURS", "0"))
+        grace_minutes = grace_minutes if grace_minutes is not None else float(os.getenv("TEMP_GC_GRACE_MINUTES", "30"))
+        self.budget_bytes = budget_mb * 1024 * 1024
+        self.max_age = max_age_hours * 3600
+        self.grace = grace_minutes * 60
+        self.interval = interval_seconds or int(os.getenv("TEMP_GC_INTERVAL_SECONDS", "900"))
+        self.lock_file = os.path.join(root, ".gc.lock")
+        self._task: Optional[asyncio.Task] = None
+        self.access = Repository("paper_access")
+        self.leases = Repository("paper_leases")
+        self._activity_lock = threading.Lock()
+        self._in_flight: Dict[str, int] = {}
+        self._recorded_access: Dict[str, float] = {}
+
+    def record_access(self, paper_id: str):
+        """Note a use of a paper (written at most once per ACCESS_RESOLUTION_SECONDS per worker)."""
+        now = time.time()
+        with self._activity_lock:
+            if now - self._recorded_access.get(paper_id, 0) < ACCESS_RESOLUTION_SECONDS:
+                return
+            self._recorded_access[paper_id] = now
+        self.access[paper_id] = now
+
+    def _lease_key(self, paper_id: str) -> str:
+        return f"{job_manager.owner['id']}:{paper_id}"
+
+    def acquire(self, paper_id: str):
+        """Keep a paper from being evicted until the matching ``release``."""
+        with self._activity_lock:
+            count = self._in_flight.get(paper_id, 0)
+            self._in_flight[paper_id] = count + 1
+            if count == 0:
+                self.leases[self._lease_key(paper_id)] = {"paper_id": paper_id, "owner": job_manager.owner}
+        self.record_access(paper_id)
+
+    def release(self, paper_id: str):
+        with self._activity_lock:
+            count = self._in_flight.get(paper_id, 0) - 1
+            if count > 0:
+                self._in_flight[paper_id] = count
+            else:
+                self._in_flight.pop(paper_id, None)
+                self.leases.pop(self._lease_key(paper_id), None)
+        # A long render was a use until it ended, not just when it started
+        self.record_access(paper_id)
+
+    def disk_usage(self) -> Dict[str, Any]:
+        """Bytes used under temp/, in total and per top-level directory."""
+        seen = set()
+        by_dir = {}
+        if os.path.isdir(self.root):
+            for entry in sorted(os.listdir(self.root)):
+                by_dir[entry] = _path_stats(os.path.join(self.root, entry), seen)["bytes"]
+        return {
+            "total_bytes": sum(by_dir.values()),
+            "budget_bytes": self.budget_bytes,
+            "directories": by_dir
+        }
+
+    def protected_paper_ids(self) -> Set[str]:
+        """Papers that an in-flight job or request may still read or write."""
+        protected = {
+            job["paper_id"] for job in job_manager.active_jobs() if job.get("paper_id")
+        }
+        for key, lease in self.leases.items():
+            if job_manager.owner_alive(lease.get("owner")):
+                protected.add(lease["paper_id"])
+            else:
+                # The worker died mid-request
+                self.leases.pop(key, None)
+        return protected
+
+    def paper_paths(self, paper_id: str, paper_info: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Every on-disk location belonging to one paper."""
+        paths = [os.path.join(self.root, d, paper_id) for d in PAPER_DIRS]
+        for pattern in PAPER_FILE_PATTERNS:
+            paths.extend(glob.glob(os.path.join(self.root, pattern.format(paper_id=glob.escape(paper_id)))))
+        # arXiv sources live under temp/arxiv_sources/<paper_id>/source
+        # (temp/arxiv_sources/<arxiv id>/source, shared, for older papers)
+        source_dir = (paper_info or {}).get("source_dir")
+        arxiv_root = os.path.join(self.root, "arxiv_sources")
+        if source_dir and os.path.abspath(source_dir).startswith(os.path.abspath(arxiv_root) + os.sep):
+            paths.append(os.path.dirname(source_dir))
+        return [p for p in paths if os.path.exists(p)]
+
+    def paper_sets(self) -> List[Dict[str, Any]]:
+        """All paper artifact sets with their size and last use, oldest first."""
+        papers = dict(Repository("papers").items())
+        paper_ids = set(papers)
+        for d in PAPER_DIRS:
+            dir_path = os.path.join(self.root, d)
+            if os.path.isdir(dir_path):
+                paper_ids.update(name for name in os.listdir(dir_path) if os.path.isdir(os.path.join(dir_path, name)))
+
+        # arXiv source directories can be shared by several papers
+        source_owners: Dict[str, Set[str]] = {}
+        for paper_id in paper_ids:
+            for path in self.paper_paths(paper_id, papers.get(paper_id)):
+                source_owners.setdefault(path, set()).add(paper_id)
+
+        accessed = dict(self.access.items())
+        sets = []
+        for paper_id in paper_ids:
+            paths = self.paper_paths(paper_id, papers.get(paper_id))
+            stats = [_path_stats(p) for p in paths]
+            sets.append({
+                "paper_id": paper_id,
+                "paths": paths,
+                "shared_paths": [p for p in paths if len(source_owners.get(p, ())) > 1],
+                "bytes": sum(s["bytes"] for s in stats),
+                "last_used": max([s["mtime"] for s in stats] + [accessed.get(paper_id, 0.0)]),
+            })
+        return sorted(sets, key=lambda s: s["last_used"])
+
+    def evict_paper(self, paper_set: Dict[str, Any]):
+        """Delete a paper's files and every record that points at them."""
+        paper_id = paper_set["paper_id"]
+        for path in paper_set["paths"]:
+            if path not in paper_set["shared_paths"]:
+                _remove(path)
+        for namespace in PAPER_REPOSITORIES:
+            Repository(namespace).pop(paper_id, None)
+        for manifest in artifact_store.list_manifests(paper_id):
+            artifact_store.manifests.pop(f"{paper_id}:{manifest['stage']}", None)
+        logger.info(f"Evicted artifacts of paper {paper_id}")
+
+    def _sweep_intermediates(self, now: float, dry_run: bool = False) -> int:
+        removed = 0
+        patterns = [
+            "audio/*/temp_chunks",
+            "downloads/*",
+            "artifacts/tmp/*",
+            "mindmap/req_*",
+        ]
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(self.root, pattern)):
+                if now - _path_stats(path)["mtime"] > self.grace:
+                    if not dry_run:
+                        _remove(path)
+                    removed += 1
+        return removed
+
+    def _sweep_orphan_sources(self, now: float) -> int:
+        """Remove arXiv source directories no remaining paper points at."""
+        arxiv_root = os.path.join(self.root, "arxiv_sources")
+        if not os.path.isdir(arxiv_root):
+            return 0
+        referenced = {
+            os.path.abspath(os.path.dirname(info["source_dir"]))
+            for info in Repository("papers").values() if info.get("source_dir")
+        }
+        removed = 0
+        for name in os.listdir(arxiv_root):
+            path = os.path.join(arxiv_root, name)
+            if os.path.abspath(path) in referenced:
+                continue
+            if now - _path_stats(path)["mtime"] > self.grace:
+                _remove(path)
+                removed += 1
+        return removed
+
+    def _unreferenced_blobs(self) -> List[Dict[str, Any]]:
+        """Blobs no materialized path links to (only the derivation index uses them)."""
+        blobs = []
+        for path in artifact_store.blobs_dir.glob("*/*"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if st.st_nlink <= 1:
+                blobs.append({"path": str(path), "bytes": st.st_size, "last_used": max(st.st_atime, st.st_mtime)})
+        return sorted(blobs, key=lambda b: b["last_used"])
+
+    def _acquire_lock(self) -> bool:
+        """Only one worker process collects at a time."""
+        Path(self.root).mkdir(parents=True, exist_ok=True)
+        try:
+            if time.time() - os.path.getmtime(self.lock_file) > 3600:
+                os.unlink(self.lock_file)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def collect(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Run one collection pass and report what was (or would be) reclaimed."""
+        if not dry_run and not self._acquire_lock():
+            return {"skipped": True, "reason": "Another collection is in progress"}
+        try:
+            return self._collect(dry_run)
+        finally:
+            if not dry_run:
+                try:
+                    os.unlink(self.lock_file)
+                except OSError:
+                    pass
+
+    def _collect(self, dry_run: bool) -> Dict[str, Any]:
+        now = time.time()
+        bytes_before = self.disk_usage()["total_bytes"]
+        usage = bytes_before
+        report = {
+            "dry_run": dry_run,
+            "bytes_before": bytes_before,
+            "budget_bytes": self.budget_bytes,
+            "intermediates_removed": 0,
+            "blobs_removed": 0,
+            "evicted_papers": [],
+            "protected_papers": [],
+        }
+
+        def over_budget() -> bool:
+            return bool(self.budget_bytes) and usage > self.budget_bytes
+
+        def expired(last_used: float) -> bool:
+            return bool(self.max_age) and now - last_used > self.max_age
+
+        report["intermediates_removed"] = self._sweep_intermediates(now, dry_run)
+        if not dry_run:
+            usage = self.disk_usage()["total_bytes"]
+
+        # Cached blobs are cheaper to regenerate than papers, so they go first
+        for blob in self._unreferenced_blobs():
+            if now - blob["last_used"] <= self.grace:
+                continue
+            if not (expired(blob["last_used"]) or over_budget()):
+                continue
+            if not dry_run:
+                _remove(blob["path"])
+            usage -= blob["bytes"]
+            report["blobs_removed"] += 1
+
+        # Downloaded arXiv payloads can always be fetched again
+        if not dry_run and (over_budget() or self.max_age):
+            cutoff = now - self.grace if over_budget() else now - self.max_age
+            freed = arxiv_cache.prune(cutoff)
+            usage -= freed
+            report["arxiv_cache_bytes_freed"] = freed
+
+        protected = self.protected_paper_ids()
+        report["protected_papers"] = sorted(protected)
+        for paper_set in self.paper_sets():
+            if paper_set["paper_id"] in protected or now - paper_set["last_used"] <= self.grace:
+                continue
+            if not (expired(paper_set["last_used"]) or over_budget()):
+                continue
+            if not dry_run:
+                self.evict_paper(paper_set)
+            usage -= paper_set["bytes"]
+            report["evicted_papers"].append(paper_set["paper_id"])
+
+        if not dry_run:
+            report["intermediates_removed"] += self._sweep_orphan_sources(now)
+            # LaTeX indexes of source trees that are gone
+            report["latex_indexes_removed"] = latex_projects.prune()
+            # Resumable uploads nobody has written to for UPLOAD_SESSION_TTL_HOURS
+            report["upload_sessions_removed"] = upload_sessions.prune()
+            # Duplicate-upload fingerprints of evicted or failed papers
+            report["paper_fingerprints_removed"] = paper_fingerprints.prune()
+
+        if not dry_run and report["evicted_papers"]:
+            # Blobs the evicted papers were the last users of
+            for blob in self._unreferenced_blobs():
+                if over_budget() or expired(blob["last_used"]):
+                    _remove(blob["path"])
+                    usage -= blob["bytes"]
+                    report["blobs_removed"] += 1
+
+        bytes_after = usage if dry_run else self.disk_usage()["total_bytes"]
+        report["bytes_after"] = bytes_after
+        report["bytes_reclaimed"] = max(0, bytes_before - bytes_after)
+        logger.info(
+            f"Temp GC {'(dry run) ' if dry_run else ''}reclaimed {report['bytes_reclaimed']} bytes: "
+            f"{len(report['evicted_papers'])} papers, {report['blobs_removed']} blobs, "
+            f"{report['intermediates_removed']} intermediates"
+        )
+        return report
+
+    async def _run_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_blocking(self.collect)
+            except Exception as e:
+                logger.error(f"Temp GC pass failed: {str(e)}")
+
+    def start(self):
+        """Start the background collector on the running event loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run_periodically())
+            logger.info(f"Temp GC running every {self.interval}s (budget: {self.budget_bytes or 'unlimited'} bytes)")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class PaperActivityMiddleware:
+    """
+    ASGI middleware that records uses of papers and leases them while a writing request runs.
+
+    Pure ASGI rather than ``@app.middleware("http")`` so that the lease also
+    covers BackgroundTasks, which run after the response has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        match = PAPER_REQUEST_PATTERN.match(scope.get("path", "")) if scope["type"] == "http" else None
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+        paper_id = match.group(1)
+        if scope["method"] in ("GET", "HEAD"):
+            await run_blocking(temp_gc.record_access, paper_id)
+            await self.app(scope, receive, send)
+            return
+        await run_blocking(temp_gc.acquire, paper_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await run_blocking(temp_gc.release, paper_id)
+
+
+# Global collector instance
+temp_gc = TempGarbageCollector()
@@ -3,6 +3,7 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from .sarvam_sdk import SarvamTTS, SarvamTTSError
 from .language_service import get_language_code, is_language_supported
+from .artifact_store import artifact_store, derivation_key
 import re
 import subprocess
 import grapheme  # Add this import for proper Unicode grapheme handling
@@ -20,6 +21,50 @@ def clean_script_for_tts_and_video(script_text):
 
     return script_text.strip()
 
+def synthesize_chunk_to_file(tts_client: SarvamTTS, text: str, target_language: str, voice: str, chunk_path: str) -> bool:
+    """Synthesize one TTS chunk, reusing the stored audio if this exact chunk was synthesized before."""
+    key = derivation_key(
+        "tts_chunk", text, target_language, voice,
+        tts_client.default_sample_rate, tts_client.voice_settings
+    )
+    if artifact_store.restore(key, chunk_path):
+        return True
+    audio_bytes = tts_client.synthesize_text(
+        text=text,
+        target_language=target_language,
+        voice=voice,
+        sample_rate=tts_client.default_sample_rate
+    )
+    if not audio_bytes:
+        return False
+    digest = artifact_store.put_bytes(audio_bytes)
+    artifact_store.remember(key, digest)
+    artifact_store.materialize(digest, chunk_path)
+    return True
+
+def synthesize_long_text_cached(tts_client: SarvamTTS, text: str, output_path: str, target_language: str, voice: str, max_chunk_length: int) -> bool:
+    """synthesize_long_text backed by the artifact store."""
+    key = derivation_key(
+        "tts_long", text, target_language, voice, max_chunk_length,
+        tts_client.default_sample_rate, tts_client.voice_settings
+    )
+    if artifact_store.restore(key, output_path):
+        print(f"Reused cached audio for {output_path}")
+        return True
+
+    artifact_store.release(output_path)
+    success = tts_client.synthesize_long_text(
+        text=text,
+        output_path=output_path,
+        target_language=target_language,
+        voice=voice,
+        max_chunk_length=max_chunk_length,
+        sample_rate=tts_client.default_sample_rate
+    )
+    if success:
+        artifact_store.remember(key, artifact_store.ingest(output_path))
+    return success
+
 def ensure_audio_is_generated(
     sarvam_api_key: str,
     language: str,
@@ -71,7 +116,8 @@ def ensure_audio_is_generated(
             
             cleaned_text = clean_script_for_tts_and_video(title_intro_script)
             if cleaned_text:
-                success = tts_client.synthesize_long_text(
+                success = synthesize_long_text_cached(
+                    tts_client,
                     text=cleaned_text,
                     output_path=title_audio_path,
                     target_language='en-IN',
@@ -99,7 +145,8 @@ def ensure_audio_is_generated(
                 
                 cleaned_text = clean_script_for_tts_and_video(script_text)
                 if cleaned_text:
-                    success = tts_client.synthesize_long_text(
+                    success = synthesize_long_text_cached(
+                        tts_client,
                         text=cleaned_text,
                         output_path=audio_path,
                         target_language='en-IN',
@@ -249,16 +296,7 @@ def ensure_hindi_audio_is_generated(
                     
                     # Use synthesize_text directly instead of synthesize_long_text
                     try:
-                        audio_bytes = tts_client.synthesize_text(
-                            text=chunk,
-                            target_language='hi-IN',  # Specify Hindi language
-                            voice=voice
-                        )
-                        
-                        if audio_bytes and len(audio_bytes) > 0:
-                            # Write the audio bytes directly to file
-                            with open(chunk_path, 'wb') as f:
-                                f.write(audio_bytes)
+                        if synthesize_chunk_to_file(tts_client, chunk, 'hi-IN', voice, chunk_path):
                             chunk_files.append(chunk_path)
                             print(f"  ✓ Generated audio for chunk {j+1}")
                         else:
@@ -276,6 +314,7 @@ def ensure_hindi_audio_is_generated(
                             f.write(f"file '{os.path.abspath(chunk_file)}'\n")
                     
                     # Use ffmpeg to concatenate
+                    artifact_store.release(title_audio_path)
                     try:
                         subprocess.run([
                             'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
@@ -324,16 +363,7 @@ def ensure_hindi_audio_is_generated(
                         
                         # Use synthesize_text directly instead of synthesize_long_text
                         try:
-                            audio_bytes = tts_client.synthesize_text(
-                                text=chunk,
-                                target_language='hi-IN',  # Specify Hindi language
-                                voice=voice
-                            )
-                            
-                            if audio_bytes and len(audio_bytes) > 0:
-                                # Write the audio bytes directly to file
-                                with open(chunk_path, 'wb') as f:
-                                    f.write(audio_bytes)
+                            if synthesize_chunk_to_file(tts_client, chunk, 'hi-IN', voice, chunk_path):
                                 chunk_files.append(chunk_path)
                                 print(f"  ✓ Generated audio for chunk {j+1}")
                             else:
@@ -351,6 +381,7 @@ def ensure_hindi_audio_is_generated(
                                 f.write(f"file '{os.path.abspath(chunk_file)}'\n")
                         
                         # Use ffmpeg to concatenate
+                        artifact_store.release(audio_path)
                         try:
                             subprocess.run([
                                 'ffmpeg', '-y', '-f', 'concat', '-safe', '0',
@@ -563,15 +594,7 @@ def ensure_language_audio_is_generated(
                 print(f"  Processing chunk {j+1}/{len(chunks)} ({len(chunk)} chars)")
             
             try:
-                audio_bytes = tts_client.synthesize_text(
-                    text=chunk,
-                    target_language=language_code,  # Use language code for TTS
-                    voice=voice
-                )
-                
-                if audio_bytes and len(audio_bytes) > 0:
-                    with open(chunk_path, 'wb') as f:
-                        f.write(audio_bytes)
+                if synthesize_chunk_to_file(tts_client, chunk, language_code, voice, chunk_path):
                     chunk_files.append(chunk_path)
                     if show_debug:
                         print(f"  ✓ Generated audio for chunk {j+1}")
@@ -587,6 +610,7 @@ def ensure_language_audio_is_generated(
         
         # Combine chunks using ffmpeg
         final_path = os.path.join(output_dir, f"{base_filename}.wav")
+        artifact_store.release(final_path)
         
         if len(chunk_files) == 1:
             # If only one chunk, just copy it
@@ -0,0 +1,360 @@
+"""
+Resumable Uploads
+
+Large LaTeX bundles (with datasets) and long PDFs are uploaded in chunks
+that can be resumed after a dropped connection, following the tus protocol
+(https://tus.io) loosely:
+
+1. ``POST /api/uploads`` with the file name and total length (and, optionally,
+   the SHA-256 of the whole file) creates a session.
+2. ``PATCH /api/uploads/{id}`` sends the bytes that start at ``Upload-Offset``.
+   Only a chunk that starts at the current offset is accepted. It is streamed
+   straight to disk, and if it carries an ``Upload-Checksum: sha256 <base64>``
+   header it is verified before the offset moves.
+3. After an interruption, ``HEAD /api/uploads/{id}`` returns the offset the
+   server has, and the client continues from there. No byte is sent twice.
+4. ``POST /api/uploads/{id}/complete`` verifies the length and the whole-file
+   checksum and hands the file to the normal ZIP/PDF ingest path.
+
+Sessions live in temp/uploads/<upload_id>/ (``info.json`` plus ``data``). The
+size of ``data`` *is* the offset, so a crash never leaves the two
+disagreeing. Sessions with no write for UPLOAD_SESSION_TTL_HOURS are
+removed by the temp collector.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from app.services.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_MAX_SIZE_MB = int(os.getenv("UPLOAD_MAX_SIZE_MB", "4096"))
+UPLOAD_CHUNK_MB = int(os.getenv("UPLOAD_CHUNK_MB", "8"))
+UPLOAD_MAX_CHUNK_MB = int(os.getenv("UPLOAD_MAX_CHUNK_MB", "64"))
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+UPLOAD_EXTENSIONS = (".zip", ".pdf", ".tex", ".latex")
+CHECKSUM_ALGORITHMS = ("sha256", "sha1", "md5")
+# Received bytes are written in blocks of this size rather than per network read
+WRITE_BLOCK_SIZE = 1024 * 1024
+# Without fcntl: a writer that has received nothing for this long is assumed dead
+LOCK_STALE_SECONDS = 600
+
+
+class UploadError(Exception):
+    """A request the upload protocol rejects; ``status_code`` is the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, message: str, offset: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def parse_checksum_header(value: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """``Upload-Checksum: <algorithm> <base64 digest>`` -> (algorithm, digest)."""
+    if not value:
+        return None
+    try:
+        algorithm, encoded = value.strip().split(" ", 1)
+        digest = base64.b64decode(encoded.strip(), validate=True)
+    except ValueError:
+        raise UploadError(400, "Upload-Checksum must be '<algorithm> <base64 digest>'")
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(400, f"Unsupported checksum algorithm: {algorithm}")
+    return algorithm, digest
+
+
+class _WriterLock:
+    """
+    One writer per session: a second PATCH would interleave bytes.
+
+    With fcntl this is a flock on the session's ``.lock`` file, which the OS
+    releases if the writer dies, so it never goes stale. Without fcntl it is
+    an O_EXCL lock file. Its writer refreshes the file's mtime as bytes
+    arrive, and only a lock idle for LOCK_STALE_SECONDS is taken over.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd: Optional[int] = None
+
+    def acquire(self):
+        if fcntl is not None:
+            fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                raise UploadError(409, "Another chunk of this upload is being written")
+            self.fd = fd
+            return
+        try:
+            if time.time() - os.path.getmtime(self.path) > LOCK_STALE_SECONDS:
+                os.unlink(self.path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise UploadError(409, "Another chunk of this upload is being written")
+
+    def touch(self):
+        """Show that the writer is still receiving bytes."""
+        if fcntl is None:
+            try:
+                os.utime(self.path)
+            except OSError:
+                pass
+
+    def release(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class UploadSessions:
+    """Upload sessions on disk, one directory each."""
+
+    def __init__(self, root: str = "temp/uploads"):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _dir(self, upload_id: str) -> Path:
+        # IDs are generated here; anything else (e.g. "../") is not a session
+        if not upload_id or upload_id != os.path.basename(upload_id) or upload_id.startswith("."):
+            raise UploadError(404, "Upload not found")
+        return self.root / upload_id
+
+    def _read_info(self, upload_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        try:
+            with open(self._dir(upload_id) / "info.json", "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            raise UploadError(404, "Upload not found")
+        # Another user's session does not exist as far as this caller is concerned
+        if user_id is not None and info.get("user_id") != user_id:
+            raise UploadError(404, "Upload not found")
+        return info
+
+    def _write_info(self, info: Dict[str, Any]):
+        info_file = self._dir(info["upload_id"]) / "info.json"
+        temp_file = info_file.with_suffix(".json.tmp")
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+        os.replace(temp_file, info_file)
+
+    def data_path(self, upload_id: str) -> str:
+        return str(self._dir(upload_id) / "data")
+
+    def _with_offset(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            offset = os.path.getsize(self.data_path(info["upload_id"]))
+        except OSError:
+            offset = 0
+        return {**info, "offset": offset, "expires_at": info["updated_at"] + UPLOAD_SESSION_TTL_HOURS * 3600}
+
+    def create(self, filename: str, length: int, checksum: Optional[str] = None,
+               user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Start an upload.
+
+        Args:
+            filename: Original file name; its extension selects the ingest path
+            length: Total size in bytes
+            checksum: Optional hex SHA-256 of the whole file, checked on completion
+            user_id: Owner; other users' calls with a user_id get 404
+
+        Returns:
+            The session: {"upload_id", "filename", "length", "offset", "chunk_size", ...}
+        """
+        filename = os.path.basename(filename.replace("\\", "/"))
+        if not filename.lower().endswith(UPLOAD_EXTENSIONS):
+            raise UploadError(400, f"Only {', '.join(UPLOAD_EXTENSIONS)} files can be uploaded")
+        if length <= 0:
+            raise UploadError(400, "Upload length must be positive")
+        if length > UPLOAD_MAX_SIZE_MB * 1024 * 1024:
+            raise UploadError(413, f"Uploads are limited to {UPLOAD_MAX_SIZE_MB} MB")
+        if checksum is not None:
+            checksum = checksum.lower()
+            if len(checksum) != 64 or any(c not in "0123456789abcdef" for c in checksum):
+                raise UploadError(400, "checksum must be a hex SHA-256 digest")
+
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._dir(upload_id))
+        open(self.data_path(upload_id), "wb").close()
+        now = time.time()
+        info = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "length": length,
+            "checksum": checksum,
+            "user_id": user_id,
+            "chunk_size": UPLOAD_CHUNK_MB * 1024 * 1024,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._write_info(info)
+        logger.info(f"Started upload {upload_id} ({filename}, {length} bytes)")
+        return self._with_offset(info)
+
+    def get(self, upload_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Session state, including the current offset."""
+        return self._with_offset(self._read_info(upload_id, user_id))
+
+    def _lock(self, upload_id: str) -> _WriterLock:
+        lock = _WriterLock(str(self._dir(upload_id) / ".lock"))
+        lock.acquire()
+        return lock
+
+    async def write_chunk(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes],
+                          checksum: Optional[Tuple[str, bytes]] = None, user_id: Optional[str] = None) -> int:
+        """
+        Append a chunk that starts at ``offset``, streaming it to disk.
+
+        Without a checksum, whatever arrived before a disconnect is kept and
+        the client resumes from the new offset. With one, the chunk is kept
+        only if its digest matches; otherwise the file is cut back to
+        ``offset``.
+
+        Returns:
+            The new offset
+        """
+        info = await run_blocking(self._read_info, upload_id, user_id)
+        data_path = self.data_path(upload_id)
+        lock = await run_blocking(self._lock, upload_id)
+        try:
+            current = await run_blocking(os.path.getsize, data_path)
+            if offset != current:
+                raise UploadError(409, f"Upload-Offset {offset} does not match the current offset {current}", current)
+            written = await self._append(data_path, offset, info["length"], chunks, checksum, lock)
+        finally:
+            await run_blocking(lock.release)
+            info["updated_at"] = time.time()
+            await run_blocking(self._write_info, info)
+        return offset + written
+
+    async def _append(self, data_path: str, offset: int, length: int, chunks: AsyncIterator[bytes],
+                      checksum: Optional[Tuple[str, bytes]], lock: _WriterLock) -> int:
+        out = await run_blocking(open, data_path, "ab")
+        hasher = hashlib.new(checksum[0]) if checksum else None
+        limit = min(length - offset, UPLOAD_MAX_CHUNK_MB * 1024 * 1024)
+        written = 0
+        buffer = bytearray()
+        try:
+            async for piece in chunks:
+                written += len(piece)
+                if written > limit:
+                    raise UploadError(413, "Chunk runs past the upload length or UPLOAD_MAX_CHUNK_MB")
+                if hasher:
+                    hasher.update(piece)
+                buffer += piece
+                if len(buffer) >= WRITE_BLOCK_SIZE:
+                    await run_blocking(out.write, bytes(buffer))
+                    buffer.clear()
+                    await run_blocking(lock.touch)
+            if buffer:
+                await run_blocking(out.write, bytes(buffer))
+                buffer.clear()
+            await run_blocking(out.flush)
+            if hasher and hasher.digest() != checksum[1]:
+                raise UploadError(460, "Chunk checksum mismatch", offset)
+        except BaseException as e:
+            if hasher is None and not isinstance(e, UploadError):
+                # The client went away mid-chunk: keep what arrived, it resumes from there
+                await run_blocking(out.write, bytes(buffer))
+                await run_blocking(out.flush)
+            else:
+                # Unverified or rejected bytes must not move the offset
+                await run_blocking(out.flush)
+                await run_blocking(out.truncate, offset)
+            raise
+        finally:
+            await run_blocking(out.close)
+        return written
+
+    def _file_checksum(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(WRITE_BLOCK_SIZE), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def finish(self, upload_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Check that an upload is complete and intact.
+
+        Returns:
+            The session, with "path" pointing at the assembled file
+        """
+        session = self.get(upload_id, user_id)
+        if session["offset"] != session["length"]:
+            raise UploadError(409, f"Upload is incomplete: {session['offset']} of {session['length']} bytes",
+                              session["offset"])
+        path = self.data_path(upload_id)
+        if session["checksum"] and self._file_checksum(path) != session["checksum"]:
+            raise UploadError(460, "File checksum mismatch; delete the upload and start again")
+        return {**session, "path": path}
+
+    def claim(self, upload_id: str, destination: str) -> str:
+        """
+        Place a finished upload's file at ``destination`` (hard link when possible).
+
+        The session stays until ``delete`` is called, so a failed ingest can be
+        retried without uploading again.
+        """
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.link(self.data_path(upload_id), destination)
+        except OSError:
+            shutil.copyfile(self.data_path(upload_id), destination)
+        return destination
+
+    def delete(self, upload_id: str, user_id: Optional[str] = None) -> bool:
+        path = self._dir(upload_id)
+        if not path.exists():
+            return False
+        if user_id is not None:
+            self._read_info(upload_id, user_id)
+        shutil.rmtree(path, ignore_errors=True)
+        return True
+
+    def prune(self, max_age_seconds: Optional[float] = None) -> int:
+        """Remove sessions with no write for ``max_age_seconds`` (default UPLOAD_SESSION_TTL_HOURS)."""
+        max_age = UPLOAD_SESSION_TTL_HOURS * 3600 if max_age_seconds is None else max_age_seconds
+        now = time.time()
+        removed = 0
+        for path in self.root.iterdir():
+            try:
+                with open(path / "info.json", "r", encoding="utf-8") as f:
+                    updated_at = json.load(f)["updated_at"]
+            except (OSError, ValueError, KeyError):
+                updated_at = path.stat().st_mtime
+            if now - updated_at > max_age:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info(f"Removed {removed} expired upload sessions")
+        return removed
+
+
+# Global upload sessions instance
+upload_sessions = UploadSessions()
@@ -4,6 +4,7 @@ for research papers, enabling AI-generated visual storytelling videos.
 """
 
 import google.generativeai as genai
+import os
 import re
 from typing import Dict, List, Tuple
 import json
@@ -339,3 +340,104 @@ def generate_visual_storytelling_script(
         scene["narration"] = service.refine_narration_for_tts(scene["narration"])
     
     return script
+
+
+def render_scene_cards(scenes: List[Dict], image_dir: str) -> List[str]:
+    """
+    Render a gradient text card (scene number + narration) for each scene.
+    
+    Args:
+        scenes: Scenes from the storytelling script
+        image_dir: Directory to write scene_XXX.png files into
+        
+    Returns:
+        List of paths to the rendered cards
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    
+    image_paths = []
+    for i, scene in enumerate(scenes, 1):
+        output_path = os.path.join(image_dir, f"scene_{i:03d}.png")
+        
+        # Create image
+        width, height = 1920, 1080
+        img = Image.new('RGB', (width, height))
+        draw = ImageDraw.Draw(img)
+        
+        # Generate color based on scene number
+        hue = (i * 30) % 360
+        if hue < 120:
+            colors = [(30, 30, 60), (60, 80, 180), (100, 120, 255)]
+        elif hue < 240:
+            colors = [(20, 60, 80), (40, 120, 140), (60, 180, 200)]
+        else:
+            colors = [(50, 20, 60), (120, 60, 140), (180, 100, 200)]
+        
+        # Create gradient
+        for y in range(height):
+            progress = y / height
+            if progress < 0.5:
+                local_progress = progress * 2
+                r = int(colors[0][0] + (colors[1][0] - colors[0][0]) * local_progress)
+                g = int(colors[0][1] + (colors[1][1] - colors[0][1]) * local_progress)
+                b = int(colors[0][2] + (colors[1][2] - colors[0][2]) * local_progress)
+            else:
+                local_progress = (progress - 0.5) * 2
+                r = int(colors[1][0] + (colors[2][0] - colors[1][0]) * local_progress)
+                g = int(colors[1][1] + (colors[2][1] - colors[1][1]) * local_progress)
+                b = int(colors[1][2] + (colors[2][2] - colors[1][2]) * local_progress)
+            draw.rectangle([(0, y), (width, y + 1)], fill=(r, g, b))
+        
+        # Add scene number at top
+        try:
+            font_large = ImageFont.truetype("arial.ttf", 80)
+            font_medium = ImageFont.truetype("arial.ttf", 50)
+        except:
+            font_large = ImageFont.load_default()
+            font_medium = ImageFont.load_default()
+        
+        # Scene number
+        scene_text = f"Scene {i}"
+        bbox = draw.textbbox((0, 0), scene_text, font=font_large)
+        text_width = bbox[2] - bbox[0]
+        x = (width - text_width) // 2
+        draw.text((x, 150), scene_text, fill=(255, 255, 255), font=font_large)
+        
+        # Narration text (word wrapped)
+        narration = scene.get("narration", "")
+        words = narration.split()
+        lines = []
+        current_line = []
+        max_width = width - 200
+        
+        for word in words:
+            current_line.append(word)
+            test_line = ' '.join(current_line)
+            bbox = draw.textbbox((0, 0), test_line, font=font_medium)
+            if bbox[2] - bbox[0] > max_width:
+                if len(current_line) > 1:
+                    current_line.pop()
+                    lines.append(' '.join(current_line))
+                    current_line = [word]
+                else:
+                    lines.append(word)
+                    current_line = []
+        
+        if current_line:
+            lines.append(' '.join(current_line))
+        
+        # Draw text lines
+        y_offset = 300
+        line_height = 70
+        for line in lines[:8]:  # Max 8 lines
+            bbox = draw.textbbox((0, 0), line, font=font_medium)
+            line_width = bbox[2] - bbox[0]
+            x = (width - line_width) // 2
+            draw.text((x, y_offset), line, fill=(255, 255, 255), font=font_medium)
+            y_offset += line_height
+        
+        img.save(output_path, 'PNG')
+        image_paths.append(output_path)
+        print(f"Generated text card {i}/{len(scenes)}")
+    
+    return image_paths
@@ -0,0 +1,107 @@
+"""
+Benchmark: LaTeX text extraction
+
+Compares the regex chain that extract_text_from_file used to run against the
+single-pass tokenizer (app.services.latex_tokenizer), on real sources or on a
+synthetic paper.
+
+Run from the backend directory:
+
+    python -m benchmarks.latex_text_extraction                     # synthetic paper
+    python -m benchmarks.latex_text_extraction temp/arxiv_sources  # every main .tex found
+    python -m benchmarks.latex_text_extraction paper.tex --repeat 10
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+from typing import Callable, List, Tuple
+
+from app.services.latex_project import build_latex_project, find_main_tex_file
+from app.services.latex_tokenizer import latex_to_text, parse_latex
+
+
+def legacy_extract(content: str) -> str:
+    """The regex chain extract_text_from_file used before the tokenizer."""
+    content = re.sub(r'%.*?\n', '\n', content)
+    content = re.sub(r'\\[a-zA-Z]+\*?(\[[^\]]*\])?(\{[^}]*\})*', ' ', content)
+    content = re.sub(r'\{[^}]*\}', ' ', content)
+    content = re.sub(r'\s+', ' ', content)
+    return content.strip()
+
+
+def synthetic_paper(sections: int = 400) -> str:
+    """A large arXiv-like document: prose, citations, math, figures, lists."""
+    body = []
+    for i in range(sections):
+        body.append(
+            f"\\section{{Section {i}}}\\label{{sec:{i}}}\n"
+            f"We build on \\cite[Thm.~{i}]{{ref{i},ref{i + 1}}} and show that $f(x_{i}) = \\sum_j a_j x^j$ "
+            f"holds for \\textbf{{all}} inputs (see Fig.~\\ref{{fig:{i}}}). % a comment\n"
+            "\\begin{equation}\n  \\mathcal{L} = \\frac{1}{N}\\sum_{n=1}^{N} \\ell(y_n, \\hat{y}_n)\n\\end{equation}\n"
+            "\\begin{itemize}\n  \\item first point with \\emph{emphasis}\n  \\item[b)] second point\n\\end{itemize}\n"
+            f"\\begin{{figure}}[t]\\centering\\includegraphics[width=0.8\\linewidth]{{figs/plot{i}.pdf}}"
+            f"\\caption{{Results for setting {i} with $\\alpha = 0.{i % 10}$.}}\\label{{fig:{i}}}\\end{{figure}}\n"
+            + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "\n\n"
+        )
+    return (
+        "\\documentclass{article}\n\\usepackage{amsmath}\n\\newcommand{\\R}{\\mathbb{R}}\n"
+        "\\title{Synthetic}\\author{Bench}\n\\begin{document}\n\\maketitle\n"
+        "\\begin{abstract}A synthetic paper.\\end{abstract}\n" + "".join(body) + "\\end{document}\n"
+    )
+
+
+def load_sources(paths: List[str]) -> List[Tuple[str, str]]:
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in sorted(os.listdir(path)):
+                candidate = os.path.join(path, entry)
+                if os.path.isdir(candidate):
+                    try:
+                        main = find_main_tex_file(candidate)
+                    except FileNotFoundError:
+                        continue
+                    sources.append((main, build_latex_project(main).text))
+            if not sources:
+                main = find_main_tex_file(path)
+                sources.append((main, build_latex_project(main).text))
+        else:
+            sources.append((path, build_latex_project(path).text))
+    return sources
+
+
+def best_of(func: Callable[[str], object], content: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help=".tex files or source directories")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=400, help="Size of the synthetic paper")
+    args = parser.parse_args()
+
+    sources = load_sources(args.paths) if args.paths else [("synthetic", synthetic_paper(args.sections))]
+
+    print(f"{'source':<48} {'KiB':>8} {'regex ms':>10} {'tokenizer ms':>13} {'speedup':>8} {'events':>7}")
+    speedups = []
+    for name, content in sources:
+        legacy = best_of(legacy_extract, content, args.repeat)
+        tokenized = best_of(latex_to_text, content, args.repeat)
+        events = len(parse_latex(content).events)
+        speedups.append(legacy / tokenized if tokenized else float("inf"))
+        print(f"{name[-48:]:<48} {len(content) / 1024:>8.1f} {legacy * 1000:>10.1f} "
+              f"{tokenized * 1000:>13.1f} {speedups[-1]:>7.2f}x {events:>7}")
+    if len(speedups) > 1:
+        print(f"median speedup: {statistics.median(speedups):.2f}x over {len(speedups)} sources")
+
+
+if __name__ == "__main__":
+    main()
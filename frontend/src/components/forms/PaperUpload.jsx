@@ -113,13 +113,13 @@ const PaperUpload = () => {
 
     try {
       const response = await apiService.scrapeArxiv(arxivUrl);
-      const { paper_id, metadata, image_files } = response.data;
+      const { paper_id, metadata, image_files, reused } = response.data;
       
       setPaperId(paper_id);
       setMetadata(metadata);
       setImages(image_files);
       
-      toast.success('Paper processed successfully!');
+      toast.success(reused ? 'Paper was already processed, reusing its content' : 'Paper processed successfully!');
       // Don't auto-progress - stay on step 2 to show metadata editor
       // The parent component (PaperProcessing) will handle showing MetadataEditor
     } catch (error) {
@@ -132,6 +132,36 @@ const PaperUpload = () => {
     }
   };
 
+  // Background uploads fill in metadata, then text, then images; keep the workflow in sync
+  const followIngest = async (paperId) => {
+    let metadataShown = false;
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, 1500));
+      let status;
+      try {
+        status = (await apiService.getPaperStatus(paperId)).data;
+      } catch (error) {
+        console.error('Error polling paper status:', error);
+        return;
+      }
+      if (status.metadata && !metadataShown) {
+        setMetadata(status.metadata);
+        metadataShown = true;
+      }
+      if (status.image_files) {
+        setImages(status.image_files);
+      }
+      if (status.status === 'failed') {
+        toast.error(status.error || 'Failed to process paper');
+        return;
+      }
+      if (status.status !== 'processing') {
+        toast.success('Paper processed successfully!');
+        return;
+      }
+    }
+  };
+
   const handleFileUpload = async () => {
     if (!uploadedFile) {
       toast.error(`Please select a ${uploadType === 'file' ? 'ZIP' : 'PDF'} file`);
@@ -142,21 +172,19 @@ const PaperUpload = () => {
     setLoading(true);
 
     try {
-      let response;
+      // Chunked and resumable, so a dropped connection does not restart a large archive
+      const uploadId = await apiService.uploadResumable(uploadedFile);
+      const response = await apiService.completeUpload(uploadId, { background: true });
       
-      if (uploadType === 'file') {
-        response = await apiService.uploadZip(uploadedFile);
-      } else if (uploadType === 'pdf') {
-        response = await apiService.uploadPdf(uploadedFile);
-      }
-      
-      const { paper_id, metadata, image_files } = response.data;
+      const { paper_id, reused } = response.data;
       
       setPaperId(paper_id);
-      setMetadata(metadata);
-      setImages(image_files || []);
+      setImages([]);
       
-      toast.success(`${uploadType === 'file' ? 'LaTeX' : 'PDF'} processed successfully!`);
+      toast.success(reused
+        ? 'This file was uploaded before, reusing its extracted content'
+        : `${uploadType === 'file' ? 'LaTeX' : 'PDF'} uploaded, extracting content...`);
+      followIngest(paper_id);
       // Don't auto-progress - stay on step 2 to show metadata editor
     } catch (error) {
       console.error(`Error uploading ${uploadType}:`, error);
@@ -95,7 +95,7 @@ const ImageSelector = ({ paperId, images, selectedImage, onSelect, onClose }) =>
       for (const imageName of currentImages) {
         if (!imageUrls[imageName]) {
           try {
-            const imageUrl = apiService.getImageUrl(paperId, imageName);
+            const imageUrl = apiService.getImageUrl(paperId, imageName, 'thumb');
             setImageUrls(prev => ({ ...prev, [imageName]: imageUrl }));
           } catch (error) {
             console.error(`Failed to load image ${imageName}:`, error);
@@ -215,7 +215,7 @@ const SectionPanel = ({
               {selectedImage ? (
                 <div className="relative w-full h-full">
                   <img
-                    src={apiService.getImageUrl(paperId, selectedImage)}
+                    src={apiService.getImageUrl(paperId, selectedImage, 'preview')}
                     alt={selectedImage}
                     className="object-contain w-full h-full"
                     onError={(e) => {
@@ -210,6 +210,14 @@ class HttpClient {
   delete(url, config = {}) {
     return this.client.delete(url, config);
   }
+
+  patch(url, data = {}, config = {}) {
+    return this.client.patch(url, data, config);
+  }
+
+  head(url, config = {}) {
+    return this.client.head(url, config);
+  }
 }
 
 /**
@@ -291,21 +299,25 @@ class PapersService {
     }
   }
 
-  async uploadZip(file) {
+  async uploadZip(file, { background = false } = {}) {
     const formData = new FormData();
     formData.append('file', file);
     
+    // background: respond once the file is stored; poll getStatus() for the rest
     return this.http.post('/papers/upload-zip', formData, {
-      headers: { 'Content-Type': 'multipart/form-data' }
+      headers: { 'Content-Type': 'multipart/form-data' },
+      params: background ? { background: true } : undefined
     });
   }
 
-  async uploadPdf(file) {
+  async uploadPdf(file, { background = false } = {}) {
     const formData = new FormData();
     formData.append('file', file);
     
+    // background: respond once the file is stored; poll getStatus() for the rest
     return this.http.post('/papers/upload-pdf', formData, {
-      headers: { 'Content-Type': 'multipart/form-data' }
+      headers: { 'Content-Type': 'multipart/form-data' },
+      params: background ? { background: true } : undefined
     });
   }
 
@@ -317,6 +329,10 @@ class PapersService {
     return this.http.get(`/papers/${paperId}/metadata`);
   }
 
+  async getStatus(paperId) {
+    return this.http.get(`/papers/${paperId}/status`);
+  }
+
   async updateMetadata(paperId, metadata) {
     return this.http.put(`/papers/${paperId}/metadata`, metadata);
   }
@@ -334,6 +350,71 @@ class PapersService {
   }
 }
 
+/**
+ * Resumable Uploads Service
+ * Sends large files in chunks that survive dropped connections
+ */
+class UploadsService {
+  constructor(httpClient) {
+    this.http = httpClient;
+  }
+
+  async chunkChecksum(chunk) {
+    // crypto.subtle only exists in secure contexts; the checksum is optional
+    if (!window.crypto?.subtle) return null;
+    const digest = await window.crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+    return btoa(String.fromCharCode(...new Uint8Array(digest)));
+  }
+
+  async currentOffset(uploadId) {
+    const response = await this.http.head(`/uploads/${uploadId}`);
+    return Number(response.headers['upload-offset']);
+  }
+
+  async upload(file, { onProgress, maxRetries = 5 } = {}) {
+    const { data: session } = await this.http.post('/uploads', { filename: file.name, length: file.size });
+    const uploadId = session.upload_id;
+    let offset = session.offset;
+    let failures = 0;
+
+    while (offset < file.size) {
+      const chunk = file.slice(offset, offset + session.chunk_size);
+      const headers = {
+        'Content-Type': 'application/offset+octet-stream',
+        'Upload-Offset': String(offset),
+      };
+      const checksum = await this.chunkChecksum(chunk);
+      if (checksum) headers['Upload-Checksum'] = `sha256 ${checksum}`;
+
+      try {
+        const response = await this.http.patch(`/uploads/${uploadId}`, chunk, { headers });
+        offset = Number(response.headers['upload-offset']);
+        failures = 0;
+        onProgress?.(offset / file.size);
+      } catch (error) {
+        failures += 1;
+        if (failures > maxRetries || [400, 404, 413, 415].includes(error.response?.status)) {
+          throw error;
+        }
+        await new Promise(resolve => setTimeout(resolve, API_CONFIG.retryDelay * 2 ** (failures - 1)));
+        // Continue from whatever the server kept instead of resending the file
+        try {
+          offset = await this.currentOffset(uploadId);
+        } catch (headError) {
+          console.warn('Could not read upload offset, retrying chunk:', headError);
+        }
+      }
+    }
+    return uploadId;
+  }
+
+  async complete(uploadId, { background = false } = {}) {
+    return this.http.post(`/uploads/${uploadId}/complete`, {}, {
+      params: background ? { background: true } : undefined
+    });
+  }
+}
+
 class ScriptsService {
   constructor(httpClient) {
     this.http = httpClient;
@@ -398,8 +479,10 @@ class ImagesService {
     return this.http.get(`/images/${paperId}/available`);
   }
 
-  getImageUrl(paperId, imageName) {
-    return `${API_CONFIG.baseURL}/api/images/${paperId}/${imageName}`;
+  // variant: 'thumb' | 'preview' | 'slide'; omit for the original file
+  getImageUrl(paperId, imageName, variant) {
+    const url = `${API_CONFIG.baseURL}/api/images/${paperId}/${imageName}`;
+    return variant ? `${url}?variant=${variant}` : url;
   }
 
   async getImage(paperId, imageName) {
@@ -502,6 +585,7 @@ class ApiService {
     this.auth = new AuthService(this.httpClient);
     this.apiKeys = new ApiKeysService(this.httpClient);
     this.papers = new PapersService(this.httpClient);
+    this.uploads = new UploadsService(this.httpClient);
     this.scripts = new ScriptsService(this.httpClient);
     this.images = new ImagesService(this.httpClient);
     this.slides = new SlidesService(this.httpClient);
@@ -537,10 +621,13 @@ class ApiService {
   getApiKeysStatus = () => this.apiKeys.getStatus();
   
   checkPaperExists = (paperId) => this.papers.checkExists(paperId);
-  uploadZip = (file) => this.papers.uploadZip(file);
-  uploadPdf = (file) => this.papers.uploadPdf(file);
+  uploadZip = (file, options) => this.papers.uploadZip(file, options);
+  uploadPdf = (file, options) => this.papers.uploadPdf(file, options);
+  uploadResumable = (file, options) => this.uploads.upload(file, options);
+  completeUpload = (uploadId, options) => this.uploads.complete(uploadId, options);
   scrapeArxiv = (url) => this.papers.scrapeArxiv(url);
   getPaperMetadata = (paperId) => this.papers.getMetadata(paperId);
+  getPaperStatus = (paperId) => this.papers.getStatus(paperId);
   updatePaperMetadata = (paperId, metadata) => this.papers.updateMetadata(paperId, metadata);
   downloadPaperPdf = (paperId) => this.papers.downloadPdf(paperId);
   downloadPaperSource = (paperId) => this.papers.downloadSource(paperId);
@@ -553,7 +640,7 @@ class ApiService {
   this.scripts.assignImageToSection(paperId, sectionName, imageName);
   
   getAvailableImages = (paperId) => this.images.getAvailable(paperId);
-  getImageUrl = (paperId, imageName) => this.images.getImageUrl(paperId, imageName);
+  getImageUrl = (paperId, imageName, variant) => this.images.getImageUrl(paperId, imageName, variant);
   getImage = (paperId, imageName) => this.images.getImage(paperId, imageName);
   
   generateSlides = (paperId) => this.slides.generate(paperId);